@@ -8,13 +8,153 @@ class Settings:
     SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID")
     SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET")
     SPOTIFY_API_BASE_URL = "https://api.spotify.com/v1"
+    SPOTIFY_TOKEN_URL = "https://accounts.spotify.com/api/token"
+    # Seconds before expiry at which a cached token is refreshed in the background
+    SPOTIFY_TOKEN_REFRESH_MARGIN = float(
+        os.getenv("SPOTIFY_TOKEN_REFRESH_MARGIN", "300")
+    )
+    # Seconds before expiry at which a cached token is no longer handed out
+    SPOTIFY_TOKEN_EXPIRY_MARGIN = float(os.getenv("SPOTIFY_TOKEN_EXPIRY_MARGIN", "30"))
+    SPOTIFY_CACHE_ENABLED = os.getenv("SPOTIFY_CACHE_ENABLED", "true").lower() == "true"
+    SPOTIFY_CACHE_MAX_ENTRIES = int(os.getenv("SPOTIFY_CACHE_MAX_ENTRIES", "5000"))
+    SPOTIFY_CACHE_MAX_BYTES = int(
+        os.getenv("SPOTIFY_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    SPOTIFY_CACHE_TTL_TRACKS = float(os.getenv("SPOTIFY_CACHE_TTL_TRACKS", "86400"))
+    SPOTIFY_CACHE_TTL_ALBUMS = float(os.getenv("SPOTIFY_CACHE_TTL_ALBUMS", "86400"))
+    SPOTIFY_CACHE_TTL_ARTISTS = float(os.getenv("SPOTIFY_CACHE_TTL_ARTISTS", "3600"))
+    SPOTIFY_CACHE_TTL_TOP_TRACKS = float(
+        os.getenv("SPOTIFY_CACHE_TTL_TOP_TRACKS", "3600")
+    )
+    SPOTIFY_BATCHING_ENABLED = (
+        os.getenv("SPOTIFY_BATCHING_ENABLED", "true").lower() == "true"
+    )
+    SPOTIFY_BATCH_WINDOW = float(os.getenv("SPOTIFY_BATCH_WINDOW", "0.01"))
     NEXT_PUBLIC_SUPABASE_URL = os.getenv("NEXT_PUBLIC_SUPABASE_URL")
     NEXT_PUBLIC_SUPABASE_ANON_KEY = os.getenv("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+    SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+    # "remote" always asks GoTrue, "local" never does, "hybrid" asks only when
+    # the token cannot be verified locally
+    SUPABASE_AUTH_MODE = os.getenv("SUPABASE_AUTH_MODE", "hybrid")
+    SUPABASE_AUTH_CACHE_SIZE = int(os.getenv("SUPABASE_AUTH_CACHE_SIZE", "10000"))
+    SUPABASE_AUTH_CACHE_TTL = float(os.getenv("SUPABASE_AUTH_CACHE_TTL", "300"))
+    SUPABASE_JWKS_TTL = float(os.getenv("SUPABASE_JWKS_TTL", "600"))
+    # Asymmetric algorithms accepted for signing keys whose JWK names none
+    SUPABASE_JWT_ALGORITHMS = os.getenv("SUPABASE_JWT_ALGORITHMS", "RS256,ES256")
     LANGFUSE_PUBLIC_KEY = os.getenv("LANGFUSE_PUBLIC_KEY")
     LANGFUSE_SECRET_KEY = os.getenv("LANGFUSE_SECRET_KEY")
     LANGFUSE_HOST = os.getenv("LANGFUSE_HOST")
     TICKETMASTER_API_KEY = os.getenv("TICKETMASTER_API_KEY")
     TICKETMASTER_API_BASE_URL = "https://app.ticketmaster.com/discovery/v2"
+    HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "10"))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3"))
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS = int(
+        os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(
+        os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "20")
+    )
+    HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+    SPOTIFY_RATE_LIMIT = float(os.getenv("SPOTIFY_RATE_LIMIT", "10"))
+    SPOTIFY_RATE_BURST = int(os.getenv("SPOTIFY_RATE_BURST", "20"))
+    SPOTIFY_MAX_CONCURRENCY = int(os.getenv("SPOTIFY_MAX_CONCURRENCY", "20"))
+    TICKETMASTER_RATE_LIMIT = float(os.getenv("TICKETMASTER_RATE_LIMIT", "5"))
+    TICKETMASTER_RATE_BURST = int(os.getenv("TICKETMASTER_RATE_BURST", "5"))
+    TICKETMASTER_MAX_CONCURRENCY = int(os.getenv("TICKETMASTER_MAX_CONCURRENCY", "5"))
+    UPSTREAM_QUEUE_TIMEOUT = float(os.getenv("UPSTREAM_QUEUE_TIMEOUT", "10"))
+    UPSTREAM_MAX_429_RETRIES = int(os.getenv("UPSTREAM_MAX_429_RETRIES", "2"))
+    UPSTREAM_BREAKER_FAILURE_THRESHOLD = int(
+        os.getenv("UPSTREAM_BREAKER_FAILURE_THRESHOLD", "5")
+    )
+    UPSTREAM_BREAKER_RECOVERY_TIMEOUT = float(
+        os.getenv("UPSTREAM_BREAKER_RECOVERY_TIMEOUT", "30")
+    )
+    UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+    UPSTREAM_RETRY_BASE_DELAY = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.2"))
+    UPSTREAM_RETRY_MAX_DELAY = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "2"))
+    SPOTIFY_HEDGING_ENABLED = (
+        os.getenv("SPOTIFY_HEDGING_ENABLED", "false").lower() == "true"
+    )
+    HEDGING_MIN_SAMPLES = int(os.getenv("HEDGING_MIN_SAMPLES", "20"))
+    PROJECTION_CACHE_SIZE = int(os.getenv("PROJECTION_CACHE_SIZE", "512"))
+    STREAMING_PROJECTION_ENABLED = (
+        os.getenv("STREAMING_PROJECTION_ENABLED", "true").lower() == "true"
+    )
+    STREAMING_PROJECTION_MIN_BYTES = int(
+        os.getenv("STREAMING_PROJECTION_MIN_BYTES", "524288")
+    )
+    PAGINATION_MAX_ITEMS = int(os.getenv("PAGINATION_MAX_ITEMS", "500"))
+    TICKETMASTER_SHARD_FANOUT = int(os.getenv("TICKETMASTER_SHARD_FANOUT", "4"))
+    TICKETMASTER_MIN_SHARD_SECONDS = int(
+        os.getenv("TICKETMASTER_MIN_SHARD_SECONDS", "3600")
+    )
+    TICKETMASTER_SHARDED_MAX_ITEMS = int(
+        os.getenv("TICKETMASTER_SHARDED_MAX_ITEMS", "5000")
+    )
+    # Tool results above this many tokens are compacted before reaching the assistant
+    TOOL_OUTPUT_TOKEN_BUDGET = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "2000"))
+    # Per-tool overrides, e.g. "search_spotify=1500,get_playlist=3000"
+    TOOL_OUTPUT_TOKEN_BUDGETS = os.getenv("TOOL_OUTPUT_TOKEN_BUDGETS", "")
+    TOOL_OUTPUT_ENCODING = os.getenv("TOOL_OUTPUT_ENCODING", "o200k_base")
+    TOOL_OUTPUT_MAX_STRING_CHARS = int(os.getenv("TOOL_OUTPUT_MAX_STRING_CHARS", "500"))
+    TOOL_OUTPUT_CURSOR_TTL = float(os.getenv("TOOL_OUTPUT_CURSOR_TTL", "900"))
+    TOOL_OUTPUT_MAX_CURSORS = int(os.getenv("TOOL_OUTPUT_MAX_CURSORS", "256"))
+    # Tools whose lists of dicts are returned as header and rows, "*" for all
+    TOOL_OUTPUT_TABULAR_TOOLS = os.getenv("TOOL_OUTPUT_TABULAR_TOOLS", "")
+    AGENT_CACHE_MAX_ENTRIES = int(os.getenv("AGENT_CACHE_MAX_ENTRIES", "1000"))
+    # Seconds a session's agent stays cached without messages
+    AGENT_CACHE_IDLE_TTL = float(os.getenv("AGENT_CACHE_IDLE_TTL", "1800"))
+    AGENT_CACHE_MAX_BYTES = int(
+        os.getenv("AGENT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))
+    )
+    # Where session threads are kept: "memory", "sqlite" or "supabase"
+    SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+    SESSION_STORE_SQLITE_PATH = os.getenv("SESSION_STORE_SQLITE_PATH", "sessions.db")
+    SESSION_STORE_TABLE = os.getenv("SESSION_STORE_TABLE", "user_threads")
+    # Sessions unused for this many seconds are removed by the sweeper
+    SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "86400"))
+    SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+    SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1"))
+    SESSION_WRITE_BATCH_SIZE = int(os.getenv("SESSION_WRITE_BATCH_SIZE", "100"))
+    SESSION_SWEEP_INTERVAL = float(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+    ASSISTANT_MODEL = os.getenv("ASSISTANT_MODEL", "gpt-4o")
+    # Model tiers, cheapest first; a service's "tiers" in assistant_instructions.yaml wins
+    MODEL_TIERS = os.getenv(
+        "MODEL_TIERS", f"fast=gpt-4o-mini,standard={ASSISTANT_MODEL}"
+    )
+    # Tier used when routing is off, and the one warmed up and named after the service
+    MODEL_DEFAULT_TIER = os.getenv("MODEL_DEFAULT_TIER", "standard")
+    MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+    # USD per million prompt/completion tokens, for the per-tier cost metrics
+    MODEL_PRICES = os.getenv("MODEL_PRICES", "gpt-4o=2.50/10.00,gpt-4o-mini=0.15/0.60")
+    # Optional JSON file caching which assistant belongs to which configuration
+    ASSISTANT_REGISTRY_PATH = os.getenv("ASSISTANT_REGISTRY_PATH", "")
+    # Skip the startup warm-up, loading agents and assistants on the first chat
+    LAZY_INIT = os.getenv("LAZY_INIT", "false").lower() == "true"
+    WARMUP_ENDPOINT_ENABLED = (
+        os.getenv("WARMUP_ENDPOINT_ENABLED", "false").lower() == "true"
+    )
+    # Assistant runs in flight per worker; turns of one session always run in order
+    CHAT_MAX_CONCURRENT_RUNS = int(os.getenv("CHAT_MAX_CONCURRENT_RUNS", "32"))
+    # Seconds a chat turn may wait for its session and a free run slot
+    CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "60"))
+    CHAT_RETRY_AFTER = int(os.getenv("CHAT_RETRY_AFTER", "5"))
+    # Tool calls of one assistant run step executed at once
+    TOOL_MAX_CONCURRENT_CALLS = int(os.getenv("TOOL_MAX_CONCURRENT_CALLS", "8"))
+    # Seconds a tool result is reused for the same call in the same conversation
+    TOOL_MEMO_TTL = float(os.getenv("TOOL_MEMO_TTL", "300"))
+    TOOL_MEMO_MAX_ENTRIES = int(os.getenv("TOOL_MEMO_MAX_ENTRIES", "100"))
+    TOOL_MEMO_MAX_BYTES = int(os.getenv("TOOL_MEMO_MAX_BYTES", str(1024 * 1024)))
+    TOOL_MEMO_MAX_SESSIONS = int(os.getenv("TOOL_MEMO_MAX_SESSIONS", "1000"))
+    # Comma separated tools whose results are never reused
+    TOOL_MEMO_EXCLUDE = os.getenv("TOOL_MEMO_EXCLUDE", "get_more_results")
+    # Seconds a chat response is replayed to requests repeating its idempotency key
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))
+    IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+    SYNC_WORKER_THREADS = int(os.getenv("SYNC_WORKER_THREADS", "16"))
 
 
 settings = Settings()
@@ -0,0 +1,150 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from api.utils.single_flight import SingleFlight
+
+
+def agent_size(agent: Any) -> int:
+    """Rough bytes held by one agent; shared client, assistant and tools count shallowly"""
+    return sys.getsizeof(agent) + sum(
+        sys.getsizeof(value) for value in vars(agent).values()
+    )
+
+
+class CachedAgent:
+    """A live agent and the requests using it"""
+
+    __slots__ = ("agent", "size", "last_used", "users", "evicted")
+
+    def __init__(self, agent: Any, size: int):
+        self.agent = agent
+        self.size = size
+        self.last_used = time.monotonic()
+        self.users = 0
+        self.evicted = False
+
+
+class AgentCache:
+    """Bounded cache of live agents keyed by (session_id, api_id).
+
+    Entries idle for longer than idle_ttl expire, and least recently used
+    entries are evicted beyond max_entries or max_bytes. Entries in use by a
+    request are never evicted, so a session never gets two agents at once.
+    Concurrent misses for the same key build a single agent.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        idle_ttl: float = 1800.0,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = agent_size,
+    ):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._entries: "OrderedDict[Hashable, CachedAgent]" = OrderedDict()
+        self._builds = SingleFlight()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.build_seconds = 0.0
+
+    async def acquire(
+        self, key: Hashable, build: Callable[[], Awaitable[Any]]
+    ) -> CachedAgent:
+        """Return the cached agent for key, building it on a miss.
+
+        The caller must pass the entry to release() when done with it.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(entry, time.monotonic()):
+            self._remove(key)
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            entry = await self._builds.do(key, lambda: self._build(key, build))
+        else:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        entry.users += 1
+        entry.last_used = time.monotonic()
+        return entry
+
+    def release(self, entry: CachedAgent) -> None:
+        entry.users -= 1
+        if entry.evicted:
+            # Discarded while in use, and already out of the cache
+            return
+        entry.last_used = time.monotonic()
+        self._evict()
+
+    async def _build(
+        self, key: Hashable, build: Callable[[], Awaitable[Any]]
+    ) -> CachedAgent:
+        started = time.monotonic()
+        agent = await build()
+        self.build_seconds += time.monotonic() - started
+        entry = CachedAgent(agent, self._sizeof(agent))
+        self._entries[key] = entry
+        self.bytes += entry.size
+        self._evict()
+        return entry
+
+    def _expired(self, entry: CachedAgent, now: float) -> bool:
+        return entry.users == 0 and now - entry.last_used > self.idle_ttl
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self.bytes -= entry.size
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if self._expired(e, now)]:
+            self._remove(key)
+            self.expirations += 1
+        # Oldest first, skipping agents a request is still using
+        idle = [key for key, entry in self._entries.items() if entry.users == 0]
+        for key in idle:
+            if len(self._entries) <= self.max_entries and (
+                self.max_bytes is None or self.bytes <= self.max_bytes
+            ):
+                break
+            self._remove(key)
+            self.evictions += 1
+
+    def discard(self, match: Callable[[Hashable], bool]) -> None:
+        """Drop every entry whose key matches, e.g. all agents of a session.
+
+        Entries in use are marked evicted and left to their requests, so the
+        next acquire builds a new agent.
+        """
+        for key in [k for k in self._entries if match(k)]:
+            self._entries[key].evicted = True
+            self._remove(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        builds = self._builds.calls
+        average_build = self.build_seconds / builds if builds else 0.0
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "builds": builds,
+            "average_build_seconds": average_build,
+            # Every hit skips one build
+            "seconds_saved": self.hits * average_build,
+        }
@@ -1,65 +1,352 @@
-from llama_index.agent.openai import OpenAIAssistantAgent
-from typing import Dict
-from api.core.langfuse_integration import instrumentor
-from api.core.assistant_factory import assistant_factory
+import time
+from contextlib import aclosing, asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+from api.config.settings import settings
+from api.core.langfuse_integration import get_instrumentor
+from api.core.agent_cache import AgentCache
+from api.core.model_router import ModelRouter, TierStats, parse_prices
+from api.db.session_store import session_store
+from api.models.thread_models import UserThread
+from api.utils.auth import spotify_token_provider, token_verifier
+from api.utils.compaction import tool_output_compactor
+from api.utils.concurrency import run_sync
+from api.utils.idempotency import IdempotencyStore
+from api.utils.session_gate import ChatQueueTimeout, SessionGate
+from api.utils.sse import StreamStats
+from api.utils.step_timing import tool_step_stats
+from api.utils.tool_memo import tool_memo
+
+
+class _TurnFailed(Exception):
+    """The assistant run of a turn failed; the cause is chained"""
+
+
+class SessionForbidden(Exception):
+    """Raised when a request names a session that belongs to another user"""
+
+    def __init__(self):
+        super().__init__("Session belongs to another user")
+
+
+def load_assistant_factory() -> Any:
+    """The assistant factory, imported on first use.
+
+    Importing it builds every tool schema and loads llama_index, which is
+    most of the cold start, so it happens on a worker thread.
+    """
+    from api.core.assistant_factory import assistant_factory
+
+    return assistant_factory
+
+
+def upstream_stats() -> Dict[str, Any]:
+    """Cache, scheduler and resilience counters of each upstream API.
+
+    The services are imported here so that importing the app stays light.
+    """
+    from api.services import spotify_service, ticketmaster_service
+
+    return {
+        "spotify": {
+            "cache": spotify_service.spotify_response_cache.stats(),
+            "single_flight": spotify_service.spotify_request_flight.stats(),
+            "batchers": {
+                kind: batcher.stats()
+                for kind, batcher in spotify_service.spotify_batchers.items()
+            },
+            "scheduler": spotify_service.spotify_scheduler.stats(),
+            "resilience": spotify_service.spotify_upstream.stats(),
+        },
+        "ticketmaster": {
+            "single_flight": ticketmaster_service.ticketmaster_request_flight.stats(),
+            "scheduler": ticketmaster_service.ticketmaster_scheduler.stats(),
+            "resilience": ticketmaster_service.ticketmaster_upstream.stats(),
+        },
+    }
 
 
 class AgentManager:
     def __init__(self):
-        self._thread_ids: Dict[str, str] = {}  # session_id -> thread_id
+        self._factory: Optional[Any] = None
+        self._agent_cache = AgentCache(
+            max_entries=settings.AGENT_CACHE_MAX_ENTRIES,
+            idle_ttl=settings.AGENT_CACHE_IDLE_TTL,
+            max_bytes=settings.AGENT_CACHE_MAX_BYTES,
+        )
+        self._gate = SessionGate(
+            max_concurrent=settings.CHAT_MAX_CONCURRENT_RUNS,
+            queue_timeout=settings.CHAT_QUEUE_TIMEOUT,
+        )
+        self._streams = StreamStats()
+        self._router = ModelRouter(enabled=settings.MODEL_ROUTING_ENABLED)
+        self._tiers = TierStats(parse_prices(settings.MODEL_PRICES))
+        self._idempotency = IdempotencyStore(
+            ttl=settings.IDEMPOTENCY_TTL, max_entries=settings.IDEMPOTENCY_MAX_ENTRIES
+        )
+
+    async def _get_factory(self) -> Any:
+        if self._factory is None:
+            self._factory = await run_sync(load_assistant_factory)
+        return self._factory
 
     def _get_agent_for_session(
-        self, session_id: str, api_id: str
-    ) -> OpenAIAssistantAgent:
-        """Get agent with the session's thread ID or create new one if first time"""
-        # Get the tools for this API
-        tools = assistant_factory._api_tools[api_id]
-
-        if session_id not in self._thread_ids:
-            # First time - create a new thread
-            agent = OpenAIAssistantAgent.from_existing(
-                assistant_id=assistant_factory.assistants[api_id],
-                tools=tools,
-                verbose=True,
-            )
-            print(agent.assistant.id)
-            self._thread_ids[session_id] = agent.thread_id
-            return agent
-
-        # Reuse existing thread with the requested assistant
-        return OpenAIAssistantAgent.from_existing(
-            assistant_id=assistant_factory.assistants[api_id],
-            thread_id=self._thread_ids[session_id],
-            tools=tools,
+        self, session_id: str, api_id: str, user_id: str, tier: Optional[str] = None
+    ):
+        """Build an agent on the session's thread, creating the thread the first time"""
+        from api.core.assistant_agent import AsyncAssistantAgent
+
+        assistant_factory = load_assistant_factory()
+        # The factory's client and assistant are shared by every agent
+        record = session_store.get(session_id)
+        if record is not None and record.user_id != user_id:
+            raise SessionForbidden()
+        assistant = assistant_factory.get_assistant(api_id, tier)
+        agent = AsyncAssistantAgent(
+            assistant_factory.client,
+            assistant,
+            tools=assistant_factory._api_tools[api_id],
+            thread_id=record.thread_id if record else None,
             verbose=True,
         )
+        # Tool results are shared by the services of a session, which share its thread
+        agent.memo_scope = (session_id, agent.thread_id)
+        if record is None:
+            session_store.put(
+                UserThread(
+                    session_id=session_id,
+                    user_id=user_id,
+                    api_id=api_id,
+                    assistant_id=assistant.id,
+                    thread_id=agent.thread_id,
+                )
+            )
+        return agent
 
-    def cleanup_session(self, session_id: str) -> None:
-        """Clean up thread for a specific session"""
-        if session_id in self._thread_ids:
-            del self._thread_ids[session_id]
+    def cleanup_session(self, session_id: str, user_id: Optional[str] = None) -> None:
+        """Clean up thread for a specific session, if user_id owns it"""
+        record = session_store.get(session_id)
+        if user_id is not None and record is not None and record.user_id != user_id:
+            raise SessionForbidden()
+        session_store.delete(session_id)
+        self._agent_cache.discard(lambda key: key[0] == session_id)
+        tool_memo.discard(session_id)
+        self._router.forget(session_id)
 
     async def process_message(
-        self, api_id: str, message: str, session_id: str, user_id: str
+        self,
+        api_id: str,
+        message: str,
+        session_id: str,
+        user_id: str,
+        idempotency_key: Optional[str] = None,
     ) -> str:
-        """Process a message using the specified agent"""
-        if api_id not in assistant_factory.assistants:
+        """Process a message using the specified agent.
+
+        Requests repeating an idempotency key share the first one's run and
+        response instead of starting another run on the thread.
+        """
+        assistant_factory = await self._get_factory()
+        if api_id not in assistant_factory.api_ids:
             raise ValueError(f"No assistant found for API {api_id}")
 
-        agent = self._get_agent_for_session(session_id, api_id)
+        def turn():
+            return self._gated_turn(api_id, message, session_id, user_id)
+
+        try:
+            if idempotency_key is None:
+                return await turn()
+            return await self._idempotency.do(
+                (user_id, session_id, api_id, idempotency_key), message, turn
+            )
+        except _TurnFailed as e:
+            print(f"Error processing message: {e.__cause__}")
+            return "Sorry, there was an error processing your message."
 
-        with instrumentor.observe(
-            user_id=user_id,
-            session_id=session_id,
-        ) as trace:
+    async def _gated_turn(
+        self, api_id: str, message: str, session_id: str, user_id: str
+    ) -> str:
+        # Turns of a session run in order, and only so many run at once
+        async with self._gate.slot(session_id):
+            return await self._run_turn(api_id, message, session_id, user_id)
+
+    def _route(self, api_id: str, message: str, session_id: str) -> Tuple[str, str]:
+        """The model tier and model that should answer message"""
+        tiers = self._factory.tiers(api_id)
+        tier = self._router.route(
+            list(tiers), message, session_id, self._factory.default_tier(api_id)
+        )
+        return tier, tiers[tier]
+
+    def _record_turn(
+        self,
+        session_id: str,
+        tier: str,
+        model: str,
+        agent: Any,
+        seconds: float,
+        tool_calls: int,
+    ) -> None:
+        self._tiers.record(tier, model, seconds, getattr(agent, "last_usage", None))
+        self._router.record(session_id, tool_calls)
+
+    @asynccontextmanager
+    async def _session_agent(
+        self, api_id: str, session_id: str, user_id: str, tier: str
+    ) -> AsyncIterator[Any]:
+        """The session's agent for api_id and tier, traced and held for one turn"""
+        # Building the agent calls OpenAI synchronously, keep it off the event loop
+        # Keyed by user too, so a cached agent is never handed to another user
+        entry = await self._agent_cache.acquire(
+            (session_id, user_id, api_id, tier),
+            lambda: run_sync(
+                self._get_agent_for_session, session_id, api_id, user_id, tier
+            ),
+        )
+        # Buffered by the store, so this does not wait for the backend
+        session_store.touch(session_id)
+        try:
+            instrumentor = await run_sync(get_instrumentor)
+            with instrumentor.observe(user_id=user_id, session_id=session_id):
+                yield entry.agent
+        finally:
+            self._agent_cache.release(entry)
+
+    async def _run_turn(
+        self, api_id: str, message: str, session_id: str, user_id: str
+    ) -> str:
+        tier, model = self._route(api_id, message, session_id)
+        async with self._session_agent(api_id, session_id, user_id, tier) as agent:
+            started = time.perf_counter()
             try:
                 response = await agent.achat(message)
-                if isinstance(response, dict) and "content" in response:
-                    return str(response["content"])
-                return str(response)
             except Exception as e:
-                print(f"Error processing message: {e}")
-                return "Sorry, there was an error processing your message."
+                # Not stored for idempotent retries, which run the turn again
+                raise _TurnFailed() from e
+            self._record_turn(
+                session_id,
+                tier,
+                model,
+                agent,
+                time.perf_counter() - started,
+                len(getattr(response, "sources", None) or []),
+            )
+            if isinstance(response, dict) and "content" in response:
+                return str(response["content"])
+            return str(response)
+
+    async def stream_message(
+        self, api_id: str, message: str, session_id: str, user_id: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Process a message, yielding run, tool and text events as they happen.
+
+        The first event is sent before waiting for the session or the
+        assistant. Every event's data carries "elapsed", the seconds since the
+        request started, and failures end the stream with an "error" event.
+        """
+        started = time.perf_counter()
+        first_token = None
+        finished = False
+
+        def timed(event: Dict[str, Any]) -> Dict[str, Any]:
+            event["data"]["elapsed"] = round(time.perf_counter() - started, 4)
+            return event
+
+        try:
+            yield timed({"event": "run", "data": {"status": "accepted"}})
+            try:
+                assistant_factory = await self._get_factory()
+                if api_id not in assistant_factory.api_ids:
+                    raise ValueError(f"No assistant found for API {api_id}")
+
+                async with self._gate.slot(session_id):
+                    tier, model = self._route(api_id, message, session_id)
+                    yield timed(
+                        {"event": "route", "data": {"tier": tier, "model": model}}
+                    )
+                    async with self._session_agent(
+                        api_id, session_id, user_id, tier
+                    ) as agent, aclosing(agent.astream_chat_events(message)) as events:
+                        run_started = time.perf_counter()
+                        tool_calls = 0
+                        async for event in events:
+                            if event["event"] == "delta" and first_token is None:
+                                first_token = time.perf_counter() - started
+                            tool_calls += event["event"] == "tool_result"
+                            if event["event"] == "done":
+                                self._record_turn(
+                                    session_id,
+                                    tier,
+                                    model,
+                                    agent,
+                                    time.perf_counter() - run_started,
+                                    tool_calls,
+                                )
+                            yield timed(event)
+            except ChatQueueTimeout as e:
+                yield timed(
+                    {
+                        "event": "error",
+                        "data": {
+                            "message": str(e),
+                            "retry_after": settings.CHAT_RETRY_AFTER,
+                        },
+                    }
+                )
+            except SessionForbidden as e:
+                yield timed({"event": "error", "data": {"message": str(e)}})
+            except Exception as e:
+                print(f"Error streaming message: {e}")
+                yield timed(
+                    {
+                        "event": "error",
+                        "data": {
+                            "message": "Sorry, there was an error processing your message."
+                        },
+                    }
+                )
+            finished = True
+        finally:
+            self._streams.record(time.perf_counter() - started, first_token, finished)
+
+    async def warm_up(self) -> Dict[str, float]:
+        """Load the agent stack, start tracing and get every assistant ready.
+
+        Returns the seconds each step took.
+        """
+        timings = {}
+        started = time.perf_counter()
+        assistant_factory = await self._get_factory()
+        timings["tools"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await run_sync(get_instrumentor)
+        timings["tracing"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await assistant_factory.aensure_assistants()
+        timings["assistants"] = time.perf_counter() - started
+        return timings
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "chats": self._gate.stats(),
+            "streams": self._streams.stats(),
+            "tool_steps": tool_step_stats.stats(),
+            "tool_memo": tool_memo.stats(),
+            "idempotency": self._idempotency.stats(),
+            "models": {**self._router.stats(), "tiers": self._tiers.stats()},
+            "agents": self._agent_cache.stats(),
+            "sessions": session_store.stats(),
+            "compaction": tool_output_compactor.stats(),
+            "upstreams": upstream_stats(),
+            "auth": {
+                "spotify_token": spotify_token_provider.stats(),
+                "token_verifier": token_verifier.stats(),
+            },
+        }
+        if self._factory is not None:
+            stats["assistants"] = self._factory.stats()
+        return stats
 
 
 agent_manager = AgentManager()
@@ -0,0 +1,293 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional, Tuple, Union
+from llama_index.agent.openai import OpenAIAssistantAgent
+from llama_index.agent.openai.openai_assistant_agent import acall_function
+from llama_index.core.base.llms.types import ChatMessage
+from llama_index.core.chat_engine.types import (
+    AGENT_CHAT_RESPONSE_TYPE,
+    AgentChatResponse,
+    ChatResponseMode,
+)
+from llama_index.core.tools import ToolOutput
+from api.config.settings import settings
+from api.utils.concurrency import iterate_sync, run_sync, sync_executor
+from api.utils.step_timing import tool_step_stats
+from api.utils.tool_memo import tool_memo
+
+# Run statuses after which the run still holds the thread
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action")
+
+# Stream events carrying the run itself; step and message events are skipped
+RUN_EVENTS = frozenset(
+    f"thread.run.{status}"
+    for status in (
+        "created",
+        "queued",
+        "in_progress",
+        "requires_action",
+        "completed",
+        "incomplete",
+        "failed",
+        "cancelling",
+        "cancelled",
+        "expired",
+    )
+)
+
+
+def tool_failed(tool_output: ToolOutput) -> bool:
+    """Whether a call raised, or its service answered with an error dict"""
+    return tool_output.is_error or (
+        isinstance(tool_output.raw_output, dict) and "error" in tool_output.raw_output
+    )
+
+
+class AsyncAssistantAgent(OpenAIAssistantAgent):
+    """OpenAIAssistantAgent whose async paths never block the event loop.
+
+    The OpenAI SDK client held by the agent is synchronous, so every call to it
+    from achat is moved onto the bounded worker pool, while tool calls go
+    through the tools' native async functions. The tool calls of one run step
+    run concurrently; each service's scheduler bounds its own upstream.
+    Successful results are reused for identical calls within memo_scope.
+    """
+
+    def __init__(self, *args: Any, memo_scope: Optional[Hashable] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.memo_scope = memo_scope
+        # Token usage of the last finished run, for cost metrics
+        self.last_usage: Optional[Any] = None
+
+    async def _acall_tool(self, tool_call: Any) -> ToolOutput:
+        name, arguments = tool_call.function.name, tool_call.function.arguments
+        if self.memo_scope is not None:
+            tool_output = tool_memo.get(self.memo_scope, name, arguments)
+            if tool_output is not None:
+                return tool_output
+
+        _, tool_output = await acall_function(
+            self._tools, tool_call.function, verbose=self._verbose
+        )
+        if self.memo_scope is not None and not tool_failed(tool_output):
+            tool_memo.set(self.memo_scope, name, arguments, tool_output)
+        return tool_output
+
+    async def _acall_tools(
+        self, tool_calls: List[Any]
+    ) -> AsyncIterator[Tuple[int, ToolOutput, float]]:
+        """Call a step's tools concurrently.
+
+        Yields (index, output, seconds) for each call as it finishes; at most
+        TOOL_MAX_CONCURRENT_CALLS run at once.
+        """
+        limit = asyncio.Semaphore(settings.TOOL_MAX_CONCURRENT_CALLS)
+
+        async def call(index: int, tool_call: Any) -> Tuple[int, ToolOutput, float]:
+            async with limit:
+                started = time.perf_counter()
+                tool_output = await self._acall_tool(tool_call)
+                return index, tool_output, time.perf_counter() - started
+
+        tasks = [
+            asyncio.ensure_future(call(index, tool_call))
+            for index, tool_call in enumerate(tool_calls)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # A failed call or a closed stream leaves nothing running
+            for task in tasks:
+                task.cancel()
+
+    async def _arun_function_calling(self, run: Any) -> List[ToolOutput]:
+        """Run function calling."""
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        tool_output_objs: List[ToolOutput] = [None] * len(tool_calls)
+        durations = []
+        started = time.perf_counter()
+        async for index, tool_output, seconds in self._acall_tools(tool_calls):
+            tool_output_objs[index] = tool_output
+            durations.append(seconds)
+        tool_step_stats.record(durations, time.perf_counter() - started)
+
+        # Submitted together, in the order the assistant asked for them
+        tool_output_dicts = [
+            {"tool_call_id": tool_call.id, "output": str(tool_output)}
+            for tool_call, tool_output in zip(tool_calls, tool_output_objs)
+        ]
+        await run_sync(
+            self._client.beta.threads.runs.submit_tool_outputs,
+            thread_id=self._thread_id,
+            run_id=run.id,
+            tool_outputs=tool_output_dicts,
+        )
+        return tool_output_objs
+
+    async def arun_assistant(
+        self, instructions_prefix: Optional[str] = None
+    ) -> Tuple[Any, Dict]:
+        """Run assistant."""
+        instructions_prefix = instructions_prefix or self._instructions_prefix
+        run = await run_sync(
+            self._client.beta.threads.runs.create,
+            thread_id=self._thread_id,
+            assistant_id=self._assistant.id,
+            instructions=instructions_prefix,
+        )
+
+        sources = []
+        while run.status in ACTIVE_RUN_STATUSES:
+            run = await run_sync(
+                self._client.beta.threads.runs.retrieve,
+                thread_id=self._thread_id,
+                run_id=run.id,
+            )
+            if run.status == "requires_action":
+                cur_tool_outputs = await self._arun_function_calling(run)
+                sources.extend(cur_tool_outputs)
+
+            await asyncio.sleep(self._run_retrieve_sleep_time)
+        if run.status == "failed":
+            raise ValueError(
+                f"Run failed with status {run.status}.\n" f"Error: {run.last_error}"
+            )
+        return run, {"sources": sources}
+
+    async def _achat(
+        self,
+        message: str,
+        chat_history: Optional[List[ChatMessage]] = None,
+        function_call: Union[str, dict] = "auto",
+        mode: ChatResponseMode = ChatResponseMode.WAIT,
+    ) -> AGENT_CHAT_RESPONSE_TYPE:
+        """Asynchronous main chat interface."""
+        await run_sync(self.add_message, message)
+        run, metadata = await self.arun_assistant(
+            instructions_prefix=self._instructions_prefix,
+        )
+        self.last_usage = getattr(run, "usage", None)
+        latest_message = await run_sync(lambda: self.latest_message)
+        return AgentChatResponse(
+            response=str(latest_message.content),
+            sources=metadata["sources"],
+        )
+
+    def _abandon_run(self, streams: List[Any], run_id: Optional[str]) -> None:
+        """Cancel a run nobody is listening to, so the thread accepts the next one"""
+        try:
+            if run_id is not None:
+                self._client.beta.threads.runs.cancel(
+                    thread_id=self._thread_id, run_id=run_id
+                )
+        except Exception as e:
+            print(f"Could not cancel run {run_id}: {e}")
+        finally:
+            for stream in streams:
+                stream.close()
+
+    async def _astream_tool_calls(
+        self, run: Any, tool_outputs: List[Dict[str, str]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Call the tools a run asks for, with an event as each starts and ends.
+
+        A final "tool_step" event gives the step's wall and serial time.
+        """
+        tool_calls = run.required_action.submit_tool_outputs.tool_calls
+        for tool_call in tool_calls:
+            yield {
+                "event": "tool_call",
+                "data": {
+                    "id": tool_call.id,
+                    "name": tool_call.function.name,
+                    "arguments": tool_call.function.arguments,
+                },
+            }
+        outputs: List[Optional[str]] = [None] * len(tool_calls)
+        durations = []
+        started = time.perf_counter()
+        async for index, tool_output, seconds in self._acall_tools(tool_calls):
+            outputs[index] = str(tool_output)
+            durations.append(seconds)
+            yield {
+                "event": "tool_result",
+                "data": {
+                    "id": tool_calls[index].id,
+                    "name": tool_calls[index].function.name,
+                    "seconds": seconds,
+                    "error": tool_failed(tool_output),
+                },
+            }
+        step = tool_step_stats.record(durations, time.perf_counter() - started)
+        yield {"event": "tool_step", "data": step}
+        tool_outputs.extend(
+            {"tool_call_id": tool_call.id, "output": output}
+            for tool_call, output in zip(tool_calls, outputs)
+        )
+
+    async def astream_chat_events(self, message: str) -> AsyncIterator[Dict[str, Any]]:
+        """Chat through a streamed run, yielding its events as they arrive.
+
+        Yields {"event", "data"} dicts: "run" for each run status, "tool_call"
+        and "tool_result" around each tool call, "delta" for each piece of
+        assistant text and a final "done" with the whole response. Closing the
+        iterator early cancels the run.
+        """
+        await run_sync(self.add_message, message)
+        stream = await run_sync(
+            self._client.beta.threads.runs.create,
+            thread_id=self._thread_id,
+            assistant_id=self._assistant.id,
+            instructions=self._instructions_prefix,
+            stream=True,
+        )
+        current = None
+        run_id: Optional[str] = None
+        active = False
+        text: List[str] = []
+        try:
+            while stream is not None:
+                current, stream = stream, None
+                async for event in iterate_sync(current):
+                    if event.event == "error":
+                        raise ValueError(f"Run failed: {event.data.message}")
+                    if event.event == "thread.message.delta":
+                        for block in event.data.delta.content or []:
+                            if block.type == "text" and block.text and block.text.value:
+                                text.append(block.text.value)
+                                yield {"event": "delta", "data": {"text": text[-1]}}
+                    if event.event not in RUN_EVENTS:
+                        continue
+
+                    run = event.data
+                    run_id, active = run.id, run.status in ACTIVE_RUN_STATUSES
+                    if not active:
+                        self.last_usage = getattr(run, "usage", None)
+                    yield {"event": "run", "data": {"status": run.status}}
+                    if run.status == "failed":
+                        raise ValueError(
+                            f"Run failed with status {run.status}.\n"
+                            f"Error: {run.last_error}"
+                        )
+                    if run.status == "requires_action":
+                        tool_outputs: List[Dict[str, str]] = []
+                        async for tool_event in self._astream_tool_calls(
+                            run, tool_outputs
+                        ):
+                            yield tool_event
+                        # The run continues on a new stream once this one ends
+                        stream = await run_sync(
+                            self._client.beta.threads.runs.submit_tool_outputs,
+                            thread_id=self._thread_id,
+                            run_id=run.id,
+                            tool_outputs=tool_outputs,
+                            stream=True,
+                        )
+            active = False
+            yield {"event": "done", "data": {"response": "".join(text)}}
+        finally:
+            if active:
+                # Cleanup must not await, the caller may be cancelled
+                streams = [s for s in (current, stream) if s is not None]
+                sync_executor.submit(self._abandon_run, streams, run_id)
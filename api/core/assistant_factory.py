@@ -1,20 +1,129 @@
-from llama_index.agent.openai import OpenAIAssistantAgent
-from typing import Dict
+import asyncio
+import hashlib
+import json
+import threading
+from openai import NotFoundError, OpenAI
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 import yaml
 from pathlib import Path
+from api.config.settings import settings
+from api.core.model_router import parse_tiers
 from api.tools.spotify_tools import spotify_tools
 from api.tools.ticketmaster_tools import ticketmaster_tools
+from api.utils.concurrency import run_sync
+
+
+class AssistantRegistry:
+    """Remembers which assistant was created for each configuration hash.
+
+    Assistants are tagged with their hash in OpenAI metadata, so they are
+    found again after a cold start. An optional JSON file at `path` saves
+    the lookup through the assistants list.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._entries: Optional[Dict[str, str]] = None  # config hash -> assistant id
+        self._listed: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, str]:
+        if self._entries is None:
+            self._entries = {}
+            if self.path is not None and self.path.exists():
+                try:
+                    self._entries = json.loads(self.path.read_text())
+                except (OSError, ValueError) as e:
+                    print(f"Ignoring assistant registry {self.path}: {e}")
+        return self._entries
+
+    def _list_tagged(self, client: OpenAI) -> Dict[str, str]:
+        """Hashes of the account's assistants, listed once per process"""
+        if self._listed is None:
+            self._listed = {}
+            for assistant in client.beta.assistants.list(limit=100):
+                config_hash = (assistant.metadata or {}).get("config_hash")
+                if config_hash:
+                    self._listed.setdefault(config_hash, assistant.id)
+        return self._listed
+
+    def find(self, client: OpenAI, config_hash: str) -> Optional[Any]:
+        """The existing assistant for config_hash, or None"""
+        with self._lock:
+            assistant_id = self._load().get(config_hash)
+        if assistant_id is not None:
+            try:
+                return client.beta.assistants.retrieve(assistant_id)
+            except NotFoundError:
+                # Deleted in OpenAI, look for another copy or create it again
+                self.forget(config_hash)
+        with self._lock:
+            assistant_id = self._list_tagged(client).get(config_hash)
+        if assistant_id is None:
+            return None
+        assistant = client.beta.assistants.retrieve(assistant_id)
+        self.record(config_hash, assistant.id)
+        return assistant
+
+    def record(self, config_hash: str, assistant_id: str) -> None:
+        with self._lock:
+            self._load()[config_hash] = assistant_id
+            self._save()
+
+    def forget(self, config_hash: str) -> None:
+        with self._lock:
+            self._load().pop(config_hash, None)
+            if self._listed is not None:
+                self._listed.pop(config_hash, None)
+            self._save()
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self.path.write_text(json.dumps(self._entries, indent=2, sort_keys=True))
+        except OSError as e:
+            # Read-only deployments still find assistants through their metadata
+            print(f"Could not write assistant registry {self.path}: {e}")
 
 
 class AssistantFactory:
-    def __init__(self):
+    """Creates each service's assistants on first use and reuses them across restarts.
+
+    A service has one assistant per model tier. Tiers come from the service's
+    "tiers" in assistant_instructions.yaml, or MODEL_TIERS. An assistant is
+    identified by a hash of its name, instructions, model and tool schemas,
+    so it is only created again when one of them changes.
+    """
+
+    def __init__(self, registry: Optional[AssistantRegistry] = None):
         self._api_tools = {
             "spotify": spotify_tools,
             "ticketmaster": ticketmaster_tools,
         }
         self._load_instructions()
-        self.assistants: Dict[str, str] = {}  # api_id -> assistant_id
-        self._initialize_assistants()
+        self._registry = registry or AssistantRegistry(settings.ASSISTANT_REGISTRY_PATH)
+        self._client: Optional[OpenAI] = None
+        self._client_lock = threading.Lock()
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._default_tiers = parse_tiers(settings.MODEL_TIERS)
+        self._assistants: Dict[Tuple[str, str], Any] = {}  # (api_id, tier) -> assistant
+        # api_id, or "api_id:tier" beyond the default tier -> assistant_id
+        self.assistants: Dict[str, str] = {}
+        self.created = 0
+        self.reused = 0
+
+    @property
+    def api_ids(self) -> Iterable[str]:
+        return self._api_tools.keys()
+
+    @property
+    def client(self) -> OpenAI:
+        """OpenAI client shared by the assistants and their agents"""
+        with self._client_lock:
+            if self._client is None:
+                self._client = OpenAI()
+            return self._client
 
     def _load_instructions(self) -> None:
         """Load assistant instructions from YAML file"""
@@ -24,26 +133,89 @@ class AssistantFactory:
         with open(docs_path) as f:
             self._api_instructions = yaml.safe_load(f)
 
-    def _create_assistant(self, api_id: str) -> str:
-        """Create a new assistant and return its ID"""
-        tools = self._api_tools[api_id]
+    def tiers(self, api_id: str) -> Dict[str, str]:
+        """The service's model tiers, cheapest first, by name"""
+        return self._api_instructions.get(api_id, {}).get(
+            "tiers", self._default_tiers
+        ) or {settings.MODEL_DEFAULT_TIER: settings.ASSISTANT_MODEL}
+
+    def default_tier(self, api_id: str) -> str:
+        tiers = list(self.tiers(api_id))
+        return (
+            settings.MODEL_DEFAULT_TIER
+            if settings.MODEL_DEFAULT_TIER in tiers
+            else tiers[-1]
+        )
+
+    def _config(self, api_id: str, tier: Optional[str] = None) -> Dict[str, Any]:
+        """Everything the assistant is created from"""
+        tier = tier or self.default_tier(api_id)
         instructions = self._api_instructions.get(api_id, {}).get(
             "instructions", self._api_instructions["default"]["instructions"]
         )
-        instructions = instructions.format(api_name=api_id.title())
-        agent = OpenAIAssistantAgent.from_new(
-            name=f"{api_id.title()} Assistant",
-            instructions=instructions,
-            tools=tools,
-            model="gpt-4o",
-            verbose=True,
+        name = f"{api_id.title()} Assistant"
+        if tier != self.default_tier(api_id):
+            name += f" ({tier})"
+        return {
+            "name": name,
+            "instructions": instructions.format(api_name=api_id.title()),
+            "model": self.tiers(api_id)[tier],
+            "tools": [
+                tool.metadata.to_openai_tool() for tool in self._api_tools[api_id]
+            ],
+        }
+
+    @staticmethod
+    def config_hash(config: Dict[str, Any]) -> str:
+        payload = json.dumps(config, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _create_assistant(self, api_id: str, config: Dict[str, Any], config_hash: str):
+        """Create a new assistant tagged with its configuration hash"""
+        assistant = self.client.beta.assistants.create(
+            **config, metadata={"api_id": api_id, "config_hash": config_hash}
         )
-        return agent.assistant.id
+        self._registry.record(config_hash, assistant.id)
+        self.created += 1
+        print(f"Created {api_id} assistant {assistant.id}")
+        return assistant
+
+    def get_assistant(self, api_id: str, tier: Optional[str] = None) -> Any:
+        """The assistant for api_id and tier, reused when its configuration is unchanged"""
+        key = (api_id, tier or self.default_tier(api_id))
+        if key in self._assistants:
+            return self._assistants[key]
+        with self._client_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._assistants:
+                config = self._config(*key)
+                config_hash = self.config_hash(config)
+                assistant = self._registry.find(self.client, config_hash)
+                if assistant is None:
+                    assistant = self._create_assistant(api_id, config, config_hash)
+                else:
+                    self.reused += 1
+                self._assistants[key] = assistant
+                name = api_id if key[1] == self.default_tier(api_id) else ":".join(key)
+                self.assistants[name] = assistant.id
+        return self._assistants[key]
 
-    def _initialize_assistants(self) -> None:
-        """Initialize all assistants at startup"""
-        for api_id in self._api_tools:
-            self.assistants[api_id] = self._create_assistant(api_id)
+    async def aensure_assistants(self, api_ids: Optional[Iterable[str]] = None) -> None:
+        """Find or create the assistants of every tier at once, off the event loop"""
+        keys: List[Tuple[str, str]] = [
+            (api_id, tier)
+            for api_id in api_ids or self.api_ids
+            for tier in self.tiers(api_id)
+        ]
+        await asyncio.gather(*[run_sync(self.get_assistant, *key) for key in keys])
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": sorted(self.assistants),
+            "created": self.created,
+            "reused": self.reused,
+        }
 
 
 assistant_factory = AssistantFactory()
@@ -1,11 +1,27 @@
-from langfuse.llama_index import LlamaIndexInstrumentor
+import threading
+from typing import Any, Optional
 from api.config.settings import settings
 
-instrumentor = LlamaIndexInstrumentor(
-    public_key=settings.LANGFUSE_PUBLIC_KEY,
-    secret_key=settings.LANGFUSE_SECRET_KEY,
-    host=settings.LANGFUSE_HOST,
-)
+_instrumentor: Optional[Any] = None
+_lock = threading.Lock()
 
-# Start tracing
-instrumentor.start()
+
+def get_instrumentor() -> Any:
+    """Langfuse instrumentor, created and started on first use.
+
+    Importing langfuse pulls in llama_index, so it stays off the import path.
+    """
+    global _instrumentor
+    with _lock:
+        if _instrumentor is None:
+            from langfuse.llama_index import LlamaIndexInstrumentor
+
+            instrumentor = LlamaIndexInstrumentor(
+                public_key=settings.LANGFUSE_PUBLIC_KEY,
+                secret_key=settings.LANGFUSE_SECRET_KEY,
+                host=settings.LANGFUSE_HOST,
+            )
+            # Start tracing
+            instrumentor.start()
+            _instrumentor = instrumentor
+        return _instrumentor
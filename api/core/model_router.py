@@ -0,0 +1,174 @@
+import math
+import re
+import threading
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Questions answered by one lookup, e.g. "how long is Bohemian Rhapsody?"
+LOOKUP_PATTERN = re.compile(
+    r"\b(how long|length|duration|release date|released|when is|when does|"
+    r"what time|where is|popularity|followers|genres?|capacity|address|"
+    r"price range|tracks? count|how many tracks)\b",
+    re.IGNORECASE,
+)
+
+# Requests that need planning over several results
+COMPLEX_PATTERN = re.compile(
+    r"\b(recommend|suggest|plan|compare|similar|playlist for|why|explain|"
+    r"itinerary|best|difference|between|instead|based on)\b",
+    re.IGNORECASE,
+)
+
+LONG_MESSAGE_WORDS = 40
+VERY_LONG_MESSAGE_WORDS = 120
+# A previous turn with this many tool calls marks an involved conversation
+BUSY_TURN_TOOL_CALLS = 3
+
+
+def parse_tiers(value: str) -> Dict[str, str]:
+    """Parse tiers like "fast=gpt-4o-mini,standard=gpt-4o", cheapest first"""
+    tiers = {}
+    for item in value.split(","):
+        name, _, model = item.partition("=")
+        if name.strip() and model.strip():
+            tiers[name.strip()] = model.strip()
+    return tiers
+
+
+def parse_prices(value: str) -> Dict[str, Tuple[float, float]]:
+    """Parse USD per million input/output tokens like "gpt-4o=2.50/10.00" """
+    prices = {}
+    for item in value.split(","):
+        model, _, price = item.partition("=")
+        prompt, _, completion = price.partition("/")
+        if model.strip() and prompt.strip() and completion.strip():
+            prices[model.strip()] = (float(prompt), float(completion))
+    return prices
+
+
+class ModelRouter:
+    """Picks a model tier for each message from cheap local signals.
+
+    A message scores a point for each sign of work: many words, asking to
+    recommend or compare, several questions, or a previous turn in the
+    session that needed many tool calls. Longer messages that are not a
+    recognizable lookup score at least one. The score picks a tier from the
+    cheapest (0) to the strongest (2), so services with two tiers send only
+    plain lookups and short requests to the cheap one.
+    """
+
+    def __init__(self, enabled: bool = True, max_sessions: int = 10000):
+        self.enabled = enabled
+        self.max_sessions = max_sessions
+        self._tool_calls: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.routed: Dict[str, int] = {}
+
+    def score(self, message: str, session_id: Optional[str] = None) -> int:
+        words = len(message.split())
+        score = 0
+        if words > VERY_LONG_MESSAGE_WORDS:
+            score += 2
+        elif words > LONG_MESSAGE_WORDS:
+            score += 1
+        if COMPLEX_PATTERN.search(message):
+            score += 1
+        if message.count("?") > 1:
+            score += 1
+        with self._lock:
+            previous = self._tool_calls.get(session_id, 0)
+        if previous >= BUSY_TURN_TOOL_CALLS:
+            score += 1
+        if score == 0 and not LOOKUP_PATTERN.search(message) and words > 12:
+            # Neither a recognizable lookup nor clearly involved
+            score = 1
+        return min(score, 2)
+
+    def route(
+        self,
+        tiers: Sequence[str],
+        message: str,
+        session_id: Optional[str] = None,
+        default: Optional[str] = None,
+    ) -> str:
+        """The tier of `tiers`, ordered cheapest first, that should answer message.
+
+        With routing disabled every message goes to default, or the strongest tier.
+        """
+        if not self.enabled or len(tiers) == 1:
+            tier = default if default in tiers else tiers[-1]
+        else:
+            score = self.score(message, session_id)
+            tier = tiers[math.ceil(score * (len(tiers) - 1) / 2)]
+        self.routed[tier] = self.routed.get(tier, 0) + 1
+        return tier
+
+    def record(self, session_id: str, tool_calls: int) -> None:
+        """Remember how many tool calls the session's last turn made"""
+        with self._lock:
+            self._tool_calls[session_id] = tool_calls
+            self._tool_calls.move_to_end(session_id)
+            while len(self._tool_calls) > self.max_sessions:
+                self._tool_calls.popitem(last=False)
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._tool_calls.pop(session_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "routed": dict(self.routed)}
+
+
+class TierStats:
+    """Latency, tokens and estimated cost of the turns each tier answered"""
+
+    def __init__(self, prices: Dict[str, Tuple[float, float]], window: int = 1000):
+        self._prices = prices
+        self._window = window
+        self._tiers: Dict[str, Dict[str, Any]] = {}
+
+    def record(
+        self, tier: str, model: str, seconds: float, usage: Optional[Any] = None
+    ) -> None:
+        stats = self._tiers.setdefault(
+            tier,
+            {
+                "model": model,
+                "turns": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cost_usd": 0.0,
+                "latencies": deque(maxlen=self._window),
+            },
+        )
+        stats["model"] = model
+        stats["turns"] += 1
+        stats["latencies"].append(seconds)
+        if usage is not None:
+            prompt = getattr(usage, "prompt_tokens", 0) or 0
+            completion = getattr(usage, "completion_tokens", 0) or 0
+            stats["prompt_tokens"] += prompt
+            stats["completion_tokens"] += completion
+            prompt_price, completion_price = self._prices.get(model, (0.0, 0.0))
+            stats["cost_usd"] += (
+                prompt * prompt_price + completion * completion_price
+            ) / 1_000_000
+
+    def stats(self) -> Dict[str, Any]:
+        result = {}
+        for tier, stats in self._tiers.items():
+            latencies: List[float] = sorted(stats["latencies"])
+            result[tier] = {
+                key: value for key, value in stats.items() if key != "latencies"
+            }
+            result[tier].update(
+                {
+                    "cost_per_turn_usd": stats["cost_usd"] / stats["turns"],
+                    "latency_seconds": {
+                        "average": sum(latencies) / len(latencies),
+                        "p95": latencies[int(len(latencies) * 0.95)],
+                        "max": latencies[-1],
+                    },
+                }
+            )
+        return result
@@ -0,0 +1,414 @@
+import abc
+import asyncio
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from api.config.settings import settings
+from api.models.thread_models import UserThread, utcnow
+from api.utils.concurrency import run_sync
+
+
+class SessionStore(abc.ABC):
+    """Maps a chat session to its OpenAI thread.
+
+    Backends implement get, put_many, delete_many and sweep. startup() runs
+    a background task that flushes pending writes every flush_interval
+    seconds and removes sessions idle for longer than idle_ttl.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = 86400.0,
+        flush_interval: float = 1.0,
+        sweep_interval: float = 300.0,
+    ):
+        self.idle_ttl = idle_ttl
+        self.flush_interval = flush_interval
+        self.sweep_interval = sweep_interval
+        self._worker: Optional[asyncio.Task] = None
+        self.swept = 0
+
+    @abc.abstractmethod
+    def get(self, session_id: str) -> Optional[UserThread]:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def put_many(self, records: List[UserThread]) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def delete_many(self, session_ids: List[str]) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def sweep(self, idle_ttl: float) -> int:
+        """Remove sessions unused for idle_ttl seconds, returning how many"""
+        raise NotImplementedError
+
+    def put(self, record: UserThread) -> None:
+        self.put_many([record])
+
+    def delete(self, session_id: str) -> None:
+        self.delete_many([session_id])
+
+    def touch(self, session_id: str) -> None:
+        """Mark a session as used now"""
+        record = self.get(session_id)
+        if record is not None:
+            self.put(record.model_copy(update={"last_used_at": utcnow()}))
+
+    def flush(self) -> None:
+        """Write pending changes to the backend, a no-op unless writes are buffered"""
+
+    async def startup(self) -> None:
+        if self._worker is None:
+            self._worker = asyncio.ensure_future(self._run())
+
+    async def shutdown(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        await run_sync(self.flush)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_sweep = loop.time() + self.sweep_interval
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await run_sync(self.flush)
+                if loop.time() >= next_sweep:
+                    next_sweep = loop.time() + self.sweep_interval
+                    self.swept += await run_sync(self.sweep, self.idle_ttl)
+            except Exception as e:
+                print(f"Session store maintenance failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"swept": self.swept}
+
+
+class MemorySessionStore(SessionStore):
+    """In-process store bounded by max_entries, least recently used first out"""
+
+    def __init__(self, max_entries: int = 10000, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_entries = max_entries
+        self._records: "OrderedDict[str, UserThread]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _idle(self, record: UserThread, now: datetime, idle_ttl: float) -> bool:
+        return now - record.last_used_at > timedelta(seconds=idle_ttl)
+
+    def get(self, session_id: str) -> Optional[UserThread]:
+        with self._lock:
+            record = self._records.get(session_id)
+            if record is None:
+                return None
+            if self._idle(record, utcnow(), self.idle_ttl):
+                del self._records[session_id]
+                return None
+            self._records.move_to_end(session_id)
+            return record
+
+    def put_many(self, records: List[UserThread]) -> None:
+        with self._lock:
+            for record in records:
+                self._records[record.session_id] = record
+                self._records.move_to_end(record.session_id)
+            while len(self._records) > self.max_entries:
+                self._records.popitem(last=False)
+                self.evictions += 1
+
+    def delete_many(self, session_ids: List[str]) -> None:
+        with self._lock:
+            for session_id in session_ids:
+                self._records.pop(session_id, None)
+
+    def sweep(self, idle_ttl: float) -> int:
+        now = utcnow()
+        with self._lock:
+            idle = [
+                session_id
+                for session_id, record in self._records.items()
+                if self._idle(record, now, idle_ttl)
+            ]
+            for session_id in idle:
+                del self._records[session_id]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "size": len(self._records),
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a local SQLite file, shared by the workers of one host"""
+
+    COLUMNS = (
+        "session_id",
+        "id",
+        "user_id",
+        "api_id",
+        "assistant_id",
+        "thread_id",
+        "created_at",
+        "last_used_at",
+    )
+
+    def __init__(self, path: str = "sessions.db", **kwargs: Any):
+        super().__init__(**kwargs)
+        self._connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS user_threads (
+                    session_id TEXT PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    user_id TEXT NOT NULL,
+                    api_id TEXT NOT NULL,
+                    assistant_id TEXT NOT NULL,
+                    thread_id TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used_at REAL NOT NULL
+                )"""
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS user_threads_last_used "
+                "ON user_threads (last_used_at)"
+            )
+
+    @staticmethod
+    def _to_row(record: UserThread) -> tuple:
+        return (
+            record.session_id,
+            str(record.id),
+            record.user_id,
+            record.api_id,
+            record.assistant_id,
+            record.thread_id,
+            record.created_at.timestamp(),
+            record.last_used_at.timestamp(),
+        )
+
+    def _from_row(self, row: tuple) -> UserThread:
+        values = dict(zip(self.COLUMNS, row))
+        for key in ("created_at", "last_used_at"):
+            values[key] = datetime.fromtimestamp(values[key], timezone.utc)
+        return UserThread(**values)
+
+    def get(self, session_id: str) -> Optional[UserThread]:
+        cutoff = utcnow().timestamp() - self.idle_ttl
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM user_threads "
+                "WHERE session_id = ? AND last_used_at >= ?",
+                (session_id, cutoff),
+            ).fetchone()
+        return self._from_row(row) if row else None
+
+    def put_many(self, records: List[UserThread]) -> None:
+        placeholders = ", ".join("?" for _ in self.COLUMNS)
+        with self._lock:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO user_threads ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                [self._to_row(record) for record in records],
+            )
+
+    def delete_many(self, session_ids: List[str]) -> None:
+        with self._lock:
+            self._connection.executemany(
+                "DELETE FROM user_threads WHERE session_id = ?",
+                [(session_id,) for session_id in session_ids],
+            )
+
+    def sweep(self, idle_ttl: float) -> int:
+        cutoff = utcnow().timestamp() - idle_ttl
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM user_threads WHERE last_used_at < ?", (cutoff,)
+            )
+        return cursor.rowcount
+
+
+class SupabaseSessionStore(SessionStore):
+    """Sessions in a Supabase table of UserThread rows, shared by every instance.
+
+    The table needs a unique session_id column for upserts.
+    """
+
+    def __init__(self, client: Any, table: str = "user_threads", **kwargs: Any):
+        super().__init__(**kwargs)
+        self._client = client
+        self.table = table
+
+    def get(self, session_id: str) -> Optional[UserThread]:
+        cutoff = utcnow() - timedelta(seconds=self.idle_ttl)
+        rows = (
+            self._client.table(self.table)
+            .select("*")
+            .eq("session_id", session_id)
+            .gte("last_used_at", cutoff.isoformat())
+            .limit(1)
+            .execute()
+            .data
+        )
+        return UserThread(**rows[0]) if rows else None
+
+    def put_many(self, records: List[UserThread]) -> None:
+        self._client.table(self.table).upsert(
+            [record.model_dump(mode="json") for record in records],
+            on_conflict="session_id",
+        ).execute()
+
+    def delete_many(self, session_ids: List[str]) -> None:
+        self._client.table(self.table).delete().in_("session_id", session_ids).execute()
+
+    def sweep(self, idle_ttl: float) -> int:
+        cutoff = utcnow() - timedelta(seconds=idle_ttl)
+        rows = (
+            self._client.table(self.table)
+            .delete()
+            .lt("last_used_at", cutoff.isoformat())
+            .execute()
+            .data
+        )
+        return len(rows or [])
+
+
+class CachedSessionStore(SessionStore):
+    """Read-through memory cache and write-behind buffer in front of a backend.
+
+    Writes land in the cache at once and reach the backend in batches of up
+    to batch_size on the next flush, so a chat turn never waits for them.
+    """
+
+    def __init__(
+        self,
+        backend: SessionStore,
+        cache: MemorySessionStore,
+        batch_size: int = 100,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.backend = backend
+        self.cache = cache
+        self.batch_size = batch_size
+        # session_id -> record to write, or None to delete
+        self._pending: Dict[str, Optional[UserThread]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.flushed = 0
+
+    def get(self, session_id: str) -> Optional[UserThread]:
+        record = self.cache.get(session_id)
+        if record is not None:
+            self.hits += 1
+            return record
+        with self._lock:
+            if session_id in self._pending:
+                # Written or deleted, but not flushed to the backend yet
+                return self._pending[session_id]
+        self.misses += 1
+        record = self.backend.get(session_id)
+        if record is not None:
+            self.cache.put(record)
+        return record
+
+    def put_many(self, records: List[UserThread]) -> None:
+        self.cache.put_many(records)
+        with self._lock:
+            for record in records:
+                self._pending[record.session_id] = record
+
+    def delete_many(self, session_ids: List[str]) -> None:
+        self.cache.delete_many(session_ids)
+        with self._lock:
+            for session_id in session_ids:
+                self._pending[session_id] = None
+
+    def touch(self, session_id: str) -> None:
+        """Mark a cached session as used now, without reading the backend"""
+        record = self.cache.get(session_id)
+        if record is not None:
+            self.put(record.model_copy(update={"last_used_at": utcnow()}))
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        items = list(pending.items())
+        try:
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start : start + self.batch_size]
+                records = [record for _, record in batch if record is not None]
+                deleted = [session_id for session_id, record in batch if record is None]
+                if records:
+                    self.backend.put_many(records)
+                if deleted:
+                    self.backend.delete_many(deleted)
+                self.flushed += len(batch)
+        except Exception:
+            with self._lock:
+                # Retry on the next flush unless the session changed meanwhile
+                for session_id, record in items:
+                    self._pending.setdefault(session_id, record)
+            raise
+
+    def sweep(self, idle_ttl: float) -> int:
+        self.cache.sweep(idle_ttl)
+        return self.backend.sweep(idle_ttl)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **super().stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "cache": self.cache.stats(),
+        }
+
+
+def create_session_store(backend: str = settings.SESSION_STORE) -> SessionStore:
+    """Build the configured store: "memory", "sqlite" or "supabase" """
+    options = {
+        "idle_ttl": settings.SESSION_IDLE_TTL,
+        "flush_interval": settings.SESSION_FLUSH_INTERVAL,
+        "sweep_interval": settings.SESSION_SWEEP_INTERVAL,
+    }
+    cache = MemorySessionStore(
+        max_entries=settings.SESSION_CACHE_MAX_ENTRIES, **options
+    )
+    if backend == "memory":
+        return cache
+    if backend == "sqlite":
+        store = SQLiteSessionStore(settings.SESSION_STORE_SQLITE_PATH, **options)
+    elif backend == "supabase":
+        from api.db.supabase_client import get_supabase
+
+        store = SupabaseSessionStore(
+            get_supabase(), table=settings.SESSION_STORE_TABLE, **options
+        )
+    else:
+        raise ValueError(f"Unknown session store: {backend}")
+    return CachedSessionStore(
+        store, cache, batch_size=settings.SESSION_WRITE_BATCH_SIZE, **options
+    )
+
+
+session_store = create_session_store()
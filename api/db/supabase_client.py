@@ -1,7 +1,13 @@
-from supabase import create_client
+from functools import lru_cache
 from api.config.settings import settings
 
-supabase = create_client(
-    settings.NEXT_PUBLIC_SUPABASE_URL,
-    settings.NEXT_PUBLIC_SUPABASE_ANON_KEY,
-)
+
+@lru_cache(maxsize=1)
+def get_supabase():
+    """Supabase client, created on first use to keep the import off cold starts"""
+    from supabase import create_client
+
+    return create_client(
+        settings.NEXT_PUBLIC_SUPABASE_URL,
+        settings.NEXT_PUBLIC_SUPABASE_ANON_KEY,
+    )
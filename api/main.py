@@ -1,11 +1,36 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from api.config.settings import settings
+from api.core.agent_manager import agent_manager
 from api.routes import api
-from api.core.assistant_factory import (
-    assistant_factory,
-)  # This will initialize assistants at import
-
-app = FastAPI(title="API Agent Platform", version="1.0")
+from api.db.session_store import session_store
+from api.utils.auth import token_verifier
+from api.utils.concurrency import bind_app_loop
+from api.utils.http_client import http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One warm connection pool shared by every chat on this worker
+    await http_client.startup()
+    # Blocking tool calls from worker threads run on this loop and its pool
+    bind_app_loop(asyncio.get_running_loop())
+    # Write-behind flushing and idle session sweeping
+    await session_store.startup()
+    # Warn once if asymmetric tokens cannot be verified locally
+    token_verifier.startup()
+    if not settings.LAZY_INIT:
+        # Serve only once the tools, tracing and assistants are ready
+        print("Warm-up:", await agent_manager.warm_up())
+    yield
+    bind_app_loop(None)
+    await session_store.shutdown()
+    await http_client.shutdown()
+
+
+app = FastAPI(title="API Agent Platform", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -17,9 +42,6 @@ app.add_middleware(
 
 app.include_router(api.router, prefix="/v1")
 
-# Print assistant IDs at startup for verification
-print("Initialized assistants:", assistant_factory.assistants)
-
 
 @app.get("/")
 def read_root():
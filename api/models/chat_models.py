@@ -1,6 +1,9 @@
+from typing import Optional
 from pydantic import BaseModel
 
 
 class ChatRequest(BaseModel):
     message: str
     sessionId: str  # New field for session management
+    # Retries sending the same key get the first request's response
+    idempotencyKey: Optional[str] = None
@@ -1,13 +1,19 @@
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, Field
+from datetime import datetime, timezone
 from typing import Optional
 from uuid import UUID, uuid4
 
 
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class UserThread(BaseModel):
-    id: UUID = uuid4()  # Default to new UUID if not provided
+    id: UUID = Field(default_factory=uuid4)  # New UUID for every record
+    session_id: Optional[str] = None
     user_id: str
     api_id: str
     assistant_id: str
     thread_id: str
-    created_at: datetime = datetime.utcnow()  # Set default to current UTC time
+    created_at: datetime = Field(default_factory=utcnow)
+    last_used_at: datetime = Field(default_factory=utcnow)
@@ -1,8 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Header
+from fastapi.responses import StreamingResponse
 from api.models.api_models import APIRegistration
 from api.models.chat_models import ChatRequest
-from api.core.agent_manager import agent_manager
+from api.config.settings import settings
+from api.core.agent_manager import SessionForbidden, agent_manager
 from api.utils.auth import verify_supabase_token
+from api.utils.idempotency import IdempotencyConflict
+from api.utils.session_gate import ChatQueueTimeout
+from api.utils.sse import encode_events
 import uuid
 
 router = APIRouter()
@@ -26,6 +32,7 @@ async def chat(
     service: str,
     request: ChatRequest,
     user_data: dict = Depends(verify_supabase_token),
+    idempotency_key: Optional[str] = Header(None),
 ):
     """Handle chat requests for any service"""
     try:
@@ -37,17 +44,57 @@ async def chat(
                 )
 
             response_text = await agent_manager.process_message(
-                service, request.message, request.sessionId, user_id
+                service,
+                request.message,
+                request.sessionId,
+                user_id,
+                idempotency_key=request.idempotencyKey or idempotency_key,
             )
             return {"response": response_text}
 
         raise HTTPException(status_code=400, detail="Unsupported service")
 
+    except HTTPException:
+        raise
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except SessionForbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    except ChatQueueTimeout as e:
+        raise HTTPException(
+            status_code=503,
+            detail=str(e),
+            headers={"Retry-After": str(settings.CHAT_RETRY_AFTER)},
+        )
     except Exception as e:
         print(f"Chat error: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@router.post("/{service}/chat/stream")
+async def chat_stream(
+    service: str,
+    request: ChatRequest,
+    user_data: dict = Depends(verify_supabase_token),
+):
+    """Stream a chat turn as Server-Sent Events"""
+    if service not in ["spotify", "ticketmaster"]:
+        raise HTTPException(status_code=400, detail="Unsupported service")
+    user_id = user_data.get("id")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="User ID not found in token")
+
+    events = agent_manager.stream_message(
+        service, request.message, request.sessionId, user_id
+    )
+    return StreamingResponse(
+        encode_events(events),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the events
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/agents")
 async def list_agents(user_data=Depends(verify_supabase_token)):
     """List available agents including predefined ones"""
@@ -58,6 +105,20 @@ async def list_agents(user_data=Depends(verify_supabase_token)):
         raise HTTPException(status_code=500, detail="Failed to list agents")
 
 
+@router.post("/warmup")
+async def warmup():
+    """Load agents and assistants ahead of the first chat, e.g. from a cron job"""
+    if not settings.WARMUP_ENDPOINT_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return {"seconds": await agent_manager.warm_up()}
+
+
+@router.get("/metrics")
+async def metrics(user_data=Depends(verify_supabase_token)):
+    """Agent cache hit rates, upstream API counters and the time they saved"""
+    return agent_manager.stats()
+
+
 @router.post("/{service}/cleanup-session")
 async def cleanup_session(
     service: str,
@@ -66,8 +127,10 @@ async def cleanup_session(
 ):
     """Clean up session resources when user leaves or refreshes the page"""
     try:
-        agent_manager.cleanup_session(session_id)
+        agent_manager.cleanup_session(session_id, user_data.get("id"))
         return {"message": "Session cleaned up successfully"}
+    except SessionForbidden as e:
+        raise HTTPException(status_code=403, detail=str(e))
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail="Failed to cleanup session")
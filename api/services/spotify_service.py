@@ -1,13 +1,29 @@
 import yaml
 from pathlib import Path
-import requests
-from functools import wraps
+import httpx
 from api.config.settings import settings
-from api.utils.auth import get_spotify_token
+from api.utils.batcher import MicroBatcher
+from api.utils.auth import spotify_token_provider
+from api.utils.concurrency import add_blocking_variants
+from api.utils.http_client import http_client
+from api.utils.pagination import PageCollector, spotify_next_request
+from api.utils.rate_limiter import RateLimitExceeded, UpstreamScheduler
+from api.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientUpstream,
+)
+from api.utils.projection import InvalidFieldsError, compile_fields, project
+from api.utils.response_cache import ResponseCache
+from api.utils.single_flight import SingleFlight
+from api.utils.streaming import aproject_response, streaming_available
 from typing_extensions import Annotated
 from pydantic import Field
-from typing import Dict, Any, List, Union
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Optional, Union
+import asyncio
 import json
+import re
 
 # Load documentation from YAML
 docs_path = Path(__file__).parent.parent / "docs" / "spotify_docs.yaml"
@@ -17,63 +33,301 @@ with open(docs_path, "r") as f:
 
 def with_yaml_doc(method_name):
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
-
         # Attach the documentation from YAML
-        wrapper.yaml_doc = SPOTIFY_DOCS[method_name]["method_doc"]
-        return wrapper
+        func.yaml_doc = SPOTIFY_DOCS[method_name]["method_doc"]
+        return func
 
     return decorator
 
 
+# Catalog payloads change rarely, so they are cached before field filtering
+spotify_response_cache = ResponseCache(
+    rules=[
+        ("tracks", r"tracks/[^/]+", settings.SPOTIFY_CACHE_TTL_TRACKS),
+        ("albums", r"albums/[^/]+(/tracks)?", settings.SPOTIFY_CACHE_TTL_ALBUMS),
+        ("artists", r"artists/[^/]+", settings.SPOTIFY_CACHE_TTL_ARTISTS),
+        (
+            "top_tracks",
+            r"artists/[^/]+/top-tracks",
+            settings.SPOTIFY_CACHE_TTL_TOP_TRACKS,
+        ),
+    ],
+    max_entries=settings.SPOTIFY_CACHE_MAX_ENTRIES,
+    max_bytes=settings.SPOTIFY_CACHE_MAX_BYTES,
+)
+
+spotify_request_flight = SingleFlight()
+
+spotify_scheduler = UpstreamScheduler(
+    "Spotify",
+    rate=settings.SPOTIFY_RATE_LIMIT,
+    burst=settings.SPOTIFY_RATE_BURST,
+    max_concurrency=settings.SPOTIFY_MAX_CONCURRENCY,
+    queue_timeout=settings.UPSTREAM_QUEUE_TIMEOUT,
+    max_retries=settings.UPSTREAM_MAX_429_RETRIES,
+)
+
+# Catalog reads are hedged at the observed p95 latency when enabled
+spotify_upstream = ResilientUpstream(
+    "Spotify",
+    CircuitBreaker(
+        "Spotify",
+        failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=settings.UPSTREAM_BREAKER_RECOVERY_TIMEOUT,
+    ),
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+    max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+    hedging=settings.SPOTIFY_HEDGING_ENABLED,
+    latency=LatencyTracker(min_samples=settings.HEDGING_MIN_SAMPLES),
+)
+
+# Multi-ID endpoints and the most IDs each accepts per request
+SPOTIFY_BATCH_LIMITS = {"tracks": 50, "artists": 50, "albums": 20}
+
+# Base62 catalog IDs; anything else would fail the whole multi-ID request
+SPOTIFY_ID_PATTERN = re.compile(r"[0-9A-Za-z]{22}")
+
+# Single-ID lookups arriving within a short window are sent as one multi-ID request
+spotify_batchers = {
+    kind: MicroBatcher(
+        lambda market, ids, kind=kind: SpotifyService._afetch_batch(kind, market, ids),
+        window=settings.SPOTIFY_BATCH_WINDOW,
+        max_batch_size=limit,
+    )
+    for kind, limit in SPOTIFY_BATCH_LIMITS.items()
+}
+
+
+# Each tool is written once as a coroutine, e.g. aget_track, with a generated
+# blocking variant, get_track, that runs the same code
+@add_blocking_variants
 class SpotifyService:
     @staticmethod
-    def _make_request(endpoint: str, params: dict = None) -> dict:
+    async def _amake_request(endpoint: str, params: dict = None) -> dict:
         """Helper method to make requests to Spotify API"""
-        access_token = get_spotify_token()
+        if settings.SPOTIFY_CACHE_ENABLED:
+            response = spotify_response_cache.get(endpoint, params)
+            if response is not None:
+                return response
+
+        async def fetch() -> dict:
+            response = await SpotifyService._asend_request(endpoint, params)
+            if settings.SPOTIFY_CACHE_ENABLED:
+                spotify_response_cache.set(endpoint, params, response)
+            return response
+
+        # Identical concurrent requests share one upstream call
+        key = ResponseCache.make_key(endpoint, params)
+        return await spotify_request_flight.do(key, fetch)
+
+    @staticmethod
+    async def _asend_request(
+        endpoint: str, params: dict = None, fields: str = None
+    ) -> dict:
+        """Send a request to Spotify API over the shared async pool.
+
+        With fields, the body is streamed and only the selected paths are decoded.
+        """
         url = f"{settings.SPOTIFY_API_BASE_URL}/{endpoint}"
-        headers = {"Authorization": f"Bearer {access_token}"}
+
+        async def send() -> httpx.Response:
+            token = await spotify_token_provider.aget_token()
+            headers = {"Authorization": f"Bearer {token}"}
+            if fields:
+                return await http_client.send_stream(
+                    "GET", url, headers=headers, params=params
+                )
+            return await http_client.get(url, headers=headers, params=params)
+
+        def scheduled_send() -> Awaitable[httpx.Response]:
+            return spotify_scheduler.run(send)
 
         try:
-            response = requests.get(url, headers=headers, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException:
+            response = await spotify_upstream.run(
+                scheduled_send, endpoint, hedge=not fields
+            )
+            if response.status_code == 401:
+                await response.aclose()
+                spotify_token_provider.invalidate()
+                response = await spotify_upstream.run(
+                    scheduled_send, endpoint, hedge=not fields
+                )
+            try:
+                response.raise_for_status()
+                if fields:
+                    return await aproject_response(
+                        response, fields, settings.STREAMING_PROJECTION_MIN_BYTES
+                    )
+                return response.json()
+            finally:
+                await response.aclose()
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            return {"error": str(e), "retry_after": round(e.retry_after)}
+        except (httpx.HTTPError, ValueError):
+            # ValueError: the body was not valid JSON
             return {"error": "Failed to fetch data from Spotify"}
 
     @staticmethod
-    def _filter_response(response: Dict[Any, Any], fields: str) -> Dict[Any, Any]:
-        def extract_fields(data, field_list):
-            if isinstance(data, dict):
-                filtered_data = {}
-                field_map = {}
+    async def _amake_projected_request(
+        endpoint: str, params: dict, fields: str
+    ) -> dict:
+        """Request only the selected fields, decoding uncached bodies incrementally"""
+        if (
+            not fields
+            or not settings.STREAMING_PROJECTION_ENABLED
+            or not streaming_available()
+            or spotify_response_cache.is_cacheable(endpoint)
+        ):
+            response = await SpotifyService._amake_request(endpoint, params)
+            return SpotifyService._filter_response(response, fields)
+
+        try:
+            compile_fields(fields)
+        except InvalidFieldsError as e:
+            return {"error": str(e)}
+        key = (ResponseCache.make_key(endpoint, params), fields)
+        return await spotify_request_flight.do(
+            key, lambda: SpotifyService._asend_request(endpoint, params, fields)
+        )
+
+    @staticmethod
+    def _entity_params(kind: str, market: Optional[str]) -> Optional[dict]:
+        """Params of the single-ID request an entity is fetched and cached under"""
+        return None if kind == "artists" else {"market": market}
+
+    @staticmethod
+    def _index_batch(
+        kind: str, ids: List[str], response: dict, params: Optional[dict]
+    ) -> Dict[str, Optional[dict]]:
+        """Map a multi-ID response back to its IDs and cache every entity"""
+        items = dict(zip(ids, response.get(kind, [])))
+        if settings.SPOTIFY_CACHE_ENABLED:
+            for id, item in items.items():
+                if item is not None:
+                    spotify_response_cache.set(f"{kind}/{id}", params, item)
+        return items
+
+    @staticmethod
+    async def _afetch_batch(
+        kind: str, market: Optional[str], ids: List[str]
+    ) -> Dict[str, Optional[dict]]:
+        """Batch function behind spotify_batchers, one multi-ID request.
+
+        A rejected batch is retried one ID at a time, so an ID Spotify refuses
+        only fails its own lookup.
+        """
+        params = SpotifyService._entity_params(kind, market)
+        response = await SpotifyService._amake_request(
+            kind, {**(params or {}), "ids": ",".join(ids)}
+        )
+        if "error" not in response:
+            return SpotifyService._index_batch(kind, ids, response, params)
+        if len(ids) == 1 or "retry_after" in response:
+            # Throttled or unavailable, single requests would fail the same way
+            return {id: response for id in ids}
+        items = await asyncio.gather(
+            *[SpotifyService._amake_request(f"{kind}/{id}", params) for id in ids]
+        )
+        return dict(zip(ids, items))
+
+    @staticmethod
+    async def _aload_entity(kind: str, id: str, market: str = None) -> Optional[dict]:
+        """Load one entity, batched with concurrent lookups from all sessions"""
+        params = SpotifyService._entity_params(kind, market)
+        # A malformed ID is sent alone, so it only fails its own lookup
+        batchable = SPOTIFY_ID_PATTERN.fullmatch(id) is not None
+        if not settings.SPOTIFY_BATCHING_ENABLED or not batchable:
+            return await SpotifyService._amake_request(f"{kind}/{id}", params)
+        if settings.SPOTIFY_CACHE_ENABLED:
+            cached = spotify_response_cache.get(f"{kind}/{id}", params)
+            if cached is not None:
+                return cached
+        group = params["market"] if params else None
+        return await spotify_batchers[kind].load(group, id)
+
+    @staticmethod
+    async def _aget_several(kind: str, ids: str, market: str = None) -> dict:
+        """Fetch several entities through the micro-batchers, reusing cached ones.
+
+        An ID whose lookup fails comes back as null, like an unknown ID does.
+        The error is returned instead when every lookup fails or the upstream
+        asked to retry later.
+        """
+        id_list = [id.strip() for id in ids.split(",") if id.strip()]
+        items = await asyncio.gather(
+            *[SpotifyService._aload_entity(kind, id, market) for id in id_list]
+        )
+        errors = [item for item in items if item is not None and "error" in item]
+        for error in errors:
+            if "retry_after" in error:
+                return error
+        if errors and len(errors) == len(items):
+            return errors[0]
+        return {
+            kind: [
+                None if item is not None and "error" in item else item for item in items
+            ]
+        }
+
+    @staticmethod
+    async def _aiter_pages(endpoint: str, params: dict = None) -> AsyncIterator[dict]:
+        """Yield the pages of a paged endpoint, following `next` links"""
+        request = (endpoint, params)
+        while request is not None:
+            page = await SpotifyService._amake_request(*request)
+            yield page
+            if "error" in page:
+                return
+            request = spotify_next_request(
+                page.get("next"), settings.SPOTIFY_API_BASE_URL
+            )
 
-                for field in field_list:
-                    keys = field.split(".", 1)
-                    if len(keys) == 2:
-                        if keys[0] not in field_map:
-                            field_map[keys[0]] = []
-                        field_map[keys[0]].append(keys[1])
-                    else:
-                        filtered_data[field] = data.get(field)
+    @staticmethod
+    def _paging_params(max_items: int, page_limit: int, **params) -> dict:
+        """First page params, requesting no more items per page than needed"""
+        params = {k: v for k, v in params.items() if v is not None}
+        params.update(limit=min(max_items, page_limit), offset=0)
+        return params
 
-                for key, sub_fields in field_map.items():
-                    if key in data:
-                        filtered_data[key] = extract_fields(data[key], sub_fields)
+    @staticmethod
+    def _collect_page(collector: PageCollector, page: dict, fields: str) -> bool:
+        """Project one page into the collector, False once no more pages are needed"""
+        if "error" in page:
+            collector.fail(page)
+            return False
+        projected = SpotifyService._filter_response(page, fields) if fields else page
+        wants_more = collector.add(projected.get("items") or [], page.get("total"))
+        return wants_more and page.get("next") is not None
 
-                return filtered_data
-            elif isinstance(data, list):
-                return [extract_fields(item, field_list) for item in data]
-            return data
+    @staticmethod
+    async def _acollect_pages(
+        endpoint: str, params: dict, fields: str, max_items: int
+    ) -> dict:
+        """Fetch pages until max_items projected items are collected"""
+        collector = PageCollector("items", max_items)
+        pages = SpotifyService._aiter_pages(endpoint, params)
+        try:
+            async for page in pages:
+                if not SpotifyService._collect_page(collector, page, fields):
+                    break
+        finally:
+            await pages.aclose()
+        return collector.result()
 
-        field_list = fields.split(",")
-        return extract_fields(response, field_list)
+    @staticmethod
+    def _filter_response(response: Dict[Any, Any], fields: str) -> Dict[Any, Any]:
+        """Filter response to include only specified fields"""
+        if "error" in response:
+            return response
+        try:
+            return project(response, fields)
+        except InvalidFieldsError as e:
+            return {"error": str(e)}
 
     @staticmethod
     @with_yaml_doc("search_spotify")
-    def search_spotify(
+    async def asearch_spotify(
         q: Annotated[
             str, Field(description=SPOTIFY_DOCS["search_spotify"]["params"]["q"])
         ],
@@ -98,12 +352,12 @@ class SpotifyService:
             "limit": limit,
             "offset": offset,
         }
-        response = SpotifyService._make_request("search", params)
+        response = await SpotifyService._amake_request("search", params)
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_track")
-    def get_track(
+    async def aget_track(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_track"]["params"]["fields"])
         ],
@@ -112,13 +366,13 @@ class SpotifyService:
         ],
         market: str = "US",
     ) -> str:
-        params = {"market": market}
-        response = SpotifyService._make_request(f"tracks/{id}", params)
+        response = await SpotifyService._aload_entity("tracks", id, market)
+        response = response or {"error": "Failed to fetch data from Spotify"}
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_artists_top_tracks")
-    def get_artists_top_tracks(
+    async def aget_artists_top_tracks(
         fields: Annotated[
             str,
             Field(
@@ -132,12 +386,14 @@ class SpotifyService:
         market: str = "US",
     ) -> str:
         params = {"market": market}
-        resonse = SpotifyService._make_request(f"artists/{id}/top-tracks", params)
-        return SpotifyService._filter_response(resonse, fields)
+        response = await SpotifyService._amake_request(
+            f"artists/{id}/top-tracks", params
+        )
+        return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_artist")
-    def get_artist(
+    async def aget_artist(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_artist"]["params"]["fields"])
         ],
@@ -145,12 +401,13 @@ class SpotifyService:
             str, Field(description=SPOTIFY_DOCS["get_artist"]["params"]["id"])
         ],
     ) -> str:
-        response = SpotifyService._make_request(f"artists/{id}")
+        response = await SpotifyService._aload_entity("artists", id)
+        response = response or {"error": "Failed to fetch data from Spotify"}
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_artists_albums")
-    def get_artists_albums(
+    async def aget_artists_albums(
         fields: Annotated[
             str,
             Field(description=SPOTIFY_DOCS["get_artists_albums"]["params"]["fields"]),
@@ -176,12 +433,12 @@ class SpotifyService:
         params = {"limit": limit, "market": market, "offset": offset}
         if include_groups:
             params["include_groups"] = include_groups
-        response = SpotifyService._make_request(f"artists/{id}/albums", params)
+        response = await SpotifyService._amake_request(f"artists/{id}/albums", params)
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_album")
-    def get_album(
+    async def aget_album(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_album"]["params"]["fields"])
         ],
@@ -190,13 +447,13 @@ class SpotifyService:
         ],
         market: str = "US",
     ) -> str:
-        params = {"market": market}
-        response = SpotifyService._make_request(f"albums/{id}", params)
+        response = await SpotifyService._aload_entity("albums", id, market)
+        response = response or {"error": "Failed to fetch data from Spotify"}
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_album_tracks")
-    def get_album_tracks(
+    async def aget_album_tracks(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_album_tracks"]["params"]["fields"])
         ],
@@ -210,12 +467,12 @@ class SpotifyService:
         offset: int = 0,
     ) -> str:
         params = {"limit": limit, "market": market, "offset": offset}
-        response = SpotifyService._make_request(f"albums/{id}/tracks", params)
+        response = await SpotifyService._amake_request(f"albums/{id}/tracks", params)
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_new_releases")
-    def get_new_releases(
+    async def aget_new_releases(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_new_releases"]["params"]["fields"])
         ],
@@ -225,12 +482,12 @@ class SpotifyService:
         offset: int = 0,
     ) -> str:
         params = {"limit": limit, "offset": offset}
-        response = SpotifyService._make_request("browse/new-releases", params)
+        response = await SpotifyService._amake_request("browse/new-releases", params)
         return SpotifyService._filter_response(response, fields)
 
     @staticmethod
     @with_yaml_doc("get_playlist")
-    def get_playlist(
+    async def aget_playlist(
         fields: Annotated[
             str, Field(description=SPOTIFY_DOCS["get_playlist"]["params"]["fields"])
         ],
@@ -249,5 +506,146 @@ class SpotifyService:
         params = {"market": market}
         if additional_types:
             params["additional_types"] = additional_types
-        response = SpotifyService._make_request(f"playlists/{playlist_id}", params)
+        return await SpotifyService._amake_projected_request(
+            f"playlists/{playlist_id}", params, fields
+        )
+
+    @staticmethod
+    @with_yaml_doc("get_tracks")
+    async def aget_tracks(
+        fields: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_tracks"]["params"]["fields"])
+        ],
+        ids: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_tracks"]["params"]["ids"])
+        ],
+        market: str = "US",
+    ) -> str:
+        response = await SpotifyService._aget_several("tracks", ids, market)
         return SpotifyService._filter_response(response, fields)
+
+    @staticmethod
+    @with_yaml_doc("get_artists")
+    async def aget_artists(
+        fields: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_artists"]["params"]["fields"])
+        ],
+        ids: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_artists"]["params"]["ids"])
+        ],
+    ) -> str:
+        response = await SpotifyService._aget_several("artists", ids)
+        return SpotifyService._filter_response(response, fields)
+
+    @staticmethod
+    @with_yaml_doc("get_albums")
+    async def aget_albums(
+        fields: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_albums"]["params"]["fields"])
+        ],
+        ids: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_albums"]["params"]["ids"])
+        ],
+        market: str = "US",
+    ) -> str:
+        response = await SpotifyService._aget_several("albums", ids, market)
+        return SpotifyService._filter_response(response, fields)
+
+    @staticmethod
+    @with_yaml_doc("get_all_artists_albums")
+    async def aget_all_artists_albums(
+        fields: Annotated[
+            str,
+            Field(
+                description=SPOTIFY_DOCS["get_all_artists_albums"]["params"]["fields"]
+            ),
+        ],
+        id: Annotated[
+            str,
+            Field(description=SPOTIFY_DOCS["get_all_artists_albums"]["params"]["id"]),
+        ],
+        include_groups: Annotated[
+            str,
+            Field(
+                description=SPOTIFY_DOCS["get_all_artists_albums"]["params"][
+                    "include_groups"
+                ]
+            ),
+        ] = None,
+        max_items: Annotated[
+            int,
+            Field(
+                description=SPOTIFY_DOCS["get_all_artists_albums"]["params"][
+                    "max_items"
+                ]
+            ),
+        ] = 50,
+        market: str = "US",
+    ) -> dict:
+        max_items = min(max_items, settings.PAGINATION_MAX_ITEMS)
+        params = SpotifyService._paging_params(
+            max_items, 50, include_groups=include_groups, market=market
+        )
+        return await SpotifyService._acollect_pages(
+            f"artists/{id}/albums", params, fields, max_items
+        )
+
+    @staticmethod
+    @with_yaml_doc("get_all_album_tracks")
+    async def aget_all_album_tracks(
+        fields: Annotated[
+            str,
+            Field(description=SPOTIFY_DOCS["get_all_album_tracks"]["params"]["fields"]),
+        ],
+        id: Annotated[
+            str, Field(description=SPOTIFY_DOCS["get_all_album_tracks"]["params"]["id"])
+        ],
+        max_items: Annotated[
+            int,
+            Field(
+                description=SPOTIFY_DOCS["get_all_album_tracks"]["params"]["max_items"]
+            ),
+        ] = 50,
+        market: str = "US",
+    ) -> dict:
+        max_items = min(max_items, settings.PAGINATION_MAX_ITEMS)
+        params = SpotifyService._paging_params(max_items, 50, market=market)
+        return await SpotifyService._acollect_pages(
+            f"albums/{id}/tracks", params, fields, max_items
+        )
+
+    @staticmethod
+    @with_yaml_doc("get_all_playlist_tracks")
+    async def aget_all_playlist_tracks(
+        fields: Annotated[
+            str,
+            Field(
+                description=SPOTIFY_DOCS["get_all_playlist_tracks"]["params"]["fields"]
+            ),
+        ],
+        playlist_id: Annotated[
+            str,
+            Field(
+                description=SPOTIFY_DOCS["get_all_playlist_tracks"]["params"][
+                    "playlist_id"
+                ]
+            ),
+        ],
+        max_items: Annotated[
+            int,
+            Field(
+                description=SPOTIFY_DOCS["get_all_playlist_tracks"]["params"][
+                    "max_items"
+                ]
+            ),
+        ] = 100,
+        additional_types: str = None,
+        market: str = "US",
+    ) -> dict:
+        max_items = min(max_items, settings.PAGINATION_MAX_ITEMS)
+        params = SpotifyService._paging_params(
+            max_items, 100, additional_types=additional_types, market=market
+        )
+        return await SpotifyService._acollect_pages(
+            f"playlists/{playlist_id}/tracks", params, fields, max_items
+        )
@@ -1,11 +1,25 @@
 import yaml
 from pathlib import Path
-import requests
-from functools import wraps
+import httpx
 from api.config.settings import settings
+from api.utils.concurrency import add_blocking_variants
+from api.utils.http_client import http_client
+from api.utils.pagination import (
+    TICKETMASTER_MAX_DEPTH,
+    PageCollector,
+    split_date_window,
+    ticketmaster_next_page,
+)
+from api.utils.rate_limiter import RateLimitExceeded, UpstreamScheduler
+from api.utils.resilience import CircuitBreaker, CircuitOpenError, ResilientUpstream
+from api.utils.projection import InvalidFieldsError, compile_fields, project
+from api.utils.response_cache import ResponseCache
+from api.utils.single_flight import SingleFlight
+from api.utils.streaming import aproject_response, streaming_available
 from typing_extensions import Annotated
 from pydantic import Field
-from typing import Dict, Any
+from typing import Dict, Any, AsyncIterator, Awaitable, List, Optional, Tuple
+import asyncio
 
 # Load documentation from YAML
 docs_path = Path(__file__).parent.parent / "docs" / "ticketmaster_docs.yaml"
@@ -15,79 +29,314 @@ with open(docs_path, "r") as f:
 
 def with_yaml_doc(method_name):
     def decorator(func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            return func(*args, **kwargs)
-
-        wrapper.yaml_doc = TICKETMASTER_DOCS[method_name]["method_doc"]
-        return wrapper
+        func.yaml_doc = TICKETMASTER_DOCS[method_name]["method_doc"]
+        return func
 
     return decorator
 
 
+ticketmaster_request_flight = SingleFlight()
+
+# The Discovery API enforces a hard per-second quota
+ticketmaster_scheduler = UpstreamScheduler(
+    "Ticketmaster",
+    rate=settings.TICKETMASTER_RATE_LIMIT,
+    burst=settings.TICKETMASTER_RATE_BURST,
+    max_concurrency=settings.TICKETMASTER_MAX_CONCURRENCY,
+    queue_timeout=settings.UPSTREAM_QUEUE_TIMEOUT,
+    max_retries=settings.UPSTREAM_MAX_429_RETRIES,
+)
+
+ticketmaster_upstream = ResilientUpstream(
+    "Ticketmaster",
+    CircuitBreaker(
+        "Ticketmaster",
+        failure_threshold=settings.UPSTREAM_BREAKER_FAILURE_THRESHOLD,
+        recovery_timeout=settings.UPSTREAM_BREAKER_RECOVERY_TIMEOUT,
+    ),
+    max_retries=settings.UPSTREAM_MAX_RETRIES,
+    base_delay=settings.UPSTREAM_RETRY_BASE_DELAY,
+    max_delay=settings.UPSTREAM_RETRY_MAX_DELAY,
+)
+
+
+# Tools are written once as coroutines; add_blocking_variants generates their
+# blocking twins
+@add_blocking_variants
 class TicketmasterService:
     @staticmethod
-    def _make_request(endpoint: str, params: dict = None) -> dict:
+    async def _amake_request(endpoint: str, params: dict = None) -> dict:
         """Helper method to make requests to Ticketmaster API"""
-        if params is None:
-            params = {}
+        # Identical concurrent requests share one upstream call
+        key = ResponseCache.make_key(endpoint, params)
+        return await ticketmaster_request_flight.do(
+            key, lambda: TicketmasterService._asend_request(endpoint, params)
+        )
+
+    @staticmethod
+    async def _asend_request(
+        endpoint: str, params: dict = None, fields: str = None
+    ) -> dict:
+        """Send a request to Ticketmaster API over the shared async pool.
+
+        With fields, the body is streamed and only the selected paths are decoded.
+        """
+        params = dict(params or {})
         params["apikey"] = settings.TICKETMASTER_API_KEY
 
         url = f"{settings.TICKETMASTER_API_BASE_URL}/{endpoint}"
+
+        def send() -> Awaitable[httpx.Response]:
+            if fields:
+                return http_client.send_stream("GET", url, params=params)
+            return http_client.get(url, params=params)
+
         try:
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException:
+            response = await ticketmaster_upstream.run(
+                lambda: ticketmaster_scheduler.run(send), endpoint, hedge=not fields
+            )
+            try:
+                response.raise_for_status()
+                if fields:
+                    return await aproject_response(
+                        response, fields, settings.STREAMING_PROJECTION_MIN_BYTES
+                    )
+                return response.json()
+            finally:
+                await response.aclose()
+        except (RateLimitExceeded, CircuitOpenError) as e:
+            return {"error": str(e), "retry_after": round(e.retry_after)}
+        except (httpx.HTTPError, ValueError):
+            # ValueError: the body was not valid JSON
             return {"error": f"Failed to fetch data from Ticketmaster: {endpoint}"}
 
     @staticmethod
-    def _filter_response(response: Dict[Any, Any], fields: str) -> Dict[Any, Any]:
-        """Filter response to include only specified fields."""
-        if not fields:
+    async def _amake_projected_request(
+        endpoint: str, params: dict, fields: str
+    ) -> dict:
+        """Search with only the selected item fields, decoding the body incrementally"""
+        if (
+            not fields
+            or not settings.STREAMING_PROJECTION_ENABLED
+            or not streaming_available()
+        ):
+            response = await TicketmasterService._amake_request(endpoint, params)
+            return TicketmasterService._filter_response(response, fields)
+
+        # Selects what _filter_response keeps: projected items and the page metadata
+        expression = f"_embedded.*({fields}),page"
+        try:
+            compile_fields(expression)
+        except InvalidFieldsError as e:
+            return {"error": str(e)}
+        key = (ResponseCache.make_key(endpoint, params), fields)
+        response = await ticketmaster_request_flight.do(
+            key,
+            lambda: TicketmasterService._asend_request(endpoint, params, expression),
+        )
+        if "error" in response:
             return response
+        result = dict(response.get("_embedded", {}))
+        result.update((k, v) for k, v in response.items() if k != "_embedded")
+        return result
+
+    @staticmethod
+    async def _aiter_pages(endpoint: str, params: dict) -> AsyncIterator[dict]:
+        """Yield the pages of a search, following its `page` metadata"""
+        number = params.get("page", 0)
+        while number is not None:
+            response = await TicketmasterService._amake_request(
+                endpoint, {**params, "page": number}
+            )
+            yield response
+            if "error" in response:
+                return
+            number = ticketmaster_next_page(response.get("page"), params["size"])
+
+    @staticmethod
+    def _page_items(page: dict, key: str, fields: str) -> List[Tuple[Any, Any]]:
+        """(id, projected item) pairs of one result page"""
+        items = page.get("_embedded", {}).get(key, [])
+        if fields:
+            projected = TicketmasterService._filter_response(page, fields).get(key, [])
+        else:
+            projected = items
+        return [
+            (item.get("id"), item_fields) for item, item_fields in zip(items, projected)
+        ]
+
+    @staticmethod
+    def _collect_page(collector: PageCollector, page: dict, fields: str) -> bool:
+        """Project one page into the collector, False once no more pages are needed"""
+        if "error" in page:
+            collector.fail(page)
+            return False
+        items = TicketmasterService._page_items(page, collector.key, fields)
+        total = page.get("page", {}).get("totalElements")
+        return collector.add([item for _, item in items], total)
 
-        field_list = [f.strip() for f in fields.split(",")]
-        result = {}
-
-        def extract_fields(
-            data: Dict[Any, Any], field_paths: list[str]
-        ) -> Dict[Any, Any]:
-            output = {}
-            for path in field_paths:
-                parts = path.split(".")
-                current = data
-                valid = True
-                for part in parts[:-1]:
-                    if part not in current:
-                        valid = False
-                        break
-                    current = current[part]
-                if valid and parts[-1] in current:
-                    nested_path = parts[0]
-                    if nested_path not in output:
-                        output[nested_path] = {}
-                    current_dict = output[nested_path]
-                    for part in parts[1:-1]:
-                        if part not in current_dict:
-                            current_dict[part] = {}
-                        current_dict = current_dict[part]
-                    current_dict[parts[-1]] = current[parts[-1]]
-            return output
-
-        if "_embedded" in response:
-            for key in response["_embedded"]:
-                result[key] = [
-                    extract_fields(item, field_list)
-                    for item in response["_embedded"][key]
+    @staticmethod
+    async def _acollect_pages(
+        endpoint: str, key: str, params: dict, fields: str, max_items: int
+    ) -> dict:
+        """Fetch pages until max_items projected items are collected"""
+        collector = PageCollector(key, max_items)
+        pages = TicketmasterService._aiter_pages(endpoint, params)
+        try:
+            async for page in pages:
+                if not TicketmasterService._collect_page(collector, page, fields):
+                    break
+        finally:
+            await pages.aclose()
+        return collector.result()
+
+    @staticmethod
+    def _paging_params(search: Dict[str, Any], max_items: int) -> dict:
+        """Search params with a page size no larger than needed"""
+        params = {
+            k: v
+            for k, v in search.items()
+            if v is not None and k not in ("fields", "max_items")
+        }
+        params["size"] = min(max_items, 200)
+        return params
+
+    @staticmethod
+    def _plan_window(
+        params: dict, first: dict, limit: int
+    ) -> Tuple[Optional[List[Tuple[str, str]]], int]:
+        """Sub-windows to split a window into, or else how many pages to fetch"""
+        wanted = min(first.get("page", {}).get("totalElements", 0), limit)
+        if wanted > TICKETMASTER_MAX_DEPTH:
+            windows = split_date_window(
+                params.get("startDateTime"),
+                params.get("endDateTime"),
+                settings.TICKETMASTER_SHARD_FANOUT,
+                settings.TICKETMASTER_MIN_SHARD_SECONDS,
+            )
+            if windows:
+                return windows, 0
+        size = params["size"]
+        return None, min(-(-wanted // size), TICKETMASTER_MAX_DEPTH // size)
+
+    @staticmethod
+    def _merge_pages(
+        pages: List[dict], fields: str
+    ) -> Tuple[List[Tuple[Any, Any]], Optional[dict]]:
+        items, error = [], None
+        for page in pages:
+            if "error" in page:
+                error = error or page
+            else:
+                items.extend(TicketmasterService._page_items(page, "events", fields))
+        return items, error
+
+    @staticmethod
+    async def _afetch_window(
+        params: dict, fields: str, limit: int, first: Optional[dict] = None
+    ) -> Tuple[List[Tuple[Any, Any]], Optional[dict], int]:
+        """Fetch up to limit events of a date window, splitting it while it is too deep to page.
+
+        The first pages of all shards are fetched concurrently to learn their
+        totals, then the limit is handed out in date order and only the shards
+        that get a share are fetched, again concurrently. Events seen in
+        several shards are kept once. The fanout bounds each level and the
+        scheduler paces the requests.
+        """
+        if first is None:
+            first = await TicketmasterService._amake_request(
+                "events.json", {**params, "page": 0}
+            )
+        if "error" in first:
+            return [], first, 0
+        total = first.get("page", {}).get("totalElements", 0)
+        windows, page_count = TicketmasterService._plan_window(params, first, limit)
+        if windows:
+            shards = [
+                {**params, "startDateTime": start, "endDateTime": end}
+                for start, end in windows
+            ]
+            firsts = await asyncio.gather(
+                *[
+                    TicketmasterService._amake_request(
+                        "events.json", {**shard, "page": 0}
+                    )
+                    for shard in shards
                 ]
-            result["page"] = response.get("page", {})
+            )
+            plans, remaining = [], limit
+            for shard, shard_first in zip(shards, firsts):
+                if remaining <= 0:
+                    break
+                plans.append((shard, shard_first, remaining))
+                if "error" in shard_first:
+                    break
+                remaining -= shard_first.get("page", {}).get("totalElements", 0)
+            windows = await asyncio.gather(
+                *[
+                    TicketmasterService._afetch_window(shard, fields, wanted, page)
+                    for shard, page, wanted in plans
+                ]
+            )
+            items, error, seen = [], None, set()
+            for shard_items, error, _ in windows:
+                for id, item in shard_items:
+                    if id is None or id not in seen:
+                        seen.add(id)
+                        items.append((id, item))
+                if error is not None or len(items) >= limit:
+                    break
+            return items[:limit], error, total
+
+        pages = [first] + await asyncio.gather(
+            *[
+                TicketmasterService._amake_request(
+                    "events.json", {**params, "page": page}
+                )
+                for page in range(1, page_count)
+            ]
+        )
+        return TicketmasterService._merge_pages(pages, fields) + (total,)
+
+    @staticmethod
+    def _sharded_params(params: dict, max_items: int) -> dict:
+        # Date order keeps shards chronological and makes capped shards keep their earliest events
+        return {**params, "size": min(max_items, 200), "sort": "date,asc"}
+
+    @staticmethod
+    def _sharded_result(
+        window: Tuple[List[Tuple[Any, Any]], Optional[dict], int], max_items: int
+    ) -> dict:
+        """The result of a sharded search, from its deduplicated events"""
+        items, error, total = window
+        collector = PageCollector("events", max_items)
+        if error is not None:
+            collector.fail(error)
+        collector.add([item for _, item in items], total)
+        return collector.result()
+
+    @staticmethod
+    def _filter_response(response: Dict[Any, Any], fields: str) -> Dict[Any, Any]:
+        """Filter the items of a search response to include only specified fields."""
+        if not fields or "error" in response:
+            return response
 
+        try:
+            result = {
+                key: project(items, fields)
+                for key, items in response.get("_embedded", {}).items()
+            }
+        except InvalidFieldsError as e:
+            return {"error": str(e)}
+        # Keep the paging metadata, drop the HAL links
+        for key, value in response.items():
+            if key not in ("_embedded", "_links"):
+                result[key] = value
         return result
 
     @staticmethod
     @with_yaml_doc("search_ticketmaster_events")
-    def search_ticketmaster_events(
+    async def asearch_ticketmaster_events(
         fields: Annotated[
             str,
             Field(
@@ -113,12 +362,13 @@ class TicketmasterService:
         size: int = 20,
     ) -> dict:
         params = {k: v for k, v in locals().items() if v is not None and k != "cls"}
-        response = TicketmasterService._make_request("events.json", params)
-        return TicketmasterService._filter_response(response, fields)
+        return await TicketmasterService._amake_projected_request(
+            "events.json", params, fields
+        )
 
     @staticmethod
     @with_yaml_doc("get_ticketmaster_event_details")
-    def get_ticketmaster_event_details(
+    async def aget_ticketmaster_event_details(
         id: Annotated[
             str,
             Field(
@@ -128,11 +378,11 @@ class TicketmasterService:
             ),
         ]
     ) -> dict:
-        return TicketmasterService._make_request(f"events/{id}.json")
+        return await TicketmasterService._amake_request(f"events/{id}.json")
 
     @staticmethod
     @with_yaml_doc("search_ticketmaster_venues")
-    def search_ticketmaster_venues(
+    async def asearch_ticketmaster_venues(
         fields: Annotated[
             str,
             Field(
@@ -154,12 +404,13 @@ class TicketmasterService:
         size: int = 20,
     ) -> dict:
         params = {k: v for k, v in locals().items() if v is not None and k != "cls"}
-        response = TicketmasterService._make_request("venues.json", params)
-        return TicketmasterService._filter_response(response, fields)
+        return await TicketmasterService._amake_projected_request(
+            "venues.json", params, fields
+        )
 
     @staticmethod
     @with_yaml_doc("get_ticketmaster_venue_details")
-    def get_ticketmaster_venue_details(
+    async def aget_ticketmaster_venue_details(
         id: Annotated[
             str,
             Field(
@@ -169,4 +420,87 @@ class TicketmasterService:
             ),
         ]
     ) -> dict:
-        return TicketmasterService._make_request(f"venues/{id}.json")
+        return await TicketmasterService._amake_request(f"venues/{id}.json")
+
+    @staticmethod
+    @with_yaml_doc("search_all_ticketmaster_events")
+    async def asearch_all_ticketmaster_events(
+        fields: Annotated[
+            str,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_events"][
+                    "params"
+                ]["fields"]
+            ),
+        ] = None,
+        keyword: Annotated[
+            str,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_events"][
+                    "params"
+                ]["keyword"]
+            ),
+        ] = None,
+        countryCode: str = None,
+        city: str = None,
+        stateCode: str = None,
+        classificationName: str = None,
+        startDateTime: str = None,
+        endDateTime: str = None,
+        max_items: Annotated[
+            int,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_events"][
+                    "params"
+                ]["max_items"]
+            ),
+        ] = 100,
+    ) -> dict:
+        if startDateTime and endDateTime:
+            max_items = min(max_items, settings.TICKETMASTER_SHARDED_MAX_ITEMS)
+            params = TicketmasterService._paging_params(locals(), max_items)
+            params = TicketmasterService._sharded_params(params, max_items)
+            window = await TicketmasterService._afetch_window(params, fields, max_items)
+            return TicketmasterService._sharded_result(window, max_items)
+
+        max_items = min(max_items, settings.PAGINATION_MAX_ITEMS)
+        params = TicketmasterService._paging_params(locals(), max_items)
+        return await TicketmasterService._acollect_pages(
+            "events.json", "events", params, fields, max_items
+        )
+
+    @staticmethod
+    @with_yaml_doc("search_all_ticketmaster_venues")
+    async def asearch_all_ticketmaster_venues(
+        fields: Annotated[
+            str,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_venues"][
+                    "params"
+                ]["fields"]
+            ),
+        ] = None,
+        keyword: Annotated[
+            str,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_venues"][
+                    "params"
+                ]["keyword"]
+            ),
+        ] = None,
+        countryCode: str = None,
+        stateCode: str = None,
+        max_items: Annotated[
+            int,
+            Field(
+                description=TICKETMASTER_DOCS["search_all_ticketmaster_venues"][
+                    "params"
+                ]["max_items"]
+            ),
+        ] = 100,
+    ) -> dict:
+        max_items = min(max_items, settings.PAGINATION_MAX_ITEMS)
+        params = TicketmasterService._paging_params(locals(), max_items)
+        return await TicketmasterService._acollect_pages(
+            "venues.json", "venues", params, fields, max_items
+        )
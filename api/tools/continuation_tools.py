@@ -0,0 +1,39 @@
+from typing import Annotated, Any, Dict, List
+from llama_index.core.tools import FunctionTool
+from pydantic import Field
+from api.utils.compaction import tool_output_compactor
+
+GET_MORE_RESULTS_DOC = (
+    "Fetch the next page of a tool result that was shortened to fit the context. "
+    "Call it with the cursor from the result's `continuation` object; the "
+    "response contains the following items of each shortened list and, if "
+    "items remain, a new cursor."
+)
+
+
+def get_more_results(
+    cursor: Annotated[
+        str, Field(description="The `continuation.cursor` of a shortened result")
+    ],
+) -> Dict[str, Any]:
+    return tool_output_compactor.more(cursor)
+
+
+async def aget_more_results(
+    cursor: Annotated[
+        str, Field(description="The `continuation.cursor` of a shortened result")
+    ],
+) -> Dict[str, Any]:
+    return tool_output_compactor.more(cursor)
+
+
+def create_continuation_tools() -> List[FunctionTool]:
+    """Tools that page through results shortened by the token budget."""
+    return [
+        FunctionTool.from_defaults(
+            fn=get_more_results,
+            async_fn=aget_more_results,
+            name="get_more_results",
+            description=GET_MORE_RESULTS_DOC,
+        )
+    ]
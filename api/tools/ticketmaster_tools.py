@@ -1,6 +1,9 @@
 import inspect
 from llama_index.core.tools import FunctionTool
 from api.services.ticketmaster_service import TicketmasterService
+from api.tools.continuation_tools import create_continuation_tools
+from api.utils.compaction import tool_output_compactor
+from api.utils.concurrency import to_async
 from typing import List
 
 
@@ -11,9 +14,14 @@ def create_ticketmaster_tools() -> List[FunctionTool]:
     for name, method in inspect.getmembers(
         TicketmasterService, predicate=inspect.isfunction
     ):
-        if not name.startswith("_"):  # Skip private methods
+        # Skip private methods and async variants, which are registered as async_fn
+        if not name.startswith("_") and not inspect.iscoroutinefunction(method):
             tool = FunctionTool.from_defaults(
-                fn=method,
+                fn=tool_output_compactor.wrap(name, method),
+                async_fn=tool_output_compactor.wrap(
+                    name,
+                    getattr(TicketmasterService, f"a{name}", None) or to_async(method),
+                ),
                 name=name,
                 description=getattr(
                     method, "yaml_doc", f"Call {name} on Ticketmaster API"
@@ -21,6 +29,8 @@ def create_ticketmaster_tools() -> List[FunctionTool]:
             )
             tools.append(tool)
 
+    # Results over their token budget point at this tool for the rest
+    tools.extend(create_continuation_tools())
     return tools
 
 
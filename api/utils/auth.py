@@ -1,24 +1,355 @@
 from fastapi import HTTPException, Security, Header
 from fastapi.security import HTTPBearer
 from api.config.settings import settings
-import requests
-from api.db.supabase_client import supabase
+from api.utils.cache import TTLCache
+from api.utils.concurrency import run_sync
+from api.utils.http_client import http_client
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+from api.db.supabase_client import get_supabase
+
+try:
+    import jwt as pyjwt
+except ImportError:  # PyJWT is optional, only needed for asymmetric signing keys
+    pyjwt = None
 
 security = HTTPBearer()
 
 
+class SpotifyTokenProvider:
+    """Caches the Spotify client-credentials token until shortly before it expires"""
+
+    def __init__(
+        self,
+        refresh_margin: float = settings.SPOTIFY_TOKEN_REFRESH_MARGIN,
+        expiry_margin: float = settings.SPOTIFY_TOKEN_EXPIRY_MARGIN,
+    ):
+        self._refresh_margin = refresh_margin
+        self._expiry_margin = expiry_margin
+        self._refresh_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._token: Optional[str] = None
+        self._expires_at = 0.0
+        self._background_refresh_running = False
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.background_refreshes = 0
+        self.refresh_failures = 0
+
+    def _fetch_token(self) -> Tuple[str, float]:
+        """Request a new token from the Spotify accounts service"""
+        response = http_client.sync_client.post(
+            settings.SPOTIFY_TOKEN_URL,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            data={
+                "grant_type": "client_credentials",
+                "client_id": settings.SPOTIFY_CLIENT_ID,
+                "client_secret": settings.SPOTIFY_CLIENT_SECRET,
+            },
+        )
+        payload = response.json()
+        return payload.get("access_token", ""), float(payload.get("expires_in", 0))
+
+    def _is_usable(self, now: float) -> bool:
+        return bool(self._token) and now < self._expires_at - self._expiry_margin
+
+    def _needs_refresh(self, now: float) -> bool:
+        return now >= self._expires_at - self._refresh_margin
+
+    def _refresh(self) -> str:
+        """Fetch a new token and store it, returning "" on failure"""
+        try:
+            token, expires_in = self._fetch_token()
+        except Exception as e:
+            print(f"Spotify token refresh failed: {e}")
+            token, expires_in = "", 0.0
+        with self._state_lock:
+            if not token:
+                self.refresh_failures += 1
+                return ""
+            self._token = token
+            self._expires_at = time.monotonic() + expires_in
+            self.refreshes += 1
+        return token
+
+    def _refresh_in_background(self) -> None:
+        try:
+            with self._refresh_lock:
+                if self._needs_refresh(time.monotonic()):
+                    self._refresh()
+        finally:
+            with self._state_lock:
+                self._background_refresh_running = False
+
+    def _start_background_refresh(self) -> None:
+        with self._state_lock:
+            if self._background_refresh_running:
+                return
+            self._background_refresh_running = True
+            self.background_refreshes += 1
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def get_token(self) -> str:
+        """Return a cached token, fetching a new one only when none is usable"""
+        now = time.monotonic()
+        token = self._token
+        if self._is_usable(now):
+            self.hits += 1
+            if self._needs_refresh(now):
+                self._start_background_refresh()
+            return token
+
+        # Only one caller talks to the token endpoint, the rest wait for its result
+        with self._refresh_lock:
+            if self._is_usable(time.monotonic()):
+                self.hits += 1
+                return self._token
+            self.misses += 1
+            return self._refresh()
+
+    async def aget_token(self) -> str:
+        """Async variant of get_token that only leaves the event loop to refresh"""
+        now = time.monotonic()
+        token = self._token
+        if self._is_usable(now):
+            self.hits += 1
+            if self._needs_refresh(now):
+                self._start_background_refresh()
+            return token
+        return await run_sync(self.get_token)
+
+    def invalidate(self) -> None:
+        """Drop the cached token, e.g. after Spotify rejects it with a 401"""
+        with self._state_lock:
+            self._token = None
+            self._expires_at = 0.0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "background_refreshes": self.background_refreshes,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+spotify_token_provider = SpotifyTokenProvider()
+
+
 def get_spotify_token() -> str:
     """Get Spotify API access token"""
-    response = requests.post(
-        "https://accounts.spotify.com/api/token",
-        headers={"Content-Type": "application/x-www-form-urlencoded"},
-        data={
-            "grant_type": "client_credentials",
-            "client_id": settings.SPOTIFY_CLIENT_ID,
-            "client_secret": settings.SPOTIFY_CLIENT_SECRET,
-        },
-    )
-    return response.json().get("access_token", "")
+    return spotify_token_provider.get_token()
+
+
+class InvalidTokenError(Exception):
+    """Raised when a JWT fails local verification"""
+
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+
+class SupabaseTokenVerifier:
+    """Verifies Supabase JWTs locally and caches verified claims by token hash"""
+
+    def __init__(
+        self,
+        mode: str = settings.SUPABASE_AUTH_MODE,
+        jwt_secret: Optional[str] = settings.SUPABASE_JWT_SECRET,
+        audience: Optional[str] = settings.SUPABASE_JWT_AUDIENCE,
+        cache_size: int = settings.SUPABASE_AUTH_CACHE_SIZE,
+        cache_ttl: float = settings.SUPABASE_AUTH_CACHE_TTL,
+        jwks_ttl: float = settings.SUPABASE_JWKS_TTL,
+        algorithms: str = settings.SUPABASE_JWT_ALGORITHMS,
+        leeway: float = 10.0,
+    ):
+        if mode not in ("remote", "local", "hybrid"):
+            raise ValueError(f"Unknown Supabase auth mode: {mode}")
+        self._mode = mode
+        self._jwt_secret = jwt_secret
+        self._audience = audience
+        self._leeway = leeway
+        self._algorithms = [alg.strip() for alg in algorithms.split(",") if alg.strip()]
+        self._claims_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self._jwks_cache = TTLCache(maxsize=1, ttl=jwks_ttl)
+        self.local_verifications = 0
+        self.remote_verifications = 0
+
+    def startup(self) -> None:
+        """Report once when asymmetric tokens cannot be verified locally"""
+        if self._mode != "remote" and pyjwt is None:
+            fallback = "verified remotely" if self._mode == "hybrid" else "rejected"
+            print(
+                f"PyJWT is not installed, tokens signed with asymmetric keys are {fallback}"
+            )
+
+    @staticmethod
+    def _token_key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    @staticmethod
+    def _decode_segments(token: str) -> Tuple[dict, dict]:
+        """Decode the header and payload without checking the signature"""
+        try:
+            header_segment, payload_segment, _ = token.split(".")
+            header = json.loads(_b64url_decode(header_segment))
+            payload = json.loads(_b64url_decode(payload_segment))
+        except ValueError:
+            raise InvalidTokenError("Malformed token")
+        if not isinstance(header, dict) or not isinstance(payload, dict):
+            raise InvalidTokenError("Malformed token")
+        return header, payload
+
+    def _fetch_jwks(self) -> Dict[str, dict]:
+        """Download the project's signing keys, keyed by key id"""
+        response = http_client.sync_client.get(
+            f"{settings.NEXT_PUBLIC_SUPABASE_URL}/auth/v1/.well-known/jwks.json",
+            timeout=5,
+        )
+        response.raise_for_status()
+        return {key["kid"]: key for key in response.json().get("keys", [])}
+
+    def _get_jwks(self) -> Dict[str, dict]:
+        jwks = self._jwks_cache.get("jwks")
+        if jwks is None:
+            try:
+                jwks = self._fetch_jwks()
+            except Exception as e:
+                print(f"Failed to fetch Supabase JWKS: {e}")
+                jwks = {}
+            self._jwks_cache.set("jwks", jwks)
+        return jwks
+
+    @staticmethod
+    def _numeric_claim(claims: dict, name: str) -> Optional[float]:
+        if name not in claims:
+            return None
+        try:
+            return float(claims[name])
+        except (TypeError, ValueError):
+            raise InvalidTokenError(f"Token claim {name} is not a number")
+
+    def _check_claims(self, claims: dict) -> None:
+        now = time.time()
+        expires = self._numeric_claim(claims, "exp")
+        if expires is not None and now > expires + self._leeway:
+            raise InvalidTokenError("Token has expired")
+        not_before = self._numeric_claim(claims, "nbf")
+        if not_before is not None and now < not_before - self._leeway:
+            raise InvalidTokenError("Token is not yet valid")
+        if self._audience:
+            audience = claims.get("aud")
+            audiences = audience if isinstance(audience, list) else [audience]
+            if self._audience not in audiences:
+                raise InvalidTokenError("Token audience is invalid")
+        if not claims.get("sub"):
+            raise InvalidTokenError("Token has no subject")
+
+    def _verify_locally(self, token: str) -> Optional[dict]:
+        """Return verified claims, or None when no local key can check the token"""
+        header, claims = self._decode_segments(token)
+        algorithm = header.get("alg")
+
+        if algorithm == "HS256":
+            if not self._jwt_secret:
+                return None
+            signing_input, _, signature = token.rpartition(".")
+            expected = hmac.new(
+                self._jwt_secret.encode(), signing_input.encode(), hashlib.sha256
+            ).digest()
+            try:
+                valid = hmac.compare_digest(expected, _b64url_decode(signature))
+            except ValueError:
+                valid = False
+            if not valid:
+                raise InvalidTokenError("Token signature is invalid")
+        else:
+            # Asymmetric keys need PyJWT with its crypto extra
+            if pyjwt is None or not header.get("kid"):
+                return None
+            jwk = self._get_jwks().get(header["kid"])
+            if jwk is None:
+                return None
+            # The accepted algorithm comes from the key, never from the token
+            allowed = [jwk["alg"]] if jwk.get("alg") else self._algorithms
+            if algorithm not in allowed:
+                raise InvalidTokenError("Token algorithm is not allowed")
+            try:
+                pyjwt.decode(
+                    token,
+                    key=pyjwt.PyJWK(jwk).key,
+                    algorithms=allowed,
+                    options={"verify_exp": False, "verify_aud": False},
+                )
+            except pyjwt.PyJWTError as e:
+                raise InvalidTokenError(str(e))
+
+        self._check_claims(claims)
+        self.local_verifications += 1
+        return claims
+
+    async def _verify_remotely(self, token: str) -> dict:
+        """Ask GoTrue to validate the token"""
+        # Loaded with the Supabase client
+        from gotrue.errors import AuthError
+
+        try:
+            user = await run_sync(get_supabase().auth.get_user, token)
+        except AuthError as e:
+            raise InvalidTokenError(str(e)) from e
+        self.remote_verifications += 1
+        _, claims = self._decode_segments(token)
+        return {**claims, "sub": user.user.id}
+
+    def _needs_jwks(self, token: str) -> bool:
+        header, _ = self._decode_segments(token)
+        return (
+            pyjwt is not None
+            and header.get("alg") != "HS256"
+            and self._jwks_cache.get("jwks") is None
+        )
+
+    async def verify(self, token: str) -> dict:
+        """Return the claims of a valid token, raising InvalidTokenError otherwise"""
+        key = self._token_key(token)
+        claims = self._claims_cache.get(key)
+        if claims is not None:
+            return claims
+
+        if self._mode != "remote":
+            if self._needs_jwks(token):
+                await run_sync(self._get_jwks)
+            claims = self._verify_locally(token)
+            if claims is None and self._mode == "local":
+                raise InvalidTokenError("Token cannot be verified locally")
+        if claims is None:
+            claims = await self._verify_remotely(token)
+
+        ttl = self._claims_cache.ttl
+        if "exp" in claims:
+            ttl = min(ttl, float(claims["exp"]) - time.time())
+        # Tokens accepted within the leeway of their expiry are not cached
+        if ttl > 0:
+            self._claims_cache.set(key, claims, ttl=ttl)
+        return claims
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self._mode,
+            "local_verifications": self.local_verifications,
+            "remote_verifications": self.remote_verifications,
+            "cache": self._claims_cache.stats(),
+        }
+
+
+token_verifier = SupabaseTokenVerifier()
 
 
 async def verify_supabase_token(authorization: str = Header(None)):
@@ -36,14 +367,14 @@ async def verify_supabase_token(authorization: str = Header(None)):
         # Get token from Bearer header
         token = authorization.split()[1]
 
-        # Verify the token
-        user = supabase.auth.get_user(token)
+        # Verify the token, locally when possible
+        claims = await token_verifier.verify(token)
 
         # Return both user ID and token
-        return {"id": user.user.id, "access_token": token}
+        return {"id": claims["sub"], "access_token": token}
 
-    except supabase.GoTrueError as e:
-        # Handle specific Supabase auth errors
+    except InvalidTokenError as e:
+        # Handle invalid tokens and Supabase auth errors
         raise HTTPException(status_code=401, detail=str(e))
     except Exception as e:
         # Log unexpected errors but don't expose details
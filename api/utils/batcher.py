@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Set
+
+BatchFunction = Callable[[Hashable, List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class MicroBatcher:
+    """Collects single-key lookups for a short window and resolves them in one call.
+
+    Lookups are grouped (e.g. by market) because only lookups sharing the same
+    request parameters can be sent together. A group is flushed when its
+    window elapses or when it reaches max_batch_size distinct keys, and
+    batch_fn receives the group and its keys and returns a key -> value map.
+    """
+
+    def __init__(
+        self, batch_fn: BatchFunction, window: float = 0.01, max_batch_size: int = 50
+    ):
+        self._batch_fn = batch_fn
+        self._window = window
+        self._max_batch_size = max_batch_size
+        self._pending: Dict[Hashable, Dict[Hashable, List[asyncio.Future]]] = {}
+        self._timers: Dict[Hashable, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.lookups = 0
+        self.batches = 0
+        self.keys_sent = 0
+
+    async def load(self, group: Hashable, key: Hashable) -> Any:
+        """Resolve key through the next batch of its group"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        waiters = self._pending.setdefault(group, {})
+        waiters.setdefault(key, []).append(future)
+        self.lookups += 1
+
+        if len(waiters) >= self._max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self._window, self._flush, group)
+        return await future
+
+    def _flush(self, group: Hashable) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        waiters = self._pending.pop(group, None)
+        if waiters:
+            task = asyncio.ensure_future(self._run_batch(group, waiters))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(
+        self, group: Hashable, waiters: Dict[Hashable, List[asyncio.Future]]
+    ) -> None:
+        self.batches += 1
+        self.keys_sent += len(waiters)
+        try:
+            results = await self._batch_fn(group, list(waiters))
+        except Exception as e:
+            for futures in waiters.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, futures in waiters.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(results.get(key))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lookups": self.lookups,
+            "batches": self.batches,
+            "keys_sent": self.keys_sent,
+            "average_batch_size": self.keys_sent / self.batches if self.batches else 0,
+        }
@@ -0,0 +1,296 @@
+import asyncio
+import json
+import uuid
+from functools import lru_cache, wraps
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from api.config.settings import settings
+from api.utils.cache import TTLCache
+from api.utils.tabular import encode_tables
+
+# Keys that are large and rarely useful to the assistant, dropped first
+LOW_VALUE_KEYS = frozenset(
+    {
+        "_links",
+        "accessibility",
+        "ada",
+        "available_markets",
+        "external_ids",
+        "external_urls",
+        "href",
+        "images",
+        "info",
+        "pleaseNote",
+        "preview_url",
+        "products",
+        "restrictions",
+        "seatmap",
+        "uri",
+    }
+)
+
+Path = Tuple[str, ...]
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, or None when it cannot be loaded"""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(settings.TOOL_OUTPUT_ENCODING)
+    except Exception as e:
+        print(f"Token counting falls back to an estimate: {e}")
+        return None
+
+
+def count_tokens(value: Any) -> int:
+    """Number of tokens value takes up when serialized as JSON"""
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    encoding = _encoding()
+    if encoding is None:
+        # About four characters per token for JSON
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def parse_budgets(value: str) -> Dict[str, int]:
+    """Parse per-tool budgets like "search_spotify=1500,get_playlist=3000" """
+    budgets = {}
+    for item in value.split(","):
+        name, _, budget = item.partition("=")
+        if name.strip() and budget.strip():
+            budgets[name.strip()] = int(budget)
+    return budgets
+
+
+def _drop_keys(value: Any, dropped: Set[str]) -> Any:
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key in LOW_VALUE_KEYS:
+                dropped.add(key)
+            else:
+                result[key] = _drop_keys(item, dropped)
+        return result
+    if isinstance(value, list):
+        return [_drop_keys(item, dropped) for item in value]
+    return value
+
+
+def _truncate_strings(value: Any, max_chars: int) -> Tuple[Any, bool]:
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + "...", True
+    if isinstance(value, dict):
+        truncated = False
+        result = {}
+        for key, item in value.items():
+            result[key], cut = _truncate_strings(item, max_chars)
+            truncated = truncated or cut
+        return result, truncated
+    if isinstance(value, list):
+        pairs = [_truncate_strings(item, max_chars) for item in value]
+        return [item for item, _ in pairs], any(cut for _, cut in pairs)
+    return value, False
+
+
+def _pageable_lists(value: Any, path: Path = ()) -> List[Tuple[Path, list]]:
+    """Lists reachable through dict keys only; lists inside list items are not paged"""
+    if isinstance(value, list):
+        return [(path, value)] if path else []
+    if isinstance(value, dict):
+        return [
+            found
+            for key, item in value.items()
+            for found in _pageable_lists(item, path + (key,))
+        ]
+    return []
+
+
+def _get_path(value: Any, path: Path) -> Any:
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _set_path(value: Dict[str, Any], path: Path, item: Any) -> Dict[str, Any]:
+    """Copy of value with item at path, sharing every untouched branch"""
+    if len(path) == 1:
+        return {**value, path[0]: item}
+    return {**value, path[0]: _set_path(value.get(path[0], {}), path[1:], item)}
+
+
+class ToolOutputCompactor:
+    """Fits tool results into a per-tool token budget.
+
+    Results over budget are compacted deterministically: low-value keys are
+    dropped, long strings are cut and then the largest lists are shortened
+    until the result fits. When list items were left out, the full result is
+    kept for a while and a continuation cursor is added, which
+    get_more_results() turns into the next page of the shortened lists.
+
+    Tools listed in tabular_tools ("*" for all) return their lists of dicts
+    in the header-and-rows encoding of tabular.py, and are measured that way.
+    """
+
+    def __init__(
+        self,
+        budget: int = 2000,
+        budgets: Optional[Dict[str, int]] = None,
+        max_string_chars: int = 500,
+        cursor_ttl: float = 900.0,
+        max_cursors: int = 256,
+        tabular_tools: Optional[Set[str]] = None,
+    ):
+        self.budget = budget
+        self.budgets = budgets or {}
+        self.max_string_chars = max_string_chars
+        self.tabular_tools = set(tabular_tools or ())
+        self._cursors = TTLCache(maxsize=max_cursors, ttl=cursor_ttl)
+        self.compacted = 0
+
+    def budget_for(self, tool_name: str) -> int:
+        return self.budgets.get(tool_name, self.budget)
+
+    def _encoder(self, tool_name: str) -> Callable[[Any], Any]:
+        if tool_name in self.tabular_tools or "*" in self.tabular_tools:
+            return encode_tables
+        return lambda value: value
+
+    def compact(self, tool_name: str, result: Any) -> Any:
+        """Return result, or a compacted copy with a cursor when it is over budget"""
+        if not isinstance(result, dict) or "error" in result:
+            return result
+        budget = self.budget_for(tool_name)
+        encoded = self._encoder(tool_name)(result)
+        if budget <= 0 or count_tokens(encoded) <= budget:
+            return encoded
+
+        dropped: Set[str] = set()
+        data = _drop_keys(result, dropped)
+        return self._fit(tool_name, data, data, {}, sorted(dropped))
+
+    def more(self, cursor: str) -> Dict[str, Any]:
+        """Next page of the lists that were shortened in the result behind cursor"""
+        entry = self._cursors.get(cursor)
+        if entry is None:
+            return {"error": "Unknown or expired cursor, call the original tool again"}
+        tool_name, data, offsets = entry
+        page: Dict[str, Any] = {}
+        for path, offset in offsets.items():
+            page = _set_path(page, path, _get_path(data, path)[offset:])
+        return self._fit(tool_name, data, page, offsets, [])
+
+    def _fit(
+        self,
+        tool_name: str,
+        data: Dict[str, Any],
+        page: Dict[str, Any],
+        offsets: Dict[Path, int],
+        dropped: List[str],
+    ) -> Dict[str, Any]:
+        budget = self.budget_for(tool_name)
+        encode = self._encoder(tool_name)
+        cursor = uuid.uuid4().hex
+        strings_cut = False
+        if count_tokens(encode(page)) > budget:
+            page, strings_cut = _truncate_strings(page, self.max_string_chars)
+
+        lists = dict(_pageable_lists(page))
+        keep = {path: len(items) for path, items in lists.items()}
+
+        def render() -> Dict[str, Any]:
+            result = page
+            for path, items in lists.items():
+                if keep[path] < len(items):
+                    result = _set_path(result, path, items[: keep[path]])
+            marker = self._marker(cursor, lists, keep, offsets, dropped, strings_cut)
+            if marker:
+                result = {**result, "continuation": marker}
+            return result
+
+        while count_tokens(encode(render())) > budget:
+            candidates = [path for path in keep if keep[path] > 1]
+            if not candidates:
+                break
+            # Shorten the largest list to the most items that still fit
+            path = max(candidates, key=lambda p: (count_tokens(lists[p][: keep[p]]), p))
+            low, high, best = 1, keep[path] - 1, 1
+            while low <= high:
+                keep[path] = (low + high) // 2
+                if count_tokens(encode(render())) <= budget:
+                    best, low = keep[path], keep[path] + 1
+                else:
+                    high = keep[path] - 1
+            keep[path] = best
+
+        remaining = {
+            path: offsets.get(path, 0) + keep[path]
+            for path, items in lists.items()
+            if keep[path] < len(items)
+        }
+        if remaining:
+            self._cursors.set(cursor, (tool_name, data, remaining))
+        self.compacted += 1
+        return encode(render())
+
+    @staticmethod
+    def _marker(
+        cursor: str,
+        lists: Dict[Path, list],
+        keep: Dict[Path, int],
+        offsets: Dict[Path, int],
+        dropped: List[str],
+        strings_cut: bool,
+    ) -> Dict[str, Any]:
+        marker: Dict[str, Any] = {}
+        shortened = {
+            ".".join(path): {
+                "offset": offsets.get(path, 0),
+                "returned": keep[path],
+                "total": offsets.get(path, 0) + len(items),
+            }
+            for path, items in lists.items()
+            if keep[path] < len(items) or path in offsets
+        }
+        if any(keep[path] < len(items) for path, items in lists.items()):
+            marker["cursor"] = cursor
+        if shortened:
+            marker["lists"] = shortened
+        if dropped:
+            marker["omitted_keys"] = dropped
+        if strings_cut:
+            marker["truncated_strings"] = True
+        return marker
+
+    def wrap(self, tool_name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a sync or async tool function so its result is compacted"""
+        if asyncio.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                return self.compact(tool_name, await func(*args, **kwargs))
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            return self.compact(tool_name, func(*args, **kwargs))
+
+        return wrapper
+
+    def stats(self) -> Dict[str, Any]:
+        return {"compacted": self.compacted, "cursors": self._cursors.stats()}
+
+
+tool_output_compactor = ToolOutputCompactor(
+    budget=settings.TOOL_OUTPUT_TOKEN_BUDGET,
+    budgets=parse_budgets(settings.TOOL_OUTPUT_TOKEN_BUDGETS),
+    max_string_chars=settings.TOOL_OUTPUT_MAX_STRING_CHARS,
+    cursor_ttl=settings.TOOL_OUTPUT_CURSOR_TTL,
+    max_cursors=settings.TOOL_OUTPUT_MAX_CURSORS,
+    tabular_tools={
+        name.strip()
+        for name in settings.TOOL_OUTPUT_TABULAR_TOOLS.split(",")
+        if name.strip()
+    },
+)
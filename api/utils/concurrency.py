@@ -0,0 +1,90 @@
+import asyncio
+import functools
+import inspect
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+from api.config.settings import settings
+
+# Bounded pool for the blocking calls that remain (OpenAI SDK, Supabase client)
+sync_executor = ThreadPoolExecutor(
+    max_workers=settings.SYNC_WORKER_THREADS, thread_name_prefix="sync-io"
+)
+
+
+async def run_sync(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """Run a blocking callable on the bounded pool without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        sync_executor, functools.partial(func, *args, **kwargs)
+    )
+
+
+def to_async(func: Callable[..., Any]) -> Callable[..., Awaitable[Any]]:
+    """Wrap a blocking callable so that awaiting it runs it on the bounded pool"""
+
+    @functools.wraps(func)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await run_sync(func, *args, **kwargs)
+
+    return wrapper
+
+
+# Loop the app serves requests on, bound by its lifespan
+_app_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def bind_app_loop(loop: Optional[asyncio.AbstractEventLoop]) -> None:
+    global _app_loop
+    _app_loop = loop
+
+
+def call_async(func: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+    """Run an async function to completion from blocking code.
+
+    While the app runs, the coroutine runs on its loop, sharing that loop's
+    connection pool, schedulers and batchers; otherwise on a new loop. The
+    calling thread blocks, so this must never be called on a running loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError(f"{func.__name__} would block the running event loop")
+    loop = _app_loop
+    if loop is not None and loop.is_running():
+        return asyncio.run_coroutine_threadsafe(func(*args, **kwargs), loop).result()
+    return asyncio.run(func(*args, **kwargs))
+
+
+def blocking(func: Callable[..., Awaitable[Any]]) -> Callable[..., Any]:
+    """Blocking variant of an async function, with its signature and attributes"""
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return call_async(func, *args, **kwargs)
+
+    return wrapper
+
+
+def add_blocking_variants(cls: type) -> type:
+    """Give each public `a<name>` coroutine of cls a blocking `<name>` twin.
+
+    Service tools are written once, as coroutines; the blocking variants run
+    that same code through call_async.
+    """
+    for name, method in inspect.getmembers(cls, inspect.iscoroutinefunction):
+        if name.startswith("a") and not hasattr(cls, name[1:]):
+            setattr(cls, name[1:], staticmethod(blocking(method)))
+    return cls
+
+
+async def iterate_sync(iterable: Iterable[Any]) -> AsyncIterator[Any]:
+    """Iterate a blocking iterable, e.g. an OpenAI stream, on the bounded pool"""
+    iterator = iter(iterable)
+    done = object()
+    while True:
+        item = await run_sync(next, iterator, done)
+        if item is done:
+            return
+        yield item
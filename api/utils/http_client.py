@@ -0,0 +1,154 @@
+import asyncio
+import httpx
+from typing import AsyncIterator, Callable, Dict, Optional
+from urllib.parse import urlsplit
+from api.config.settings import settings
+
+
+async def _close_with_loop(client: httpx.AsyncClient) -> AsyncIterator[None]:
+    """Parked on the client's loop, so the loop's asyncgen shutdown closes it"""
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body that calls release once when it is closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Optional[Callable[[], None]] = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class UpstreamHTTPClient:
+    """Shared, pooled HTTP transport for all upstream API calls"""
+
+    def __init__(
+        self,
+        timeout: float = settings.HTTP_TIMEOUT,
+        connect_timeout: float = settings.HTTP_CONNECT_TIMEOUT,
+        max_connections: int = settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.HTTP_KEEPALIVE_EXPIRY,
+        max_connections_per_host: int = settings.HTTP_MAX_CONNECTIONS_PER_HOST,
+        http2: bool = settings.HTTP2_ENABLED,
+    ):
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._max_connections_per_host = max_connections_per_host
+        self._http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client_closer: Optional[AsyncIterator[None]] = None
+        self._sync_client: Optional[httpx.Client] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+
+    def _new_async_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            timeout=self._timeout, limits=self._limits, http2=self._http2
+        )
+
+    def _open_async_client(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Replace the async pool with one bound to loop, closing the old one"""
+        stale, stale_loop = self._client_closer, self._client_loop
+        if stale is not None and not stale_loop.is_closed():
+            # Its connections can only be closed on the loop that opened them
+            asyncio.run_coroutine_threadsafe(stale.aclose(), stale_loop)
+        self._client = self._new_async_client()
+        self._client_loop = loop
+        self._host_semaphores = {}
+        # Registered with the loop on first iteration, so the pool is closed
+        # when the loop shuts down even if shutdown() is never called
+        self._client_closer = _close_with_loop(self._client)
+        try:
+            self._client_closer.__anext__().send(None)
+        except StopIteration:
+            pass
+
+    async def startup(self) -> None:
+        """Open the async connection pool, called from the app lifespan"""
+        if self._client is None:
+            self._open_async_client(asyncio.get_running_loop())
+
+    async def shutdown(self) -> None:
+        """Close both connection pools, called from the app lifespan"""
+        if self._client is not None:
+            closer = self._client_closer
+            self._client = None
+            self._client_loop = None
+            self._client_closer = None
+            await closer.aclose()
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Async client, created on first use when running outside the app lifespan"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            # Pooled connections are bound to the loop that opened them
+            self._open_async_client(loop)
+        return self._client
+
+    @property
+    def sync_client(self) -> httpx.Client:
+        """Pooled client for the remaining synchronous code paths"""
+        if self._sync_client is None:
+            self._sync_client = httpx.Client(timeout=self._timeout, limits=self._limits)
+        return self._sync_client
+
+    def _host_semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        if host not in self._host_semaphores:
+            self._host_semaphores[host] = asyncio.Semaphore(
+                self._max_connections_per_host
+            )
+        return self._host_semaphores[host]
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request, capping the number of concurrent requests per host"""
+        client = self.client
+        async with self._host_semaphore(url):
+            return await client.request(method, url, **kwargs)
+
+    async def send_stream(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and return the response with its body still unread.
+
+        The caller must read the body with aiter_bytes() and close the response.
+        The request keeps its per-host slot until then, as the connection does.
+        """
+        client = self.client
+        request = client.build_request(method, url, **kwargs)
+        semaphore = self._host_semaphore(url)
+        await semaphore.acquire()
+        try:
+            response = await client.send(request, stream=True)
+        except BaseException:
+            semaphore.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, semaphore.release)
+        return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+
+http_client = UpstreamHTTPClient()
@@ -0,0 +1,71 @@
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+from api.utils.cache import TTLCache
+from api.utils.single_flight import SingleFlight
+
+T = TypeVar("T")
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different request"""
+
+    def __init__(self):
+        super().__init__("Idempotency key was already used for a different request")
+
+
+class IdempotencyStore:
+    """Runs the request of each idempotency key once.
+
+    A duplicate arriving while the first request runs waits for the same
+    result, and one arriving up to ttl seconds after it succeeded gets the
+    stored result. Failures are not stored, so a retry after one runs again.
+    At most max_entries results are kept, least recently used first.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 10000):
+        self._results = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._flights = SingleFlight()
+        self._in_flight: Dict[Hashable, str] = {}  # key -> request fingerprint
+        self.replayed = 0
+        self.conflicts = 0
+
+    @staticmethod
+    def fingerprint(request: str) -> str:
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def _check(self, expected: str, fingerprint: str) -> None:
+        if expected != fingerprint:
+            self.conflicts += 1
+            raise IdempotencyConflict()
+
+    async def do(
+        self, key: Hashable, request: str, func: Callable[[], Awaitable[T]]
+    ) -> T:
+        """The result of func for key, running it only if no earlier request did"""
+        fingerprint = self.fingerprint(request)
+        stored = self._results.get(key)
+        if stored is not None:
+            self._check(stored[0], fingerprint)
+            self.replayed += 1
+            return stored[1]
+        self._check(self._in_flight.setdefault(key, fingerprint), fingerprint)
+
+        async def run() -> T:
+            try:
+                result = await func()
+                self._results.set(key, (fingerprint, result))
+                return result
+            finally:
+                self._in_flight.pop(key, None)
+
+        # Shielded, so the run outlives a client that disconnects and retries
+        return await self._flights.do(key, run)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "stored": len(self._results),
+            "in_flight": len(self._in_flight),
+            "attached": self._flights.coalesced,
+            "replayed": self.replayed,
+            "conflicts": self.conflicts,
+        }
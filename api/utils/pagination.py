@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+
+# The Discovery API rejects pages whose size * page reaches this depth
+TICKETMASTER_MAX_DEPTH = 1000
+
+TICKETMASTER_DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def spotify_next_request(
+    next_url: Optional[str], base_url: str
+) -> Optional[Tuple[str, Dict[str, str]]]:
+    """Split a Spotify `next` link into the endpoint and params of the next page"""
+    base = base_url.rstrip("/") + "/"
+    if not next_url or not next_url.startswith(base):
+        return None
+    url = urlsplit(next_url[len(base) :])
+    return url.path, dict(parse_qsl(url.query))
+
+
+def ticketmaster_next_page(page: Dict[str, Any], size: int) -> Optional[int]:
+    """Number of the page after `page`, or None past the last or deepest page"""
+    if not page or "number" not in page:
+        return None
+    next_page = page["number"] + 1
+    if next_page >= page.get("totalPages", 0):
+        return None
+    if (next_page + 1) * size > TICKETMASTER_MAX_DEPTH:
+        return None
+    return next_page
+
+
+def split_date_window(
+    start: str, end: str, parts: int, min_seconds: int
+) -> Optional[List[Tuple[str, str]]]:
+    """Split a startDateTime/endDateTime window into up to `parts` adjacent windows.
+
+    Returns None when the window cannot be parsed or is already narrower
+    than two windows of min_seconds.
+    """
+    try:
+        start_at = datetime.strptime(start, TICKETMASTER_DATE_FORMAT)
+        end_at = datetime.strptime(end, TICKETMASTER_DATE_FORMAT)
+    except (TypeError, ValueError):
+        return None
+    # Both ends are inclusive, so the window covers one second more than end - start
+    seconds = int((end_at - start_at).total_seconds()) + 1
+    parts = min(parts, seconds // max(min_seconds, 1))
+    if parts < 2:
+        return None
+
+    bounds = [
+        start_at + timedelta(seconds=seconds * i // parts) for i in range(parts + 1)
+    ]
+    return [
+        (
+            bounds[i].strftime(TICKETMASTER_DATE_FORMAT),
+            (bounds[i + 1] - timedelta(seconds=1)).strftime(TICKETMASTER_DATE_FORMAT),
+        )
+        for i in range(parts)
+    ]
+
+
+class PageCollector:
+    """Merges the items of projected pages into one result of at most max_items.
+
+    Pages are added as they arrive, so only the projected items are kept in
+    memory. add() returns False once enough items have been collected.
+    """
+
+    def __init__(self, key: str, max_items: int):
+        self.key = key
+        self.max_items = max_items
+        self.items: List[Any] = []
+        self.total: Optional[int] = None
+        self.error: Optional[Dict[str, Any]] = None
+
+    def add(self, items: List[Any], total: Optional[int] = None) -> bool:
+        if total is not None:
+            self.total = total
+        self.items.extend(items[: self.max_items - len(self.items)])
+        return len(self.items) < self.max_items
+
+    def fail(self, response: Dict[str, Any]) -> None:
+        self.error = response
+
+    def result(self) -> Dict[str, Any]:
+        if self.error is not None and not self.items:
+            return self.error
+        result = {
+            self.key: self.items,
+            "total": self.total,
+            "has_more": self.total is not None and self.total > len(self.items),
+        }
+        if self.error is not None:
+            result["error"] = self.error.get("error")
+        return result
@@ -0,0 +1,153 @@
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from api.config.settings import settings
+
+# One path segment: a key or `*`, optionally followed by a slice like [2], [1:5] or [-3:]
+_SEGMENT = re.compile(
+    r"\s*([^.,()\[\]\s]+)\s*(?:\[\s*(-?\d+)?\s*(?:(:)\s*(-?\d+)?\s*)?\])?\s*"
+)
+
+Segment = Tuple[str, Optional[slice]]
+
+
+class InvalidFieldsError(ValueError):
+    """Raised for a fields expression that cannot be parsed"""
+
+
+class ProjectionNode:
+    """One level of a compiled fields expression"""
+
+    __slots__ = ("children", "wildcard", "slice", "leaf")
+
+    def __init__(self):
+        self.children: Dict[str, "ProjectionNode"] = {}
+        self.wildcard: Optional["ProjectionNode"] = None
+        self.slice: Optional[slice] = None
+        self.leaf = False
+
+
+def _parse_segment(expr: str, pos: int) -> Tuple[Segment, int]:
+    match = _SEGMENT.match(expr, pos)
+    if match is None:
+        raise InvalidFieldsError(f"Invalid fields expression at position {pos}: {expr}")
+    name, start, colon, stop = match.groups()
+    selected = None
+    if colon:
+        selected = slice(int(start) if start else None, int(stop) if stop else None)
+    elif start:
+        index = int(start)
+        selected = slice(index, index + 1 or None)
+    return (name, selected), match.end()
+
+
+def _parse_list(expr: str, pos: int) -> Tuple[List[List[Segment]], int]:
+    """Parse comma-separated items up to the end or a closing parenthesis"""
+    paths = []
+    while True:
+        while pos < len(expr) and expr[pos].isspace():
+            pos += 1
+        if pos < len(expr) and expr[pos] not in ",)":
+            item_paths, pos = _parse_item(expr, pos)
+            paths.extend(item_paths)
+        if pos < len(expr) and expr[pos] == ",":
+            pos += 1
+            continue
+        return paths, pos
+
+
+def _parse_item(expr: str, pos: int) -> Tuple[List[List[Segment]], int]:
+    """Parse a dotted path, expanding a trailing `(...)` group under it"""
+    path = []
+    while True:
+        segment, pos = _parse_segment(expr, pos)
+        path.append(segment)
+        if pos < len(expr) and expr[pos] == ".":
+            pos += 1
+            continue
+        break
+    if pos < len(expr) and expr[pos] == "(":
+        group, pos = _parse_list(expr, pos + 1)
+        if pos >= len(expr) or expr[pos] != ")":
+            raise InvalidFieldsError(f"Unclosed parenthesis in fields: {expr}")
+        return [path + sub_path for sub_path in group], pos + 1
+    return [path], pos
+
+
+def _merge(target: ProjectionNode, source: ProjectionNode) -> None:
+    target.leaf = target.leaf or source.leaf
+    target.slice = target.slice or source.slice
+    for name, child in source.children.items():
+        _merge(target.children.setdefault(name, ProjectionNode()), child)
+    if source.wildcard is not None:
+        target.wildcard = target.wildcard or ProjectionNode()
+        _merge(target.wildcard, source.wildcard)
+
+
+def _propagate_wildcards(node: ProjectionNode) -> None:
+    """Fold each wildcard subtree into its named siblings, so lookups need one child"""
+    if node.wildcard is not None:
+        for child in node.children.values():
+            _merge(child, node.wildcard)
+        _propagate_wildcards(node.wildcard)
+    for child in node.children.values():
+        _propagate_wildcards(child)
+
+
+@lru_cache(maxsize=settings.PROJECTION_CACHE_SIZE)
+def compile_fields(fields: str) -> ProjectionNode:
+    """Compile a fields expression into a trie, e.g. "id,items(name,artists[:2].name)" """
+    paths, pos = _parse_list(fields, 0)
+    if pos != len(fields):
+        raise InvalidFieldsError(
+            f"Unexpected {fields[pos]!r} at position {pos} in fields: {fields}"
+        )
+
+    root = ProjectionNode()
+    for path in paths:
+        node = root
+        for name, selected in path:
+            if name == "*":
+                node.wildcard = node.wildcard or ProjectionNode()
+                child = node.wildcard
+            else:
+                child = node.children.setdefault(name, ProjectionNode())
+            if selected is not None:
+                child.slice = selected
+            node = child
+        node.leaf = True
+    _propagate_wildcards(root)
+    return root
+
+
+def _apply(value: Any, node: ProjectionNode) -> Any:
+    if node.slice is not None and isinstance(value, list):
+        value = value[node.slice]
+    if node.leaf:
+        return value
+    return _descend(value, node)
+
+
+def _descend(value: Any, node: ProjectionNode) -> Any:
+    if isinstance(value, dict):
+        if node.wildcard is None:
+            return {
+                name: _apply(value[name], child)
+                for name, child in node.children.items()
+                if name in value
+            }
+        return {
+            key: _apply(item, node.children.get(key, node.wildcard))
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        # Lists are projected element-wise with the same fields
+        return [_descend(item, node) for item in value]
+    return value
+
+
+def project(data: Any, fields: Optional[str]) -> Any:
+    """Keep only the paths selected by fields; missing paths are left out"""
+    if not fields:
+        return data
+    return _descend(data, compile_fields(fields))
@@ -0,0 +1,201 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+import httpx
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be started before its queue deadline"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(
+            f"Rate limited by {upstream}, retry after {retry_after:.0f} seconds"
+        )
+
+
+def parse_retry_after(value: Optional[str], default: float = 1.0) -> float:
+    """Seconds to wait from a Retry-After header, in delta-seconds or HTTP-date form"""
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class UpstreamScheduler:
+    """Paces calls to one upstream to its quota and backs off when it throttles.
+
+    Calls wait in FIFO order for a token from a token bucket refilled at
+    `rate` per second, and for a free slot under an AIMD concurrency limit:
+    the limit grows by one slot per `limit` successful calls and is halved
+    when the upstream answers 429. A 429 also pauses the whole bucket for
+    its Retry-After, and the call is retried while its deadline allows.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rate: float,
+        burst: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        queue_timeout: float = 10.0,
+        max_retries: int = 2,
+        max_retry_after: float = 60.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.queue_timeout = queue_timeout
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        self.concurrency_limit = float(max_concurrency)
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Lock] = None
+        self._slot_freed: Optional[asyncio.Event] = None
+        self.calls = 0
+        self.throttled = 0
+        self.retries = 0
+        self.rejected = 0
+        self.queue_wait_total = 0.0
+        self.queue_wait_max = 0.0
+
+    def _primitives(self):
+        """Queue primitives bound to the running loop"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Lock()
+            self._slot_freed = asyncio.Event()
+        return self._queue, self._slot_freed
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._refilled_at = now
+
+    def _wait_time(self, now: float) -> Optional[float]:
+        """Seconds until a call may start, 0 if now, None if waiting for a slot"""
+        if now < self._blocked_until:
+            return self._blocked_until - now
+        self._refill(now)
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        if self._in_flight >= int(self.concurrency_limit):
+            return None
+        return 0.0
+
+    async def _acquire(self, deadline: float) -> None:
+        queue, slot_freed = self._primitives()
+        started = time.monotonic()
+        async with queue:
+            while True:
+                now = time.monotonic()
+                wait = self._wait_time(now)
+                if wait == 0:
+                    break
+                remaining = deadline - now
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    self.rejected += 1
+                    raise RateLimitExceeded(
+                        self.name, max(wait or 0.0, self._blocked_until - now, 1.0)
+                    )
+                if wait is None:
+                    slot_freed.clear()
+                    try:
+                        await asyncio.wait_for(slot_freed.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep(wait)
+            self._tokens -= 1
+            self._in_flight += 1
+
+        waited = time.monotonic() - started
+        self.queue_wait_total += waited
+        self.queue_wait_max = max(self.queue_wait_max, waited)
+
+    def _release(self) -> None:
+        self._in_flight -= 1
+        if self._slot_freed is not None:
+            self._slot_freed.set()
+
+    def _on_success(self) -> None:
+        self.concurrency_limit = min(
+            self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit
+        )
+
+    def _on_throttled(self, retry_after: float) -> None:
+        now = time.monotonic()
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, now + retry_after)
+        self._tokens = min(self._tokens, 0.0)
+        # A burst of 429s from one overload episode only halves the limit once
+        if now - self._last_decrease >= max(retry_after, 1.0):
+            self._last_decrease = now
+            self.concurrency_limit = max(
+                self.min_concurrency, self.concurrency_limit / 2
+            )
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        timeout: Optional[float] = None,
+    ) -> httpx.Response:
+        """Send a request when the quota allows, retrying 429s until the deadline"""
+        deadline = time.monotonic() + (
+            self.queue_timeout if timeout is None else timeout
+        )
+        attempt = 0
+        while True:
+            await self._acquire(deadline)
+            self.calls += 1
+            try:
+                response = await send()
+            finally:
+                self._release()
+
+            if response.status_code != 429:
+                self._on_success()
+                return response
+
+            retry_after = min(
+                parse_retry_after(response.headers.get("Retry-After")),
+                self.max_retry_after,
+            )
+            # Release the connection of a streamed response before retrying
+            await response.aclose()
+            self._on_throttled(retry_after)
+            if attempt >= self.max_retries or (
+                time.monotonic() + retry_after > deadline
+            ):
+                raise RateLimitExceeded(self.name, retry_after)
+            attempt += 1
+            self.retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency_limit": int(self.concurrency_limit),
+            "in_flight": self._in_flight,
+            "calls": self.calls,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "queue_wait_avg": self.queue_wait_total / self.calls if self.calls else 0,
+            "queue_wait_max": self.queue_wait_max,
+        }
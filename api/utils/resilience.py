@@ -0,0 +1,330 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+import httpx
+
+# Only these methods are safe to send more than once
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit is open"""
+
+    def __init__(self, upstream: str, retry_after: float):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(
+            f"{upstream} is unavailable, retry after {retry_after:.0f} seconds"
+        )
+
+
+def endpoint_class(endpoint: str) -> str:
+    """Endpoint with its ID segments masked, e.g. artists/*/albums"""
+    segments = endpoint.split("?", 1)[0].split("/")
+    return "/".join("*" if i % 2 else segment for i, segment in enumerate(segments))
+
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures and probes before closing again.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected for recovery_timeout seconds. It then lets up to
+    half_open_max_calls trial calls through: a success closes the circuit,
+    a failure opens it again. A trial that ends without an answer, e.g.
+    cancelled, counts as a failure, and one that never reports back frees
+    its slot after another recovery_timeout.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_timeout: float = 30.0,
+        half_open_max_calls: int = 1,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._update_state(time.monotonic())
+            return self._state
+
+    def _update_state(self, now: float) -> None:
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._trial_calls = 0
+        elif (
+            self._state == self.HALF_OPEN
+            and self._trial_calls
+            and now - self._trial_started >= self.recovery_timeout
+        ):
+            # The trials were lost without reporting back
+            self._trial_calls = 0
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may be sent now"""
+        with self._lock:
+            now = time.monotonic()
+            self._update_state(now)
+            if self._state == self.CLOSED:
+                return
+            if (
+                self._state == self.HALF_OPEN
+                and self._trial_calls < self.half_open_max_calls
+            ):
+                self._trial_calls += 1
+                self._trial_started = now
+                return
+            self.rejected += 1
+            retry_after = max(self._opened_at + self.recovery_timeout - now, 1.0)
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._open()
+
+    def record_abandoned(self) -> None:
+        """Record a call that ended without an answer from the upstream.
+
+        Cancelled calls and local errors say nothing about the upstream, but a
+        half-open circuit must not wait for a trial that will never report.
+        """
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._failures += 1
+                self._open()
+
+    def _open(self) -> None:
+        if self._state != self.OPEN:
+            self.opened += 1
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+class LatencyTracker:
+    """Rolling latency samples per endpoint class, used to time hedged requests"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, percentile: float = 0.95) -> Optional[float]:
+        """Observed latency percentile, or None until enough samples exist"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(len(samples) * percentile), len(samples) - 1)]
+
+
+class ResilientUpstream:
+    """Circuit breaker, jittered retries and optional hedging around one upstream.
+
+    Transport errors and 502/503/504 responses count as failures. They are
+    retried with full-jitter exponential backoff, but only for idempotent
+    methods. With hedging enabled, a GET still running after the observed
+    p95 latency of its endpoint class is sent again and the first response wins.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        breaker: CircuitBreaker,
+        max_retries: int = 2,
+        base_delay: float = 0.2,
+        max_delay: float = 2.0,
+        hedging: bool = False,
+        latency: Optional[LatencyTracker] = None,
+    ):
+        self.name = name
+        self.breaker = breaker
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedging = hedging
+        self.latency = latency or LatencyTracker()
+        self.retries = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt`"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def _retryable(self, method: str, attempt: int) -> bool:
+        return method in IDEMPOTENT_METHODS and attempt < self.max_retries
+
+    def _record(self, key: str, started: float, response: httpx.Response) -> None:
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latency.record(key, time.monotonic() - started)
+
+    async def _timed(
+        self, send: Callable[[], Awaitable[httpx.Response]], key: str
+    ) -> httpx.Response:
+        started = time.monotonic()
+        try:
+            response = await send()
+        except httpx.TransportError:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # Cancelled, e.g. a losing hedge, or failed before reaching the upstream
+            self.breaker.record_abandoned()
+            raise
+        self._record(key, started, response)
+        return response
+
+    async def _hedged(
+        self, send: Callable[[], Awaitable[httpx.Response]], key: str, delay: float
+    ) -> httpx.Response:
+        """Send again if the first request is slower than delay, first success wins"""
+        first = asyncio.ensure_future(self._timed(send, key))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done:
+                return first.result()
+
+            self.hedged += 1
+            second = asyncio.ensure_future(self._timed(send, key))
+            tasks.append(second)
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                succeeded = [task for task in done if task.exception() is None]
+                if succeeded:
+                    winner = first if first in succeeded else succeeded[0]
+                    if winner is second:
+                        self.hedge_wins += 1
+                    return winner.result()
+            # Both requests failed, raise the error of the later one
+            return second.result()
+        finally:
+            # The slower request, or both when the caller gave up
+            for task in tasks:
+                task.cancel()
+
+    async def run(
+        self,
+        send: Callable[[], Awaitable[httpx.Response]],
+        endpoint: str,
+        method: str = "GET",
+        hedge: bool = True,
+    ) -> httpx.Response:
+        """Send a request through the breaker, retrying transient failures.
+
+        Pass hedge=False for streamed responses, which a losing hedge would leave open.
+        """
+        key = endpoint_class(endpoint)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            delay = self.latency.percentile(key) if self.hedging and hedge else None
+            try:
+                if delay is not None and method == "GET":
+                    response = await self._hedged(send, key, delay)
+                else:
+                    response = await self._timed(send, key)
+            except httpx.TransportError:
+                if not self._retryable(method, attempt):
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                if not self._retryable(method, attempt):
+                    return response
+                await response.aclose()
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(self.backoff(attempt))
+
+    def run_sync(
+        self,
+        send: Callable[[], httpx.Response],
+        endpoint: str,
+        method: str = "GET",
+    ) -> httpx.Response:
+        """Blocking variant of run for the synchronous request paths, without hedging"""
+        key = endpoint_class(endpoint)
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            started = time.monotonic()
+            try:
+                response = send()
+            except httpx.TransportError:
+                self.breaker.record_failure()
+                if not self._retryable(method, attempt):
+                    raise
+            except BaseException:
+                self.breaker.record_abandoned()
+                raise
+            else:
+                self._record(key, started, response)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                if not self._retryable(method, attempt):
+                    return response
+            attempt += 1
+            self.retries += 1
+            time.sleep(self.backoff(attempt))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker": self.breaker.stats(),
+            "retries": self.retries,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+        }
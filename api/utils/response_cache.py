@@ -0,0 +1,66 @@
+import json
+import re
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+from api.utils.cache import TTLCache
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+class ResponseCache:
+    """Caches raw upstream payloads keyed by endpoint and normalized params.
+
+    Each endpoint class is described by a (name, regex, ttl) rule; endpoints
+    that match no rule are never cached. Payloads are stored before any
+    fields projection, so every projection of an entity shares one entry.
+    """
+
+    def __init__(
+        self,
+        rules: List[Tuple[str, str, float]],
+        max_entries: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+    ):
+        self._rules = [(name, re.compile(pattern), ttl) for name, pattern, ttl in rules]
+        self._cache = TTLCache(
+            maxsize=max_entries, max_bytes=max_bytes, sizeof=_json_size
+        )
+        self._class_stats: Dict[str, Dict[str, int]] = {
+            name: {"hits": 0, "misses": 0} for name, _, _ in rules
+        }
+
+    def _match(self, endpoint: str) -> Optional[Tuple[str, float]]:
+        for name, pattern, ttl in self._rules:
+            if pattern.fullmatch(endpoint):
+                return name, ttl
+        return None
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[dict]) -> Hashable:
+        """Key on the endpoint plus params, ignoring order and unset values"""
+        items = (params or {}).items()
+        return endpoint, tuple(sorted((k, str(v)) for k, v in items if v is not None))
+
+    def is_cacheable(self, endpoint: str) -> bool:
+        return self._match(endpoint) is not None
+
+    def get(self, endpoint: str, params: Optional[dict]) -> Optional[dict]:
+        match = self._match(endpoint)
+        if match is None:
+            return None
+        value = self._cache.get(self.make_key(endpoint, params))
+        self._class_stats[match[0]]["hits" if value is not None else "misses"] += 1
+        return value
+
+    def set(self, endpoint: str, params: Optional[dict], response: dict) -> None:
+        match = self._match(endpoint)
+        if match is None or not isinstance(response, dict) or "error" in response:
+            return
+        self._cache.set(self.make_key(endpoint, params), response, ttl=match[1])
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._cache.stats(), "classes": self._class_stats}
@@ -0,0 +1,122 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+
+class ChatQueueTimeout(Exception):
+    """Raised when a chat turn waited too long for its session or a free slot"""
+
+    def __init__(self, waited: float):
+        self.waited = waited
+        super().__init__(f"Chat queued for {waited:.1f} seconds, retry later")
+
+
+class SessionGate:
+    """Runs chat turns of one session in order and caps turns in flight.
+
+    Turns of the same session wait on a per-session FIFO lock, since an
+    OpenAI thread accepts one run at a time. A turn holding its session
+    lock then waits for one of max_concurrent slots shared by all
+    sessions. A turn waiting longer than queue_timeout in total raises
+    ChatQueueTimeout.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 32,
+        queue_timeout: Optional[float] = 60.0,
+        window: int = 1000,
+    ):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        # session_id -> [lock, turns holding or waiting for it]
+        self._sessions: Dict[str, List[Any]] = {}
+        self._waits: Deque[float] = deque(maxlen=window)
+        self.waiting_for_session = 0
+        self.waiting_for_slot = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.served = 0
+        self.timeouts = 0
+
+    def _bind(self) -> None:
+        # Locks and semaphores belong to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._sessions = {}
+
+    def _remaining(self, deadline: Optional[float]) -> Optional[float]:
+        return None if deadline is None else max(deadline - time.monotonic(), 0)
+
+    async def _acquire(
+        self, lock: asyncio.Lock, slots: asyncio.Semaphore, started: float
+    ) -> None:
+        deadline = None if self.queue_timeout is None else started + self.queue_timeout
+        try:
+            self.waiting_for_session += 1
+            try:
+                await asyncio.wait_for(lock.acquire(), self._remaining(deadline))
+            finally:
+                self.waiting_for_session -= 1
+
+            self.waiting_for_slot += 1
+            try:
+                await asyncio.wait_for(slots.acquire(), self._remaining(deadline))
+            except BaseException:
+                lock.release()
+                raise
+            finally:
+                self.waiting_for_slot -= 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ChatQueueTimeout(time.monotonic() - started) from None
+
+    @asynccontextmanager
+    async def slot(self, session_id: str) -> AsyncIterator[None]:
+        """Hold the session and a global slot for the duration of one turn"""
+        self._bind()
+        started = time.monotonic()
+        session = self._sessions.setdefault(session_id, [asyncio.Lock(), 0])
+        session[1] += 1
+        lock, slots = session[0], self._slots
+        try:
+            await self._acquire(lock, slots, started)
+            self._waits.append(time.monotonic() - started)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+                self.served += 1
+                slots.release()
+                lock.release()
+        finally:
+            session[1] -= 1
+            if session[1] == 0 and self._sessions.get(session_id) is session:
+                del self._sessions[session_id]
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "queue_depth": self.waiting_for_session + self.waiting_for_slot,
+            "waiting_for_session": self.waiting_for_session,
+            "waiting_for_slot": self.waiting_for_slot,
+            "active_sessions": len(self._sessions),
+            "served": self.served,
+            "timeouts": self.timeouts,
+            "wait_seconds": {
+                "average": sum(waits) / len(waits) if waits else 0.0,
+                "p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "max": waits[-1] if waits else 0.0,
+            },
+        }
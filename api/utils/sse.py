@@ -0,0 +1,64 @@
+import json
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+def format_event(event: str, data: Any, event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events message; JSON data never spans several lines"""
+    lines = [] if event_id is None else [f"id: {event_id}"]
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def encode_events(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Encode {"event", "data"} dicts as numbered Server-Sent Events.
+
+    The source is closed as soon as the response ends, including when the
+    client disconnects halfway.
+    """
+    async with aclosing(events):
+        event_id = 0
+        async for event in events:
+            yield format_event(event["event"], event["data"], event_id)
+            event_id += 1
+
+
+def _summary(values: Deque[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "average": sum(ordered) / len(ordered) if ordered else 0.0,
+        "p95": ordered[int(len(ordered) * 0.95)] if ordered else 0.0,
+        "max": ordered[-1] if ordered else 0.0,
+    }
+
+
+class StreamStats:
+    """Timings of the last `window` streamed chats"""
+
+    def __init__(self, window: int = 1000):
+        self._first_token: Deque[float] = deque(maxlen=window)
+        self._total: Deque[float] = deque(maxlen=window)
+        self.served = 0
+        self.disconnects = 0
+
+    def record(
+        self, total: float, first_token: Optional[float], finished: bool
+    ) -> None:
+        if not finished:
+            # The client went away before the last event
+            self.disconnects += 1
+            return
+        self.served += 1
+        self._total.append(total)
+        if first_token is not None:
+            self._first_token.append(first_token)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "served": self.served,
+            "disconnects": self.disconnects,
+            "first_token_seconds": _summary(self._first_token),
+            "total_seconds": _summary(self._total),
+        }
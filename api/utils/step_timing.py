@@ -0,0 +1,47 @@
+from typing import Any, Dict, List
+
+
+class ToolStepStats:
+    """Critical-path timing of the tool calls an assistant asks for in one step.
+
+    A step's serial time is what its calls would take one after another; its
+    wall time is what they took running together.
+    """
+
+    def __init__(self):
+        self.steps = 0
+        self.calls = 0
+        self.parallel_steps = 0
+        self.serial_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def record(self, durations: List[float], wall: float) -> Dict[str, Any]:
+        """Add one step's call durations and wall time, returning its summary"""
+        serial = sum(durations)
+        self.steps += 1
+        self.calls += len(durations)
+        self.parallel_steps += len(durations) > 1
+        self.serial_seconds += serial
+        self.wall_seconds += wall
+        return {
+            "calls": len(durations),
+            "seconds": wall,
+            "serial_seconds": serial,
+            "critical_path_seconds": max(durations, default=0.0),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "calls": self.calls,
+            "parallel_steps": self.parallel_steps,
+            "serial_seconds": self.serial_seconds,
+            "wall_seconds": self.wall_seconds,
+            "seconds_saved": max(self.serial_seconds - self.wall_seconds, 0.0),
+            "speedup": (
+                self.serial_seconds / self.wall_seconds if self.wall_seconds else 1.0
+            ),
+        }
+
+
+tool_step_stats = ToolStepStats()
@@ -0,0 +1,186 @@
+import json
+from typing import Any, AsyncIterator, Iterable, List, Optional, Tuple
+import httpx
+from api.utils.projection import ProjectionNode, compile_fields, project
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - streaming falls back to full decoding
+    ijson = None
+
+_FULL = "full"
+_APPLY = "apply"
+_DESCEND = "descend"
+_OPEN_EVENTS = frozenset(("start_map", "start_array"))
+_CLOSE_EVENTS = frozenset(("end_map", "end_array"))
+
+
+def streaming_available() -> bool:
+    return ijson is not None
+
+
+def _streamable(selected: Optional[slice]) -> bool:
+    """Whether a slice can be applied while items arrive, without the list length"""
+    return (
+        selected is not None
+        and selected.step is None
+        and (selected.start or 0) >= 0
+        and (selected.stop is None or selected.stop >= 0)
+    )
+
+
+class _Frame:
+    __slots__ = ("container", "mode", "node", "key", "index", "slice")
+
+    def __init__(self, container, mode, node, selected=None):
+        self.container = container
+        self.mode = mode
+        self.node = node
+        self.key = None
+        self.index = 0
+        self.slice = selected
+
+
+class ProjectionBuilder:
+    """Builds the projection of a JSON document from its parse events.
+
+    Follows the same rules as projection.project, but values outside the
+    selected paths are skipped as they are parsed and never materialized.
+    """
+
+    def __init__(self, root: ProjectionNode):
+        self._stack: List[_Frame] = []
+        self._skip_depth = 0
+        self._root = root
+        self.result: Any = None
+
+    def _next_spec(self) -> Optional[Tuple[str, Optional[ProjectionNode]]]:
+        """How to handle the value starting now, or None to skip it"""
+        if not self._stack:
+            return _DESCEND, self._root
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            if frame.mode == _FULL:
+                return _FULL, None
+            node = frame.node
+            child = node.children.get(frame.key, node.wildcard)
+            return None if child is None else (_APPLY, child)
+
+        index = frame.index
+        frame.index += 1
+        if _streamable(frame.slice):
+            start, stop = frame.slice.start or 0, frame.slice.stop
+            if index < start or (stop is not None and index >= stop):
+                return None
+        return frame.mode, frame.node
+
+    def _add(self, value: Any) -> None:
+        if not self._stack:
+            self.result = value
+        elif isinstance(self._stack[-1].container, dict):
+            self._stack[-1].container[self._stack[-1].key] = value
+        else:
+            self._stack[-1].container.append(value)
+
+    def _open(self, container, spec) -> None:
+        mode, node = spec
+        selected = None
+        if mode == _APPLY:
+            if isinstance(container, list):
+                selected = node.slice
+            mode = _FULL if node.leaf else _DESCEND
+        self._stack.append(_Frame(container, mode, node, selected))
+
+    def feed(self, events: Iterable[Tuple[str, Any]]) -> None:
+        skip_depth = self._skip_depth
+        for event, value in events:
+            if skip_depth:
+                # Most events of a large body fall in skipped subtrees, keep this cheap
+                if event in _OPEN_EVENTS:
+                    skip_depth += 1
+                elif event in _CLOSE_EVENTS:
+                    skip_depth -= 1
+                continue
+
+            if event == "map_key":
+                self._stack[-1].key = value
+                continue
+            if event in _CLOSE_EVENTS:
+                frame = self._stack.pop()
+                container = frame.container
+                if frame.slice is not None and not _streamable(frame.slice):
+                    container = container[frame.slice]
+                self._add(container)
+                continue
+
+            spec = self._next_spec()
+            if spec is None:
+                if event in _OPEN_EVENTS:
+                    skip_depth = 1
+                continue
+            if event == "start_map":
+                self._open({}, spec)
+            elif event == "start_array":
+                self._open([], spec)
+            else:
+                self._add(value)
+        self._skip_depth = skip_depth
+
+
+def project_chunks(chunks: Iterable[bytes], fields: str) -> Any:
+    """Parse a JSON body chunk by chunk, keeping only the paths selected by fields"""
+    root = compile_fields(fields)
+    if ijson is None:
+        return project(json.loads(b"".join(chunks)), fields)
+
+    builder = ProjectionBuilder(root)
+    events = ijson.sendable_list()
+    parser = ijson.basic_parse_coro(events, use_float=True)
+    try:
+        for chunk in chunks:
+            parser.send(chunk)
+            builder.feed(events)
+            del events[:]
+        parser.close()
+    except ijson.JSONError as e:
+        # Invalid bodies fail like json.loads does
+        raise ValueError(str(e)) from e
+    builder.feed(events)
+    return builder.result
+
+
+async def aproject_chunks(chunks: AsyncIterator[bytes], fields: str) -> Any:
+    """Async variant of project_chunks for streamed httpx responses"""
+    root = compile_fields(fields)
+    if ijson is None:
+        return project(json.loads(b"".join([chunk async for chunk in chunks])), fields)
+
+    builder = ProjectionBuilder(root)
+    events = ijson.sendable_list()
+    parser = ijson.basic_parse_coro(events, use_float=True)
+    try:
+        async for chunk in chunks:
+            parser.send(chunk)
+            builder.feed(events)
+            del events[:]
+        parser.close()
+    except ijson.JSONError as e:
+        # Invalid bodies fail like json.loads does
+        raise ValueError(str(e)) from e
+    builder.feed(events)
+    return builder.result
+
+
+async def aproject_response(
+    response: httpx.Response, fields: str, min_bytes: int = 0
+) -> Any:
+    """Project an unread streamed response, streaming only bodies of min_bytes or more.
+
+    Incremental parsing keeps peak memory flat but costs more CPU per byte
+    than json.loads, so bodies known to be small are decoded in one go.
+    """
+    length = response.headers.get("Content-Length")
+    if length is not None and length.isdigit() and int(length) < min_bytes:
+        await response.aread()
+        return project(response.json(), fields)
+    return await aproject_chunks(response.aiter_bytes(), fields)
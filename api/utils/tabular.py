@@ -0,0 +1,128 @@
+import json
+from typing import Any, Dict, List, Optional
+
+# Key of an encoded table; the same key in a result is escaped as "$$table"
+TABLE_KEY = "$table"
+
+# Lists shorter than this gain nothing from a header row
+MIN_ROWS = 2
+
+# Tables with more absent cells than this share stay plain lists
+MAX_ABSENT_SHARE = 0.25
+
+_ABSENT = object()
+
+
+def _escape(key: str) -> str:
+    return "$" + key if key.lstrip("$") == "table" and key.startswith("$") else key
+
+
+def _unescape(key: str) -> str:
+    return key[1:] if key.lstrip("$") == "table" and key.startswith("$$") else key
+
+
+def _flatten(item: Dict[str, Any], prefix: str, out: Dict[str, Any]) -> bool:
+    """Flatten nested dicts into dotted columns; False if a key cannot be a column"""
+    for key, value in item.items():
+        if "." in key:
+            return False
+        column = prefix + key
+        # Nested tables are cells; keys of the encoded items are already escaped
+        if isinstance(value, dict) and value and TABLE_KEY not in value:
+            if not _flatten(value, column + ".", out):
+                return False
+        else:
+            out[column] = value
+    return True
+
+
+def _table(items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Header and rows for a list of encoded dicts, or None if it does not tabulate well"""
+    flat_items = []
+    columns: Dict[str, None] = {}
+    for item in items:
+        flat: Dict[str, Any] = {}
+        if not _flatten(item, "", flat):
+            return None
+        flat_items.append(flat)
+        columns.update(dict.fromkeys(flat))
+
+    # A column that is also the parent of another cannot be rebuilt
+    for column in columns:
+        parts = column.split(".")
+        if any(".".join(parts[:i]) in columns for i in range(1, len(parts))):
+            return None
+
+    absent = []
+    rows = []
+    for r, flat in enumerate(flat_items):
+        row = []
+        for c, column in enumerate(columns):
+            value = flat.get(column, _ABSENT)
+            if value is _ABSENT:
+                absent.append([r, c])
+                value = None
+            row.append(value)
+        rows.append(row)
+    if len(absent) > MAX_ABSENT_SHARE * len(rows) * len(columns):
+        return None
+
+    table = {"columns": list(columns), "rows": rows}
+    if absent:
+        table["absent"] = absent
+    return {TABLE_KEY: table}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {_escape(key): _encode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [_encode(item) for item in value]
+        if len(value) >= MIN_ROWS and all(
+            isinstance(item, dict) and item for item in value
+        ):
+            table = _table(items)
+            # Short lists with few keys can be smaller as plain JSON
+            if table is not None and len(json.dumps(table)) < len(json.dumps(items)):
+                return table
+        return items
+    return value
+
+
+def encode_tables(value: Any) -> Any:
+    """Encode lists of dicts as {"$table": {"columns", "rows"}} with dotted columns.
+
+    A list is only encoded when that makes it shorter. Cells missing from
+    some items are listed as [row, column] pairs under "absent", so
+    decode_tables() restores the exact original value.
+    """
+    return _encode(value)
+
+
+def _unflatten(columns: List[str], row: List[Any], absent: set, r: int) -> Dict:
+    item: Dict[str, Any] = {}
+    for c, (column, value) in enumerate(zip(columns, row)):
+        if (r, c) in absent:
+            continue
+        *parents, key = [_unescape(part) for part in column.split(".")]
+        target = item
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[key] = decode_tables(value)
+    return item
+
+
+def decode_tables(value: Any) -> Any:
+    """Inverse of encode_tables"""
+    if isinstance(value, dict):
+        if len(value) == 1 and TABLE_KEY in value:
+            table = value[TABLE_KEY]
+            absent = {tuple(cell) for cell in table.get("absent", [])}
+            return [
+                _unflatten(table["columns"], row, absent, r)
+                for r, row in enumerate(table["rows"])
+            ]
+        return {_unescape(key): decode_tables(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode_tables(item) for item in value]
+    return value
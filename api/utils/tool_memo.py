@@ -0,0 +1,110 @@
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+from api.config.settings import settings
+from api.utils.cache import TTLCache
+
+
+def _result_size(value: Any) -> int:
+    return len(str(value))
+
+
+class ToolMemo:
+    """Tool results remembered per conversation, keyed by exact arguments.
+
+    Each scope, a (session_id, thread_id) pair, gets its own bounded TTL
+    cache, so a result is only reused by the conversation that asked for it
+    and while it is fresher than ttl. Scopes beyond max_scopes are dropped
+    least recently used first.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        max_entries: int = 100,
+        max_bytes: Optional[int] = None,
+        max_scopes: int = 1000,
+        exclude: Iterable[str] = (),
+    ):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_scopes = max_scopes
+        self.exclude = frozenset(exclude)
+        self._scopes: "OrderedDict[Hashable, TTLCache]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: str) -> Optional[str]:
+        """Key for a call, the same however the arguments are ordered or spaced"""
+        try:
+            parsed = json.loads(arguments or "{}")
+        except ValueError:
+            return None
+        return tool_name + json.dumps(parsed, sort_keys=True, separators=(",", ":"))
+
+    def _cache(self, scope: Hashable, create: bool) -> Optional[TTLCache]:
+        with self._lock:
+            cache = self._scopes.get(scope)
+            if cache is not None:
+                self._scopes.move_to_end(scope)
+            elif create:
+                cache = self._scopes[scope] = TTLCache(
+                    maxsize=self.max_entries,
+                    ttl=self.ttl,
+                    max_bytes=self.max_bytes,
+                    sizeof=_result_size,
+                )
+                while len(self._scopes) > self.max_scopes:
+                    self._scopes.popitem(last=False)
+            return cache
+
+    def get(self, scope: Hashable, tool_name: str, arguments: str) -> Any:
+        """The remembered result of this exact call in scope, or None"""
+        key = self.make_key(tool_name, arguments)
+        if self.ttl <= 0 or key is None or tool_name in self.exclude:
+            return None
+        cache = self._cache(scope, create=False)
+        result = cache.get(key) if cache is not None else None
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def set(self, scope: Hashable, tool_name: str, arguments: str, result: Any) -> None:
+        key = self.make_key(tool_name, arguments)
+        if self.ttl <= 0 or key is None or tool_name in self.exclude:
+            return
+        self._cache(scope, create=True).set(key, result)
+
+    def discard(self, session_id: str) -> None:
+        """Forget every scope of a session"""
+        with self._lock:
+            for scope in [s for s in self._scopes if s[0] == session_id]:
+                del self._scopes[scope]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            caches = list(self._scopes.values())
+        lookups = self.hits + self.misses
+        return {
+            "scopes": len(caches),
+            "entries": sum(len(cache) for cache in caches),
+            "bytes": sum(cache.bytes for cache in caches),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+tool_memo = ToolMemo(
+    ttl=settings.TOOL_MEMO_TTL,
+    max_entries=settings.TOOL_MEMO_MAX_ENTRIES,
+    max_bytes=settings.TOOL_MEMO_MAX_BYTES,
+    max_scopes=settings.TOOL_MEMO_MAX_SESSIONS,
+    exclude=[name for name in settings.TOOL_MEMO_EXCLUDE.split(",") if name],
+)
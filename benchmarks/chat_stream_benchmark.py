@@ -0,0 +1,64 @@
+"""Time to first byte of /v1/{service}/chat against /v1/{service}/chat/stream.
+
+Sends the same message to both endpoints of a running server and reports the
+time to the first response byte, the first text delta and the complete answer.
+BENCHMARK_AUTH_TOKEN must hold a valid Supabase access token. Run from the
+repository root, with the server listening on BENCHMARK_BASE_URL:
+
+    BENCHMARK_AUTH_TOKEN=... python -m benchmarks.chat_stream_benchmark [service]
+"""
+
+import os
+import statistics
+import sys
+import time
+import uuid
+import httpx
+
+RUNS = 3
+MESSAGE = "Find three songs by Daft Punk and describe each in one sentence"
+
+
+def measure(client: httpx.Client, path: str) -> dict:
+    payload = {"message": MESSAGE, "sessionId": str(uuid.uuid4())}
+    started = time.perf_counter()
+    result = {}
+    with client.stream("POST", path, json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            now = time.perf_counter() - started
+            result.setdefault("first_byte", now)
+            if line.startswith("event: delta"):
+                result.setdefault("first_token", now)
+    result["complete"] = time.perf_counter() - started
+    # The buffered endpoint returns every token with its first byte
+    result.setdefault("first_token", result["complete"])
+    return result
+
+
+def main(service: str = "spotify") -> None:
+    client = httpx.Client(
+        base_url=os.environ.get("BENCHMARK_BASE_URL", "http://localhost:8000"),
+        headers={"Authorization": f"Bearer {os.environ['BENCHMARK_AUTH_TOKEN']}"},
+        timeout=120,
+    )
+    print(
+        f"{'endpoint':<14}{'first byte s':>14}{'first token s':>15}{'complete s':>12}"
+    )
+    for name, path in (
+        ("chat", f"/v1/{service}/chat"),
+        ("chat/stream", f"/v1/{service}/chat/stream"),
+    ):
+        runs = [measure(client, path) for _ in range(RUNS)]
+
+        def median(key):
+            return f"{statistics.median(run[key] for run in runs):.3f}"
+
+        print(
+            f"{name:<14}{median('first_byte'):>14}"
+            f"{median('first_token'):>15}{median('complete'):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
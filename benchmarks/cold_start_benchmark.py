@@ -0,0 +1,70 @@
+"""Cold-start benchmark of api.main, eager against lazy initialization.
+
+Every run starts a fresh interpreter and reports how long `import api.main`
+takes and, when BENCHMARK_AUTH_TOKEN holds a valid Supabase access token,
+the time from process start to the first successful /v1/{service}/chat
+response. The chat step needs working OpenAI and upstream credentials.
+Run from the repository root:
+
+    BENCHMARK_AUTH_TOKEN=... python -m benchmarks.cold_start_benchmark [service]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 3
+
+CHILD = """
+import json, os, sys, time, uuid
+started = time.perf_counter()
+import api.main
+imported = time.perf_counter() - started
+result = {"import": imported}
+token = os.environ.get("BENCHMARK_AUTH_TOKEN")
+if token:
+    from fastapi.testclient import TestClient
+    with TestClient(api.main.app) as client:
+        result["startup"] = time.perf_counter() - started
+        response = client.post(
+            f"/v1/{sys.argv[1]}/chat",
+            json={"message": "Say hi", "sessionId": str(uuid.uuid4())},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        response.raise_for_status()
+        result["first_chat"] = time.perf_counter() - started
+print(json.dumps(result))
+"""
+
+
+def run_once(service: str, lazy: bool) -> dict:
+    env = {**os.environ, "LAZY_INIT": "true" if lazy else "false"}
+    output = subprocess.run(
+        [sys.executable, "-c", CHILD, service],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(service: str = "spotify") -> None:
+    print(f"{'mode':<8}{'import s':>10}{'startup s':>11}{'first chat s':>14}")
+    for lazy in (False, True):
+        runs = [run_once(service, lazy) for _ in range(RUNS)]
+
+        def median(key):
+            values = [run[key] for run in runs if key in run]
+            return f"{statistics.median(values):.3f}" if values else "-"
+
+        print(
+            f"{'lazy' if lazy else 'eager':<8}{median('import'):>10}"
+            f"{median('startup'):>11}{median('first_chat'):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
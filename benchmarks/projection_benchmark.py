@@ -0,0 +1,116 @@
+"""Benchmark of the compiled field projection against the previous recursive filter.
+
+Run from the repository root:
+
+    python -m benchmarks.projection_benchmark
+"""
+
+import timeit
+from api.utils.projection import compile_fields, project
+
+
+def legacy_filter(response, fields):
+    """The per-call recursive filter SpotifyService used before projection.py"""
+
+    def extract_fields(data, field_list):
+        if isinstance(data, dict):
+            filtered_data = {}
+            field_map = {}
+            for field in field_list:
+                keys = field.split(".", 1)
+                if len(keys) == 2:
+                    field_map.setdefault(keys[0], []).append(keys[1])
+                else:
+                    filtered_data[field] = data.get(field)
+            for key, sub_fields in field_map.items():
+                if key in data:
+                    filtered_data[key] = extract_fields(data[key], sub_fields)
+            return filtered_data
+        elif isinstance(data, list):
+            return [extract_fields(item, field_list) for item in data]
+        return data
+
+    return extract_fields(response, fields.split(","))
+
+
+def make_track(i: int) -> dict:
+    return {
+        "id": f"track{i}",
+        "name": f"Track {i}",
+        "duration_ms": 200000 + i,
+        "popularity": i % 100,
+        "explicit": False,
+        "available_markets": ["US", "GB", "DE", "FR", "SE"] * 30,
+        "external_urls": {"spotify": f"https://open.spotify.com/track/{i}"},
+        "album": {
+            "id": f"album{i}",
+            "name": f"Album {i}",
+            "release_date": "2020-01-01",
+            "available_markets": ["US", "GB", "DE", "FR", "SE"] * 30,
+            "images": [
+                {"url": f"https://i.scdn.co/{i}/{s}", "height": s}
+                for s in (64, 300, 640)
+            ],
+        },
+        "artists": [
+            {"id": f"artist{j}", "name": f"Artist {j}", "type": "artist"}
+            for j in range(3)
+        ],
+    }
+
+
+SEARCH = {
+    kind: {"items": [make_track(i) for i in range(50)], "total": 1000, "limit": 50}
+    for kind in ("tracks", "albums", "artists", "playlists")
+}
+PLAYLIST = {
+    "id": "playlist",
+    "name": "Big playlist",
+    "tracks": {
+        "total": 1000,
+        "items": [
+            {
+                "added_at": "2024-01-01T00:00:00Z",
+                "is_local": False,
+                "track": make_track(i),
+            }
+            for i in range(1000)
+        ],
+    },
+}
+
+CASES = [
+    (
+        "search",
+        SEARCH,
+        "tracks.items.id,tracks.items.name,tracks.items.artists.name,tracks.items.album.name",
+    ),
+    (
+        "playlist",
+        PLAYLIST,
+        "id,name,tracks.items.added_at,tracks.items.track.name,"
+        "tracks.items.track.artists.name,tracks.items.track.album.name",
+    ),
+]
+
+
+def main(number: int = 20) -> None:
+    print(f"{'payload':<10}{'legacy ms':>12}{'compiled ms':>14}{'cold ms':>10}")
+    for name, payload, fields in CASES:
+        assert legacy_filter(payload, fields) == project(payload, fields)
+        legacy = timeit.timeit(lambda: legacy_filter(payload, fields), number=number)
+        compiled = timeit.timeit(lambda: project(payload, fields), number=number)
+
+        def cold():
+            compile_fields.cache_clear()
+            project(payload, fields)
+
+        cold_time = timeit.timeit(cold, number=number)
+        print(
+            f"{name:<10}{legacy / number * 1000:>12.3f}"
+            f"{compiled / number * 1000:>14.3f}{cold_time / number * 1000:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark of streamed field projection against decoding whole response bodies.
+
+Reports time and peak traced memory per call for a large playlist and a
+large Ticketmaster event page. Run from the repository root:
+
+    python -m benchmarks.streaming_benchmark
+"""
+
+import json
+import time
+import tracemalloc
+from api.utils.projection import project
+from api.utils.streaming import project_chunks
+from benchmarks.projection_benchmark import PLAYLIST
+
+CHUNK_SIZE = 64 * 1024
+
+EVENTS = {
+    "_embedded": {
+        "events": [
+            {
+                "id": f"event{i}",
+                "name": f"Show {i}",
+                "url": f"https://www.ticketmaster.com/event/{i}",
+                "info": "Doors open one hour before the show. " * 20,
+                "dates": {"start": {"localDate": "2025-06-01", "localTime": "20:00"}},
+                "images": [
+                    {"url": f"https://s1.ticketm.net/{i}/{w}.jpg", "width": w}
+                    for w in (100, 305, 640, 1024, 2048)
+                ],
+                "priceRanges": [{"type": "standard", "min": 35.0, "max": 120.0}],
+                "_embedded": {
+                    "venues": [
+                        {
+                            "name": "Arena",
+                            "city": {"name": "Berlin"},
+                            "address": {"line1": "Street 1"},
+                        }
+                    ]
+                },
+            }
+            for i in range(200)
+        ]
+    },
+    "page": {"size": 200, "totalElements": 5000, "totalPages": 25, "number": 0},
+}
+
+CASES = [
+    (
+        "playlist",
+        PLAYLIST,
+        "id,name,tracks.items(added_at,track(name,artists.name))",
+    ),
+    (
+        "events",
+        EVENTS,
+        "_embedded.*(id,name,dates.start.localDate,_embedded.venues.name),page",
+    ),
+]
+
+
+def measure(func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main(repeat: int = 5) -> None:
+    print(f"{'payload':<10}{'body KB':>9}{'mode':>10}{'ms':>10}{'peak KB':>10}")
+    for name, payload, fields in CASES:
+        body = json.dumps(payload).encode()
+        chunks = [body[i : i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE)]
+        modes = {
+            "decode": lambda: project(json.loads(b"".join(chunks)), fields),
+            "stream": lambda: project_chunks(chunks, fields),
+        }
+        assert modes["decode"]() == modes["stream"]()
+        for mode, func in modes.items():
+            runs = [measure(func) for _ in range(repeat)]
+            elapsed = min(run[0] for run in runs)
+            peak = min(run[1] for run in runs)
+            print(
+                f"{name:<10}{len(body) // 1024:>9}{mode:>10}"
+                f"{elapsed * 1000:>10.2f}{peak // 1024:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Token counts of tool results as JSON and in the tabular encoding.
+
+Each case is the projected result a tool returns for typical fields. Run
+from the repository root:
+
+    python -m benchmarks.tabular_benchmark
+"""
+
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.compaction import count_tokens
+from api.utils.projection import project
+from api.utils.tabular import decode_tables, encode_tables
+from benchmarks.projection_benchmark import PLAYLIST, SEARCH
+from benchmarks.streaming_benchmark import EVENTS
+
+VENUES = {
+    "_embedded": {
+        "venues": [
+            {
+                "id": f"venue{i}",
+                "name": f"Venue {i}",
+                "city": {"name": "Berlin"},
+                "country": {"countryCode": "DE"},
+                "address": {"line1": f"Street {i}"},
+                "location": {"longitude": "13.4", "latitude": "52.5"},
+            }
+            for i in range(100)
+        ]
+    },
+    "page": {"size": 100, "totalElements": 300, "totalPages": 3, "number": 0},
+}
+
+CASES = [
+    (
+        "search_spotify",
+        project(SEARCH, "tracks(items(id,name,popularity,artists.name,album.name))"),
+    ),
+    (
+        "get_playlist",
+        project(PLAYLIST, "name,tracks.items(added_at,track(name,artists.name))"),
+    ),
+    (
+        "search_ticketmaster_events",
+        TicketmasterService._filter_response(
+            EVENTS, "id,name,dates.start(localDate,localTime),_embedded.venues.name"
+        ),
+    ),
+    (
+        "search_ticketmaster_venues",
+        TicketmasterService._filter_response(
+            VENUES, "id,name,city.name,country.countryCode,location"
+        ),
+    ),
+]
+
+
+def main() -> None:
+    print(f"{'tool':<30}{'json':>10}{'table':>10}{'saved':>8}")
+    for name, result in CASES:
+        encoded = encode_tables(result)
+        assert decode_tables(encoded) == result
+        json_tokens = count_tokens(result)
+        table_tokens = count_tokens(encoded)
+        print(
+            f"{name:<30}{json_tokens:>10}{table_tokens:>10}"
+            f"{1 - table_tokens / json_tokens:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
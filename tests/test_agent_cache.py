@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from api.core.agent_cache import AgentCache
+
+
+class FakeAgent:
+    def __init__(self, name):
+        self.name = name
+
+
+def make_builder(delay=0.0):
+    built = []
+
+    async def build(name):
+        await asyncio.sleep(delay)
+        built.append(name)
+        return FakeAgent(name)
+
+    return built, build
+
+
+class TestAgentCache:
+    def test_reuses_agents_per_key(self):
+        """Test that a second turn of the same session reuses its agent"""
+        cache = AgentCache(sizeof=lambda agent: 1)
+        built, build = make_builder()
+
+        async def run():
+            first = await cache.acquire(("s1", "spotify"), lambda: build("a"))
+            cache.release(first)
+            second = await cache.acquire(("s1", "spotify"), lambda: build("b"))
+            cache.release(second)
+            other = await cache.acquire(("s1", "ticketmaster"), lambda: build("c"))
+            cache.release(other)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first.agent is second.agent
+        assert built == ["a", "c"]
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+        assert stats["size"] == 2 and stats["bytes"] == 2
+
+    def test_concurrent_misses_build_once(self):
+        """Test that concurrent first turns of a session share one agent"""
+        cache = AgentCache(sizeof=lambda agent: 1)
+        built, build = make_builder(delay=0.05)
+
+        async def turn(i):
+            entry = await cache.acquire(("s1", "spotify"), lambda: build(i))
+            cache.release(entry)
+            return entry.agent
+
+        async def run():
+            return await asyncio.gather(*[turn(i) for i in range(5)])
+
+        agents = asyncio.run(run())
+        assert len(built) == 1
+        assert all(agent is agents[0] for agent in agents)
+
+    def test_lru_eviction_skips_agents_in_use(self):
+        """Test that the least recently used idle agent is evicted first"""
+        cache = AgentCache(max_entries=2, sizeof=lambda agent: 1)
+        _, build = make_builder()
+
+        async def run():
+            busy = await cache.acquire("a", lambda: build("a"))
+            for key in ("b", "c"):
+                cache.release(await cache.acquire(key, lambda: build(key)))
+            return busy
+
+        busy = asyncio.run(run())
+        assert cache._entries.keys() == {"a", "c"}
+        assert cache.stats()["evictions"] == 1
+        cache.release(busy)
+
+    def test_max_bytes(self):
+        """Test that entries are evicted until their total size fits"""
+        cache = AgentCache(max_bytes=10, sizeof=lambda agent: 6)
+        _, build = make_builder()
+
+        async def run():
+            for key in ("a", "b"):
+                cache.release(await cache.acquire(key, lambda: build(key)))
+
+        asyncio.run(run())
+        assert list(cache._entries) == ["b"]
+        assert cache.bytes == 6
+
+    def test_idle_entries_expire(self):
+        """Test that an agent idle past the TTL is built again"""
+        cache = AgentCache(idle_ttl=10, sizeof=lambda agent: 1)
+        built, build = make_builder()
+
+        async def turn(name):
+            cache.release(await cache.acquire("s1", lambda: build(name)))
+
+        with patch("api.core.agent_cache.time.monotonic", return_value=100.0):
+            asyncio.run(turn("a"))
+        with patch("api.core.agent_cache.time.monotonic", return_value=105.0):
+            asyncio.run(turn("b"))
+        with patch("api.core.agent_cache.time.monotonic", return_value=200.0):
+            asyncio.run(turn("c"))
+
+        assert built == ["a", "c"]
+        assert cache.stats()["expirations"] == 1
+
+    def test_discard_session(self):
+        """Test that cleaning up a session drops its agents for every API"""
+        cache = AgentCache(sizeof=lambda agent: 1)
+        _, build = make_builder()
+
+        async def run():
+            for key in [("s1", "spotify"), ("s1", "ticketmaster"), ("s2", "spotify")]:
+                cache.release(await cache.acquire(key, lambda: build(key)))
+
+        asyncio.run(run())
+        cache.discard(lambda key: key[0] == "s1")
+        assert list(cache._entries) == [("s2", "spotify")]
+        assert cache.bytes == 1
+
+    def test_discard_agent_in_use(self):
+        """Test that an agent discarded mid-turn is never handed out again"""
+        cache = AgentCache(sizeof=lambda agent: 1)
+        built, build = make_builder()
+
+        async def run():
+            old = await cache.acquire(("s1", "spotify"), lambda: build("old"))
+            cache.discard(lambda key: key[0] == "s1")
+            new = await cache.acquire(("s1", "spotify"), lambda: build("new"))
+            cache.release(old)
+            cache.release(new)
+            again = await cache.acquire(("s1", "spotify"), lambda: build("again"))
+            cache.release(again)
+            return old, new, again
+
+        old, new, again = asyncio.run(run())
+        assert old.evicted and not new.evicted
+        assert again is new
+        assert built == ["old", "new"]
+        assert list(cache._entries) == [("s1", "spotify")]
+        assert cache.bytes == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+import httpx
+import pytest
+from openai import NotFoundError
+from types import SimpleNamespace
+from api.core.assistant_factory import AssistantFactory, AssistantRegistry
+
+
+class FakeAssistants:
+    """Assistants endpoint of the OpenAI client, kept in memory"""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.store = {}
+        self.created = []
+        self.listed = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        assistant = SimpleNamespace(
+            id=f"asst_{len(self.store)}", metadata=kwargs["metadata"]
+        )
+        with self._lock:
+            self.store[assistant.id] = assistant
+            self.created.append(kwargs)
+            self.active -= 1
+        return assistant
+
+    def retrieve(self, assistant_id):
+        return self.store[assistant_id]
+
+    def list(self, limit=100):
+        self.listed += 1
+        return list(self.store.values())
+
+
+def make_factory(assistants, path=None):
+    factory = AssistantFactory(registry=AssistantRegistry(path))
+    factory._client = SimpleNamespace(beta=SimpleNamespace(assistants=assistants))
+    return factory
+
+
+class TestAssistantFactory:
+    def test_creates_lazily_once(self):
+        """Test that nothing is created until first use, and then only once"""
+        assistants = FakeAssistants()
+        factory = make_factory(assistants)
+        assert assistants.created == []
+
+        first = factory.get_assistant("spotify")
+        second = factory.get_assistant("spotify")
+        assert first is second
+        assert len(assistants.created) == 1
+        created = assistants.created[0]
+        assert created["name"] == "Spotify Assistant"
+        assert created["metadata"]["config_hash"] == factory.config_hash(
+            factory._config("spotify")
+        )
+        assert factory.assistants == {"spotify": first.id}
+
+    def test_reuses_assistant_after_restart(self):
+        """Test that a new process finds the assistant by its metadata hash"""
+        assistants = FakeAssistants()
+        created = make_factory(assistants).get_assistant("spotify")
+
+        restarted = make_factory(assistants)
+        assert restarted.get_assistant("spotify") is created
+        assert len(assistants.created) == 1
+        assert restarted.stats()["reused"] == 1
+
+    def test_registry_file_skips_listing(self, tmp_path):
+        """Test that a registry file finds the assistant without listing"""
+        path = str(tmp_path / "assistants.json")
+        assistants = FakeAssistants()
+        created = make_factory(assistants, path).get_assistant("ticketmaster")
+
+        assert make_factory(assistants, path).get_assistant("ticketmaster") is created
+        assert assistants.listed == 1
+
+    def test_changed_configuration_creates_new_assistant(self):
+        """Test that different instructions produce a different assistant"""
+        assistants = FakeAssistants()
+        make_factory(assistants).get_assistant("spotify")
+
+        changed = make_factory(assistants)
+        changed._api_instructions = {"default": {"instructions": "Be brief"}}
+        changed.get_assistant("spotify")
+        assert len(assistants.created) == 2
+
+    def test_deleted_assistant_is_recreated(self, tmp_path):
+        """Test that an assistant deleted in OpenAI is created again"""
+        path = str(tmp_path / "assistants.json")
+        assistants = FakeAssistants()
+        make_factory(assistants, path).get_assistant("spotify")
+
+        def missing(assistant_id):
+            request = httpx.Request("GET", f"https://api.openai.com/{assistant_id}")
+            response = httpx.Response(404, request=request)
+            raise NotFoundError("gone", response=response, body=None)
+
+        assistants.store.clear()
+        assistants.retrieve = missing
+        make_factory(assistants, path).get_assistant("spotify")
+        assert len(assistants.created) == 2
+
+    def test_missing_assistants_are_created_in_parallel(self):
+        """Test that ensuring several assistants creates them concurrently"""
+        assistants = FakeAssistants(delay=0.1)
+        factory = make_factory(assistants)
+
+        asyncio.run(factory.aensure_assistants())
+        assert sorted(factory.assistants) == [
+            "spotify",
+            "spotify:fast",
+            "ticketmaster",
+            "ticketmaster:fast",
+        ]
+        assert assistants.peak == 4
+
+    def test_concurrent_first_use_creates_one(self):
+        """Test that concurrent first requests share one new assistant per tier"""
+        assistants = FakeAssistants(delay=0.05)
+        factory = make_factory(assistants)
+
+        async def run():
+            await asyncio.gather(
+                *[factory.aensure_assistants(["spotify"]) for _ in range(4)]
+            )
+
+        asyncio.run(run())
+        assert sorted(created["model"] for created in assistants.created) == [
+            "gpt-4o",
+            "gpt-4o-mini",
+        ]
+
+
+class TestModelTiers:
+    def test_one_assistant_per_tier(self):
+        assistants = FakeAssistants()
+        factory = make_factory(assistants)
+
+        standard = factory.get_assistant("spotify")
+        assert factory.get_assistant("spotify", "standard") is standard
+        fast = factory.get_assistant("spotify", "fast")
+        assert fast is not standard
+
+        models = {c["name"]: c["model"] for c in assistants.created}
+        assert models == {
+            "Spotify Assistant": "gpt-4o",
+            "Spotify Assistant (fast)": "gpt-4o-mini",
+        }
+        assert factory.assistants == {"spotify": standard.id, "spotify:fast": fast.id}
+
+    def test_service_tiers_override_the_defaults(self):
+        assistants = FakeAssistants()
+        factory = make_factory(assistants)
+        factory._api_instructions["ticketmaster"]["tiers"] = {
+            "standard": "gpt-4.1",
+            "deep": "o3",
+        }
+
+        assert list(factory.tiers("ticketmaster")) == ["standard", "deep"]
+        assert list(factory.tiers("spotify")) == ["fast", "standard"]
+        factory.get_assistant("ticketmaster", "deep")
+        assert assistants.created[0]["model"] == "o3"
+        assert factory.default_tier("ticketmaster") == "standard"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,255 @@
+import asyncio
+import inspect
+import json
+import threading
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from openai.types.beta.threads import Message, Text, TextContentBlock
+from api.config.settings import settings
+from api.core.assistant_agent import AsyncAssistantAgent
+from api.services.spotify_service import SpotifyService
+from api.tools.spotify_tools import spotify_tools
+from api.tools.ticketmaster_tools import ticketmaster_tools
+from api.utils.concurrency import bind_app_loop, call_async
+from api.utils.step_timing import ToolStepStats, tool_step_stats
+
+
+class FakeOpenAIClient:
+    """Minimal stand-in for the OpenAI client driving one tool-calling run"""
+
+    def __init__(self, tool_name: str, *arguments: dict):
+        self._tool_calls = [
+            SimpleNamespace(
+                id=f"call_{i}",
+                function=SimpleNamespace(name=tool_name, arguments=json.dumps(args)),
+            )
+            for i, args in enumerate(arguments, 1)
+        ]
+        self._submitted = False
+        self.tool_outputs = []
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(
+                runs=SimpleNamespace(
+                    create=self._create_run,
+                    retrieve=self._retrieve_run,
+                    submit_tool_outputs=self._submit_tool_outputs,
+                ),
+                messages=SimpleNamespace(
+                    create=lambda **kwargs: None, list=self._list_messages
+                ),
+            )
+        )
+
+    def _create_run(self, **kwargs):
+        return SimpleNamespace(id="run_1", status="queued")
+
+    def _retrieve_run(self, **kwargs):
+        if self._submitted:
+            return SimpleNamespace(id="run_1", status="completed")
+        return SimpleNamespace(
+            id="run_1",
+            status="requires_action",
+            required_action=SimpleNamespace(
+                submit_tool_outputs=SimpleNamespace(tool_calls=self._tool_calls)
+            ),
+        )
+
+    def _submit_tool_outputs(self, **kwargs):
+        self._submitted = True
+        self.tool_outputs = kwargs["tool_outputs"]
+
+    def _list_messages(self, **kwargs):
+        block = TextContentBlock(type="text", text=Text(value="done", annotations=[]))
+        return [
+            Message.model_construct(
+                id="msg_1",
+                role="assistant",
+                content=[block],
+                thread_id="thread",
+                assistant_id="asst",
+                metadata={},
+            )
+        ]
+
+
+def test_tools_register_native_async_functions():
+    """Test that every service tool awaits its coroutine variant"""
+    for tool in spotify_tools + ticketmaster_tools:
+        assert asyncio.iscoroutinefunction(tool.async_fn)
+        assert tool.async_fn.__name__ == f"a{tool.metadata.name}"
+
+        sync_params = inspect.signature(tool.fn).parameters
+        async_params = inspect.signature(tool.async_fn).parameters
+        assert list(sync_params) == list(async_params)
+        for name, param in sync_params.items():
+            assert param.default == async_params[name].default
+
+
+def test_blocking_tools_run_their_coroutine():
+    """Test that the blocking tools are generated from the coroutine variants"""
+    assert SpotifyService.get_track.__wrapped__ is SpotifyService.aget_track
+    assert SpotifyService.get_track.yaml_doc == SpotifyService.aget_track.yaml_doc
+    assert not asyncio.iscoroutinefunction(SpotifyService.get_track)
+
+
+def test_call_async_runs_on_the_app_loop():
+    """Test that blocking calls from worker threads share the app's loop"""
+
+    async def running_loop():
+        return asyncio.get_running_loop()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever)
+    thread.start()
+    bind_app_loop(loop)
+    try:
+        assert call_async(running_loop) is loop
+    finally:
+        bind_app_loop(None)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+    assert call_async(running_loop) is not loop
+
+
+def test_call_async_refuses_to_block_a_running_loop():
+    async def run():
+        return call_async(asyncio.sleep, 0)
+
+    with pytest.raises(RuntimeError, match="would block the running event loop"):
+        asyncio.run(run())
+
+
+def test_concurrent_chats_overlap_tool_io():
+    """Test that N concurrent chats run their upstream calls at the same time"""
+    chats = 5
+    delay = 0.2
+    in_flight = 0
+    peak = 0
+
+    async def slow_request(endpoint, params=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(delay)
+        in_flight -= 1
+        return {"tracks": {"items": [{"id": params["q"], "name": "Track Name"}]}}
+
+    def make_agent(i):
+        arguments = {"q": f"song {i}", "search_type": "track", "fields": "tracks"}
+        return AsyncAssistantAgent(
+            client=FakeOpenAIClient("search_spotify", arguments),
+            assistant=SimpleNamespace(id="asst"),
+            tools=spotify_tools,
+            thread_id=f"thread_{i}",
+            run_retrieve_sleep_time=0,
+        )
+
+    async def run():
+        agents = [make_agent(i) for i in range(chats)]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        responses = await asyncio.gather(*[agent.achat("hi") for agent in agents])
+        return responses, loop.time() - start
+
+    with patch.object(SpotifyService, "_amake_request", side_effect=slow_request):
+        with patch("api.utils.concurrency.call_async") as blocking_call:
+            responses, elapsed = asyncio.run(run())
+
+    assert [r.response for r in responses] == ["done"] * chats
+    assert [r.sources[0].raw_output["tracks"]["items"][0]["id"] for r in responses] == [
+        f"song {i}" for i in range(chats)
+    ]
+    blocking_call.assert_not_called()
+    assert peak == chats
+    assert elapsed < delay * chats / 2
+
+
+def run_step_with_calls(calls, delay):
+    """Run one chat whose single step asks for `calls` searches"""
+    in_flight = 0
+    peak = 0
+
+    async def slow_request(endpoint, params=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        # Later calls finish first
+        await asyncio.sleep(delay * (calls - int(params["q"].split()[-1])))
+        in_flight -= 1
+        return {"tracks": {"items": [{"id": params["q"], "name": "Track Name"}]}}
+
+    client = FakeOpenAIClient(
+        "search_spotify",
+        *[
+            {"q": f"song {i}", "search_type": "track", "fields": "tracks"}
+            for i in range(calls)
+        ],
+    )
+    agent = AsyncAssistantAgent(
+        client=client,
+        assistant=SimpleNamespace(id="asst"),
+        tools=spotify_tools,
+        thread_id="thread",
+        run_retrieve_sleep_time=0,
+    )
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        response = await agent.achat("hi")
+        return response, loop.time() - start
+
+    with patch.object(SpotifyService, "_amake_request", side_effect=slow_request):
+        response, elapsed = asyncio.run(run())
+    return client, response, elapsed, peak
+
+
+def test_step_tool_calls_run_concurrently():
+    """Test that the calls of one run step overlap and are submitted together in order"""
+    calls = 4
+    delay = 0.05
+    steps_before = tool_step_stats.steps
+
+    client, response, elapsed, peak = run_step_with_calls(calls, delay)
+
+    assert peak == calls
+    # Serially the calls would take delay * (4 + 3 + 2 + 1)
+    assert elapsed < delay * calls * 2
+    assert [output["tool_call_id"] for output in client.tool_outputs] == [
+        f"call_{i}" for i in range(1, calls + 1)
+    ]
+    assert [s.raw_output["tracks"]["items"][0]["id"] for s in response.sources] == [
+        f"song {i}" for i in range(calls)
+    ]
+    assert tool_step_stats.steps == steps_before + 1
+    assert tool_step_stats.stats()["speedup"] > 1
+
+
+def test_step_tool_calls_are_bounded():
+    with patch.object(settings, "TOOL_MAX_CONCURRENT_CALLS", 2):
+        _, response, _, peak = run_step_with_calls(4, 0.01)
+    assert peak == 2
+    assert len(response.sources) == 4
+
+
+def test_tool_step_stats():
+    stats = ToolStepStats()
+    step = stats.record([0.2, 0.3, 0.1], 0.3)
+    assert step == {
+        "calls": 3,
+        "seconds": 0.3,
+        "serial_seconds": pytest.approx(0.6),
+        "critical_path_seconds": 0.3,
+    }
+    stats.record([0.1], 0.1)
+    summary = stats.stats()
+    assert summary["steps"] == 2
+    assert summary["parallel_steps"] == 1
+    assert summary["seconds_saved"] == pytest.approx(0.3)
+    assert summary["speedup"] == pytest.approx(0.7 / 0.4)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,171 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.utils.auth import InvalidTokenError, SupabaseTokenVerifier
+
+SECRET = "super-secret-jwt-token"
+
+
+def make_token(claims: dict, secret: str = SECRET, alg: str = "HS256") -> str:
+    def encode(data: dict) -> str:
+        raw = json.dumps(data).encode()
+        return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+    signing_input = f"{encode({'alg': alg, 'typ': 'JWT'})}.{encode(claims)}"
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256)
+    encoded = base64.urlsafe_b64encode(signature.digest()).rstrip(b"=").decode()
+    return f"{signing_input}.{encoded}"
+
+
+def valid_claims(**overrides) -> dict:
+    claims = {"sub": "user-1", "aud": "authenticated", "exp": time.time() + 3600}
+    claims.update(overrides)
+    return claims
+
+
+class TestSupabaseTokenVerifier:
+    def test_local_verification_is_cached(self):
+        """Test that a valid HS256 token is verified once and then served from cache"""
+        verifier = SupabaseTokenVerifier(mode="hybrid", jwt_secret=SECRET)
+        token = make_token(valid_claims())
+        with patch.object(verifier, "_verify_remotely", new=AsyncMock()) as remote:
+            first = asyncio.run(verifier.verify(token))
+            second = asyncio.run(verifier.verify(token))
+
+        assert first["sub"] == second["sub"] == "user-1"
+        assert verifier.local_verifications == 1
+        assert verifier.stats()["cache"]["hits"] == 1
+        remote.assert_not_called()
+
+    @pytest.mark.parametrize(
+        "token",
+        [
+            make_token(valid_claims(), secret="wrong-secret"),
+            make_token(valid_claims(exp=time.time() - 3600)),
+            make_token(valid_claims(aud="anon")),
+            make_token(valid_claims(sub=None)),
+            make_token(valid_claims(exp="tomorrow")),
+            make_token(valid_claims(nbf=[1])),
+            "not-a-jwt",
+        ],
+    )
+    def test_invalid_tokens_are_rejected(self, token):
+        """Test that bad signatures, expired tokens and wrong audiences fail"""
+        verifier = SupabaseTokenVerifier(mode="hybrid", jwt_secret=SECRET)
+        with pytest.raises(InvalidTokenError):
+            asyncio.run(verifier.verify(token))
+
+    def test_falls_back_to_remote_without_secret(self):
+        """Test that hybrid mode asks GoTrue when no local key is configured"""
+        verifier = SupabaseTokenVerifier(mode="hybrid", jwt_secret=None)
+        token = make_token(valid_claims())
+        remote = AsyncMock(return_value=valid_claims(sub="remote-user"))
+        with patch.object(verifier, "_verify_remotely", new=remote):
+            claims = asyncio.run(verifier.verify(token))
+            asyncio.run(verifier.verify(token))
+
+        assert claims["sub"] == "remote-user"
+        assert remote.await_count == 1
+
+    def test_remote_mode_always_asks_gotrue_on_miss(self):
+        """Test that remote mode skips local verification even with a secret"""
+        verifier = SupabaseTokenVerifier(mode="remote", jwt_secret=SECRET)
+        remote = AsyncMock(return_value=valid_claims())
+        with patch.object(verifier, "_verify_remotely", new=remote):
+            asyncio.run(verifier.verify(make_token(valid_claims())))
+
+        assert verifier.local_verifications == 0
+        assert remote.await_count == 1
+
+    def test_token_inside_expiry_leeway_is_not_cached(self):
+        """Test that a just-expired token accepted within the leeway is not cached"""
+        verifier = SupabaseTokenVerifier(mode="local", jwt_secret=SECRET)
+        token = make_token(valid_claims(exp=time.time() - 5))
+        claims = asyncio.run(verifier.verify(token))
+
+        assert claims["sub"] == "user-1"
+        assert verifier.stats()["cache"]["size"] == 0
+
+    def test_signing_keys_are_fetched_with_the_pooled_client(self):
+        """Test that the JWKS download reuses the shared HTTP client"""
+        verifier = SupabaseTokenVerifier(mode="local", jwt_secret=None)
+        client = MagicMock()
+        client.get.return_value.json.return_value = {"keys": [{"kid": "key-1"}]}
+        with patch("api.utils.auth.http_client") as http_client:
+            http_client.sync_client = client
+            assert verifier._fetch_jwks() == {"key-1": {"kid": "key-1"}}
+
+        assert client.get.call_args.kwargs["timeout"] == 5
+
+    @pytest.mark.parametrize("mode, warned", [("hybrid", True), ("remote", False)])
+    def test_startup_warns_without_pyjwt(self, mode, warned, capsys):
+        """Test that a missing PyJWT is reported once when local mode needs it"""
+        with patch("api.utils.auth.pyjwt", None):
+            SupabaseTokenVerifier(mode=mode).startup()
+
+        assert ("PyJWT is not installed" in capsys.readouterr().out) is warned
+
+    def test_local_mode_rejects_unverifiable_tokens(self):
+        """Test that local mode never falls back to GoTrue"""
+        verifier = SupabaseTokenVerifier(mode="local", jwt_secret=None)
+        with pytest.raises(InvalidTokenError):
+            asyncio.run(verifier.verify(make_token(valid_claims())))
+
+
+class FakePyJWTError(Exception):
+    pass
+
+
+def asymmetric_token(alg: str) -> str:
+    token = make_token(valid_claims(), alg=alg)
+    header = {"alg": alg, "typ": "JWT", "kid": "key-1"}
+    encoded = base64.urlsafe_b64encode(json.dumps(header).encode()).rstrip(b"=")
+    return encoded.decode() + token[token.index(".") :]
+
+
+class TestSigningKeyAlgorithms:
+    def verify(self, token, jwk, algorithms="RS256,ES256"):
+        verifier = SupabaseTokenVerifier(
+            mode="local", jwt_secret=None, algorithms=algorithms
+        )
+        fake_jwt = MagicMock(PyJWTError=FakePyJWTError)
+        with patch("api.utils.auth.pyjwt", fake_jwt), patch.object(
+            verifier, "_get_jwks", return_value={"key-1": jwk}
+        ):
+            claims = asyncio.run(verifier.verify(token))
+        return claims, fake_jwt.decode
+
+    def test_algorithm_is_pinned_to_the_key(self):
+        claims, decode = self.verify(
+            asymmetric_token("ES256"), {"kid": "key-1", "alg": "ES256"}
+        )
+        assert claims["sub"] == "user-1"
+        assert decode.call_args.kwargs["algorithms"] == ["ES256"]
+
+    @pytest.mark.parametrize(
+        "alg, jwk",
+        [
+            # The token asks for another algorithm than its key uses
+            ("RS256", {"kid": "key-1", "alg": "ES256"}),
+            ("HS384", {"kid": "key-1"}),
+            ("none", {"kid": "key-1"}),
+        ],
+    )
+    def test_other_algorithms_are_rejected(self, alg, jwk):
+        with pytest.raises(InvalidTokenError):
+            self.verify(asymmetric_token(alg), jwk)
+
+    def test_keys_without_alg_use_the_allow_list(self):
+        _, decode = self.verify(
+            asymmetric_token("RS256"), {"kid": "key-1"}, algorithms="RS256"
+        )
+        assert decode.call_args.kwargs["algorithms"] == ["RS256"]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,195 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from api.services.spotify_service import (
+    SpotifyService,
+    spotify_batchers,
+    spotify_response_cache,
+)
+from api.utils.batcher import MicroBatcher
+
+
+def make_track(id: str) -> dict:
+    return {"id": id, "name": f"Track {id}", "duration_ms": 1000, "popularity": 50}
+
+
+class TestMicroBatcher:
+    def test_lookups_within_window_share_one_batch(self):
+        """Test that lookups of one group are resolved by a single batch call"""
+        calls = []
+
+        async def batch_fn(group, keys):
+            calls.append((group, keys))
+            return {key: f"{group}:{key}" for key in keys}
+
+        batcher = MicroBatcher(batch_fn, window=0.01, max_batch_size=10)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.load("US", "a"),
+                batcher.load("US", "b"),
+                batcher.load("US", "a"),
+                batcher.load("SE", "a"),
+            )
+
+        assert asyncio.run(run()) == ["US:a", "US:b", "US:a", "SE:a"]
+        assert sorted(calls) == [("SE", ["a"]), ("US", ["a", "b"])]
+        assert batcher.stats()["lookups"] == 4
+
+    def test_full_batch_is_flushed_immediately(self):
+        """Test that a group is split once it reaches the batch size limit"""
+        calls = []
+
+        async def batch_fn(group, keys):
+            calls.append(keys)
+            return {key: key for key in keys}
+
+        batcher = MicroBatcher(batch_fn, window=10, max_batch_size=2)
+
+        async def run():
+            return await asyncio.gather(*[batcher.load(None, k) for k in "abcd"])
+
+        assert asyncio.run(run()) == list("abcd")
+        assert calls == [["a", "b"], ["c", "d"]]
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch raises in every waiting caller"""
+
+        async def batch_fn(group, keys):
+            raise RuntimeError("upstream failed")
+
+        batcher = MicroBatcher(batch_fn, window=0.01)
+
+        async def run():
+            return await asyncio.gather(
+                batcher.load(None, "a"), batcher.load(None, "b"), return_exceptions=True
+            )
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(run()))
+
+
+def spotify_id(name: str) -> str:
+    """A well-formed 22 character ID starting with name"""
+    return name.ljust(22, "0")
+
+
+A, B, C, UNKNOWN = (spotify_id(name) for name in ("a", "b", "c", "unknown"))
+
+
+class TestSpotifyBatching:
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Start each test with an empty cache and mocked Spotify endpoints"""
+        spotify_response_cache.clear()
+        self.sent = []
+
+        async def send(endpoint, params=None):
+            self.sent.append((endpoint, params))
+            if "ids" not in params:
+                id = endpoint.split("/")[1]
+                if len(id) != 22:
+                    return {"error": "Failed to fetch data from Spotify"}
+                return make_track(id)
+            ids = params["ids"].split(",")
+            if any(len(id) != 22 for id in ids):
+                # Spotify rejects the whole request
+                return {"error": "Failed to fetch data from Spotify"}
+            return {"tracks": [make_track(id) if id != UNKNOWN else None for id in ids]}
+
+        with patch.object(SpotifyService, "_asend_request", side_effect=send):
+            yield
+        spotify_response_cache.clear()
+
+    def test_concurrent_single_lookups_use_one_multi_id_request(self):
+        """Test that get_track calls from several sessions are batched and projected"""
+
+        async def run():
+            return await asyncio.gather(
+                SpotifyService.aget_track(fields="id,name", id=A),
+                SpotifyService.aget_track(fields="duration_ms", id=B),
+                SpotifyService.aget_track(fields="popularity", id=C),
+            )
+
+        results = asyncio.run(run())
+        assert results == [
+            {"id": A, "name": f"Track {A}"},
+            {"duration_ms": 1000},
+            {"popularity": 50},
+        ]
+        assert self.sent == [("tracks", {"market": "US", "ids": f"{A},{B},{C}"})]
+
+    def test_batched_entities_are_cached_per_id(self):
+        """Test that a batch fills the single-ID cache used by get_track"""
+
+        async def run():
+            await SpotifyService.aget_tracks(fields="tracks.id", ids=f"{A},{B}")
+            return await SpotifyService.aget_track(fields="name", id=B)
+
+        assert asyncio.run(run()) == {"name": f"Track {B}"}
+        assert len(self.sent) == 1
+        assert SpotifyService.get_track(fields="name", id=A) == {"name": f"Track {A}"}
+        assert len(self.sent) == 1
+
+    def test_unknown_ids(self):
+        """Test that unknown IDs come back as null from the batch path"""
+        result = SpotifyService.get_tracks(fields="tracks.id", ids=f"{A},{UNKNOWN}")
+        single = asyncio.run(SpotifyService._aload_entity("tracks", UNKNOWN, "US"))
+
+        assert result == {"tracks": [{"id": A}, None]}
+        assert single is None
+
+    def test_malformed_id_is_not_batched(self):
+        """Test that an ID Spotify would reject only fails its own lookup"""
+
+        async def run():
+            return await asyncio.gather(
+                SpotifyService.aget_track(fields="id", id=A),
+                SpotifyService.aget_track(fields="id", id="not-an-id"),
+                SpotifyService.aget_track(fields="id", id=B),
+            )
+
+        good, bad, other = asyncio.run(run())
+        assert good == {"id": A} and other == {"id": B}
+        assert bad == {"error": "Failed to fetch data from Spotify"}
+        assert ("tracks", {"market": "US", "ids": f"{A},{B}"}) in self.sent
+
+    def test_several_ids_keep_good_results_next_to_bad_ones(self):
+        """Test that a malformed ID in get_tracks only nulls its own slot"""
+        result = SpotifyService.get_tracks(fields="tracks.id", ids=f"{A},bad-id,{B}")
+        failed = SpotifyService.get_tracks(fields="tracks.id", ids="bad-id,also-bad")
+
+        assert result == {"tracks": [{"id": A}, None, {"id": B}]}
+        assert failed == {"error": "Failed to fetch data from Spotify"}
+
+    def test_rejected_batch_falls_back_to_single_ids(self):
+        """Test that a failed multi-ID request is retried one ID at a time"""
+        result = asyncio.run(
+            SpotifyService._afetch_batch("tracks", "US", [A, "x" * 23, B])
+        )
+
+        assert result[A] == make_track(A) and result[B] == make_track(B)
+        assert "error" in result["x" * 23]
+        assert [endpoint for endpoint, _ in self.sent] == [
+            "tracks",
+            f"tracks/{A}",
+            f"tracks/{'x' * 23}",
+            f"tracks/{B}",
+        ]
+
+    def test_sync_batch_tool_chunks_by_endpoint_limit(self):
+        """Test that get_tracks splits more than 50 IDs into several requests"""
+        ids = [f"t{i:021d}" for i in range(60)]
+        result = SpotifyService.get_tracks(fields="tracks.id", ids=",".join(ids))
+
+        assert [track["id"] for track in result["tracks"]] == ids
+        assert [len(params["ids"].split(",")) for _, params in self.sent] == [50, 10]
+
+
+def test_batchers_respect_endpoint_limits():
+    """Test that the album batcher never exceeds the 20 ID limit"""
+    assert spotify_batchers["albums"]._max_batch_size == 20
+    assert spotify_batchers["tracks"]._max_batch_size == 50
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,322 @@
+import asyncio
+import json
+import threading
+import pytest
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from api.core.agent_manager import AgentManager
+from api.core.assistant_agent import AsyncAssistantAgent
+from api.services.spotify_service import SpotifyService
+from api.tools.spotify_tools import spotify_tools
+from api.utils.sse import encode_events, format_event
+
+
+def run_event(status, **fields):
+    run = SimpleNamespace(id="run_1", status=status, last_error=None, **fields)
+    return SimpleNamespace(event=f"thread.run.{status}", data=run)
+
+
+def delta_event(text):
+    block = SimpleNamespace(type="text", text=SimpleNamespace(value=text))
+    return SimpleNamespace(
+        event="thread.message.delta",
+        data=SimpleNamespace(delta=SimpleNamespace(content=[block])),
+    )
+
+
+class FakeStream:
+    def __init__(self, events):
+        self._events = events
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self._events)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeStreamingClient:
+    """OpenAI client stand-in streaming one run with a single tool call"""
+
+    def __init__(self):
+        tool_call = SimpleNamespace(
+            id="call_1",
+            function=SimpleNamespace(
+                name="search_spotify",
+                arguments=json.dumps(
+                    {"q": "song", "search_type": "track", "fields": "tracks"}
+                ),
+            ),
+        )
+        required_action = SimpleNamespace(
+            submit_tool_outputs=SimpleNamespace(tool_calls=[tool_call])
+        )
+        self.first = FakeStream(
+            [
+                run_event("queued"),
+                SimpleNamespace(event="thread.run.step.created", data=None),
+                run_event("requires_action", required_action=required_action),
+            ]
+        )
+        self.second = FakeStream(
+            [
+                run_event("in_progress"),
+                delta_event("Hel"),
+                delta_event("lo"),
+                run_event("completed"),
+            ]
+        )
+        self.submitted = []
+        self.cancelled = threading.Event()
+        self.beta = SimpleNamespace(
+            threads=SimpleNamespace(
+                runs=SimpleNamespace(
+                    create=lambda **kwargs: self.first,
+                    submit_tool_outputs=self._submit,
+                    cancel=lambda **kwargs: self.cancelled.set(),
+                ),
+                messages=SimpleNamespace(create=lambda **kwargs: None),
+            )
+        )
+
+    def _submit(self, **kwargs):
+        assert kwargs["stream"] is True
+        self.submitted.append(kwargs["tool_outputs"])
+        return self.second
+
+
+def make_agent(client):
+    return AsyncAssistantAgent(
+        client=client,
+        assistant=SimpleNamespace(id="asst"),
+        tools=spotify_tools,
+        thread_id="thread_1",
+    )
+
+
+async def fake_request(endpoint, params=None):
+    return {"tracks": {"items": [{"id": "1", "name": "Track Name"}]}}
+
+
+class TestAgentStreaming:
+    def test_events_follow_the_run(self):
+        """Test that status, tool and text events arrive in run order"""
+        client = FakeStreamingClient()
+
+        async def run():
+            agent = make_agent(client)
+            return [event async for event in agent.astream_chat_events("hi")]
+
+        with patch.object(SpotifyService, "_amake_request", side_effect=fake_request):
+            events = asyncio.run(run())
+
+        assert [event["event"] for event in events] == [
+            "run",
+            "run",
+            "tool_call",
+            "tool_result",
+            "tool_step",
+            "run",
+            "delta",
+            "delta",
+            "run",
+            "done",
+        ]
+        assert [e["data"]["status"] for e in events if e["event"] == "run"] == [
+            "queued",
+            "requires_action",
+            "in_progress",
+            "completed",
+        ]
+        assert events[2]["data"]["name"] == "search_spotify"
+        assert events[3]["data"]["error"] is False
+        assert events[3]["data"]["seconds"] >= 0
+        assert events[4]["data"]["calls"] == 1
+        assert events[-1]["data"] == {"response": "Hello"}
+        assert client.submitted[0][0]["tool_call_id"] == "call_1"
+        assert "Track Name" in client.submitted[0][0]["output"]
+        assert not client.cancelled.is_set()
+
+    def test_error_results_are_flagged(self):
+        """Test that a service error dict is reported as a failed tool call"""
+
+        async def failing_request(endpoint, params=None):
+            return {"error": "Failed to fetch data from Spotify"}
+
+        async def run():
+            agent = make_agent(FakeStreamingClient())
+            return [event async for event in agent.astream_chat_events("hi")]
+
+        with patch.object(
+            SpotifyService, "_amake_request", side_effect=failing_request
+        ):
+            events = asyncio.run(run())
+
+        result = next(e for e in events if e["event"] == "tool_result")
+        assert result["data"]["error"] is True
+
+    def test_closing_early_cancels_the_run(self):
+        """Test that a listener going away cancels the run and closes its stream"""
+        client = FakeStreamingClient()
+
+        async def run():
+            events = make_agent(client).astream_chat_events("hi")
+            async for event in events:
+                if event["event"] == "tool_call":
+                    break
+            await events.aclose()
+
+        with patch.object(SpotifyService, "_amake_request", side_effect=fake_request):
+            asyncio.run(run())
+
+        assert client.cancelled.wait(1)
+        assert client.first.closed
+        assert client.submitted == []
+
+
+class FakeAgent:
+    def __init__(self, events, error=None):
+        self._events = events
+        self._error = error
+
+    async def astream_chat_events(self, message):
+        for event in self._events:
+            yield event
+        if self._error:
+            raise self._error
+
+
+def stream_with(agent):
+    manager = AgentManager()
+    factory = MagicMock(api_ids={"spotify", "ticketmaster"})
+    factory.tiers.return_value = {"fast": "gpt-4o-mini", "standard": "gpt-4o"}
+    factory.default_tier.return_value = "standard"
+
+    @asynccontextmanager
+    async def session_agent(api_id, session_id, user_id, tier):
+        yield agent
+
+    async def run():
+        return [
+            event
+            async for event in manager.stream_message("spotify", "hi", "s1", "user")
+        ]
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch.object(manager, "_session_agent", side_effect=session_agent):
+        events = asyncio.run(run())
+    return manager, events
+
+
+class TestStreamMessage:
+    def test_events_are_timed(self):
+        manager, events = stream_with(
+            FakeAgent(
+                [
+                    {"event": "delta", "data": {"text": "Hi"}},
+                    {"event": "done", "data": {"response": "Hi"}},
+                ]
+            )
+        )
+        assert events[0]["event"] == "run"
+        assert events[0]["data"]["status"] == "accepted"
+        assert [event["event"] for event in events[1:]] == ["route", "delta", "done"]
+        assert events[1]["data"]["tier"] == "fast"
+        elapsed = [event["data"]["elapsed"] for event in events]
+        assert elapsed == sorted(elapsed)
+
+        stats = manager.stats()["streams"]
+        assert stats["served"] == 1
+        assert stats["disconnects"] == 0
+        assert stats["first_token_seconds"]["max"] >= 0
+        assert manager.stats()["chats"]["served"] == 1
+        assert manager.stats()["models"]["tiers"]["fast"]["turns"] == 1
+
+    def test_errors_end_the_stream(self):
+        _, events = stream_with(FakeAgent([], error=RuntimeError("boom")))
+        assert events[-1]["event"] == "error"
+        assert "boom" not in events[-1]["data"]["message"]
+
+    def test_disconnect_is_counted(self):
+        manager = AgentManager()
+
+        async def run():
+            events = manager.stream_message("spotify", "hi", "s1", "user")
+            await events.__anext__()
+            await events.aclose()
+
+        asyncio.run(run())
+        stats = manager.stats()["streams"]
+        assert stats["disconnects"] == 1
+        assert stats["served"] == 0
+
+
+def test_format_event():
+    assert format_event("delta", {"text": "a\nb"}, 3) == (
+        'id: 3\nevent: delta\ndata: {"text":"a\\nb"}\n\n'
+    )
+
+
+def test_encode_events_closes_the_source():
+    closed = False
+
+    async def events():
+        nonlocal closed
+        try:
+            yield {"event": "run", "data": {"status": "queued"}}
+            yield {"event": "run", "data": {"status": "completed"}}
+        finally:
+            closed = True
+
+    async def run():
+        encoded = encode_events(events())
+        first = await encoded.__anext__()
+        await encoded.aclose()
+        return first
+
+    assert asyncio.run(run()).startswith("id: 0\nevent: run\n")
+    assert closed
+
+
+def test_stream_route():
+    from api.main import app
+    from api.utils.auth import verify_supabase_token
+
+    async def stream_message(service, message, session_id, user_id):
+        yield {"event": "run", "data": {"status": "accepted"}}
+        yield {"event": "done", "data": {"response": message}}
+
+    app.dependency_overrides[verify_supabase_token] = lambda: {"id": "user"}
+    try:
+        with patch("api.main.settings.LAZY_INIT", True), patch(
+            "api.routes.api.agent_manager.stream_message", side_effect=stream_message
+        ):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/v1/spotify/chat/stream",
+                    json={"message": "hi", "sessionId": "s1"},
+                )
+                unsupported = client.post(
+                    "/v1/other/chat/stream",
+                    json={"message": "hi", "sessionId": "s1"},
+                )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    data = [
+        json.loads(line[len("data: ") :])
+        for line in response.text.splitlines()
+        if line.startswith("data: ")
+    ]
+    assert data[-1] == {"response": "hi"}
+    assert unsupported.status_code == 400
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,172 @@
+import asyncio
+import pytest
+from api.tools.continuation_tools import aget_more_results
+from api.utils.compaction import (
+    ToolOutputCompactor,
+    count_tokens,
+    parse_budgets,
+)
+from api.utils.tabular import TABLE_KEY, decode_tables
+
+
+def make_events(count, description=""):
+    return {
+        "_embedded": {
+            "events": [
+                {
+                    "id": f"event_{i}",
+                    "name": f"Concert {i}",
+                    "info": description,
+                    "images": [{"url": f"https://img/{i}.jpg"}] * 5,
+                    "_links": {"self": {"href": f"/events/{i}"}},
+                }
+                for i in range(count)
+            ]
+        },
+        "page": {"size": count, "totalElements": count},
+    }
+
+
+class TestToolOutputCompactor:
+    def test_small_result_is_unchanged(self):
+        """Test that results within budget are returned as they are"""
+        compactor = ToolOutputCompactor(budget=10_000)
+        result = make_events(2)
+        assert compactor.compact("search", result) is result
+
+    def test_errors_are_unchanged(self):
+        """Test that error responses are never compacted"""
+        compactor = ToolOutputCompactor(budget=1)
+        result = {"error": "x" * 1000}
+        assert compactor.compact("search", result) is result
+
+    def test_drops_low_value_keys_first(self):
+        """Test that dropping low-value keys is enough when it fits the budget"""
+        result = make_events(3)
+        budget = count_tokens(result) - 1
+        compacted = ToolOutputCompactor(budget=budget).compact("search", result)
+
+        assert len(compacted["_embedded"]["events"]) == 3
+        assert compacted["_embedded"]["events"][0] == {
+            "id": "event_0",
+            "name": "Concert 0",
+        }
+        assert compacted["continuation"] == {
+            "omitted_keys": ["_links", "images", "info"]
+        }
+
+    def test_shortens_lists_to_budget(self):
+        """Test that the longest list is cut to fit and a cursor is returned"""
+        compactor = ToolOutputCompactor(budget=300)
+        compacted = compactor.compact("search", make_events(100))
+
+        assert count_tokens(compacted) <= 300
+        events = compacted["_embedded"]["events"]
+        assert 1 <= len(events) < 100
+        assert [e["id"] for e in events] == [f"event_{i}" for i in range(len(events))]
+        marker = compacted["continuation"]
+        assert marker["lists"]["_embedded.events"] == {
+            "offset": 0,
+            "returned": len(events),
+            "total": 100,
+        }
+        assert compacted["page"] == {"size": 100, "totalElements": 100}
+
+    def test_compaction_is_deterministic(self):
+        """Test that the same result is always compacted the same way"""
+        compactor = ToolOutputCompactor(budget=300)
+        first = compactor.compact("search", make_events(100))
+        second = compactor.compact("search", make_events(100))
+        first["continuation"].pop("cursor")
+        second["continuation"].pop("cursor")
+        assert first == second
+
+    def test_cursor_pages_through_the_rest(self):
+        """Test that following cursors returns every item exactly once"""
+        compactor = ToolOutputCompactor(budget=300)
+        page = compactor.compact("search", make_events(100))
+        seen = [e["id"] for e in page["_embedded"]["events"]]
+
+        while "cursor" in page["continuation"]:
+            page = compactor.more(page["continuation"]["cursor"])
+            assert count_tokens(page) <= 300
+            events = page["_embedded"]["events"]
+            assert page["continuation"]["lists"]["_embedded.events"]["offset"] == len(
+                seen
+            )
+            seen.extend(e["id"] for e in events)
+
+        assert seen == [f"event_{i}" for i in range(100)]
+
+    def test_truncates_long_strings(self):
+        """Test that long strings are cut when a single item is over budget"""
+        compactor = ToolOutputCompactor(budget=200, max_string_chars=20)
+        result = {"items": [{"id": "1", "description": "x" * 5000}]}
+        compacted = compactor.compact("get", result)
+
+        assert compacted["items"][0]["description"] == "x" * 20 + "..."
+        assert compacted["continuation"] == {"truncated_strings": True}
+
+    def test_per_tool_budgets(self):
+        """Test that a per-tool budget overrides the default"""
+        compactor = ToolOutputCompactor(budget=10_000, budgets={"search": 300})
+        result = make_events(100)
+        assert compactor.compact("other", result) is result
+        assert "continuation" in compactor.compact("search", result)
+
+    def test_tabular_tools(self):
+        """Test that opted-in tools return tables and fit more items in the budget"""
+        result = make_events(100)
+        plain = ToolOutputCompactor(budget=400).compact("search", result)
+        tabular = ToolOutputCompactor(budget=400, tabular_tools={"search"}).compact(
+            "search", result
+        )
+
+        events = tabular["_embedded"]["events"]
+        assert events[TABLE_KEY]["columns"] == ["id", "name"]
+        assert count_tokens(tabular) <= 400
+        assert len(events[TABLE_KEY]["rows"]) > len(plain["_embedded"]["events"])
+        assert decode_tables(events) == [
+            {"id": f"event_{i}", "name": f"Concert {i}"}
+            for i in range(len(events[TABLE_KEY]["rows"]))
+        ]
+
+    def test_unknown_cursor(self):
+        """Test that an unknown cursor returns an error"""
+        compactor = ToolOutputCompactor()
+        assert "error" in compactor.more("missing")
+
+    def test_wraps_sync_and_async_tools(self):
+        """Test that wrapped tools keep their name and compact their result"""
+        compactor = ToolOutputCompactor(budget=300)
+
+        def search(keyword: str):
+            return make_events(100)
+
+        async def asearch(keyword: str):
+            return make_events(100)
+
+        sync_tool = compactor.wrap("search", search)
+        async_tool = compactor.wrap("search", asearch)
+
+        assert sync_tool.__name__ == "search"
+        assert asyncio.iscoroutinefunction(async_tool)
+        assert "continuation" in sync_tool("rock")
+        assert "continuation" in asyncio.run(async_tool("rock"))
+
+
+def test_continuation_tool_uses_shared_compactor():
+    """Test that get_more_results reports unknown cursors as errors"""
+    assert "error" in asyncio.run(aget_more_results("missing"))
+
+
+def test_parse_budgets():
+    assert parse_budgets("") == {}
+    assert parse_budgets("search_spotify=1500, get_playlist = 3000") == {
+        "search_spotify": 1500,
+        "get_playlist": 3000,
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,170 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from api.utils.http_client import UpstreamHTTPClient
+
+
+def mock_client(handler, **kwargs) -> UpstreamHTTPClient:
+    client = UpstreamHTTPClient(**kwargs)
+    client._new_async_client = lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+class TestUpstreamHTTPClient:
+    def test_per_host_connection_limit(self):
+        """Test that concurrent requests to one host never exceed the host limit"""
+        in_flight = {"api.spotify.com": 0, "app.ticketmaster.com": 0}
+        peak = dict(in_flight)
+
+        async def handler(request):
+            host = request.url.host
+            in_flight[host] += 1
+            peak[host] = max(peak[host], in_flight[host])
+            await asyncio.sleep(0.01)
+            in_flight[host] -= 1
+            return httpx.Response(200, json={})
+
+        client = mock_client(handler, max_connections_per_host=2)
+
+        async def run():
+            await client.startup()
+            await asyncio.gather(
+                *[client.get("https://api.spotify.com/v1/x") for _ in range(6)],
+                *[client.get("https://app.ticketmaster.com/x") for _ in range(3)],
+            )
+            await client.shutdown()
+
+        asyncio.run(run())
+        assert peak == {"api.spotify.com": 2, "app.ticketmaster.com": 2}
+
+    def test_stream_holds_host_slot_until_closed(self):
+        """Test that a streamed response keeps its host slot while the body is read"""
+
+        async def body():
+            yield b'{"a": 1}'
+
+        client = mock_client(
+            lambda request: httpx.Response(200, content=body()),
+            max_connections_per_host=1,
+        )
+        url = "https://api.spotify.com/v1/x"
+
+        async def run():
+            first = await client.send_stream("GET", url)
+            second = asyncio.ensure_future(client.send_stream("GET", url))
+            await asyncio.sleep(0.01)
+            waited = not second.done()
+            assert await first.aread() == b'{"a": 1}'
+            await first.aclose()
+            response = await asyncio.wait_for(second, 1)
+            await response.aclose()
+            await response.aclose()
+            return waited, client._host_semaphore(url)._value
+
+        assert asyncio.run(run()) == (True, 1)
+
+    def test_client_is_shared_within_a_loop(self):
+        """Test that one pool is reused per event loop and rebuilt for a new loop"""
+        client = mock_client(lambda request: httpx.Response(200, json={}))
+
+        async def get_client():
+            return client.client, client.client
+
+        first, second = asyncio.run(get_client())
+        third, _ = asyncio.run(get_client())
+        assert first is second
+        assert third is not first
+
+    def test_client_is_closed_with_its_loop(self):
+        """Test that a lazily created pool is closed when its loop shuts down"""
+        client = mock_client(lambda request: httpx.Response(200, json={}))
+
+        async def use_client():
+            await client.get("https://api.spotify.com/v1/x")
+            return client.client
+
+        first = asyncio.run(use_client())
+        assert first.is_closed
+        second = asyncio.run(use_client())
+        assert second is not first
+        assert second.is_closed
+
+    def test_shutdown_closes_client(self):
+        """Test that shutdown closes the pool opened by startup"""
+        client = mock_client(lambda request: httpx.Response(200, json={}))
+
+        async def run():
+            await client.startup()
+            pool = client.client
+            await client.shutdown()
+            return pool
+
+        assert asyncio.run(run()).is_closed
+
+
+class TestSpotifyAsyncRequest:
+    def test_retries_once_with_fresh_token_on_401(self):
+        """Test that a revoked token is invalidated and the request retried"""
+        from api.services.spotify_service import SpotifyService
+
+        seen_tokens = []
+
+        def handler(request):
+            seen_tokens.append(request.headers["Authorization"])
+            if len(seen_tokens) == 1:
+                return httpx.Response(401)
+            return httpx.Response(200, json={"id": "track_id"})
+
+        client = mock_client(handler)
+        tokens = iter(["stale", "fresh"])
+
+        async def aget_token():
+            return next(tokens)
+
+        with patch("api.services.spotify_service.http_client", client), patch(
+            "api.services.spotify_service.spotify_token_provider.aget_token",
+            side_effect=aget_token,
+        ):
+            result = asyncio.run(SpotifyService._asend_request("tracks/track_id"))
+
+        assert result == {"id": "track_id"}
+        assert seen_tokens == ["Bearer stale", "Bearer fresh"]
+
+    @pytest.mark.parametrize("fields", [None, "name"])
+    def test_invalid_json_body_returns_error(self, fields):
+        """Test that a body that is not JSON becomes the usual error dict"""
+        from api.services.spotify_service import SpotifyService
+
+        client = mock_client(lambda request: httpx.Response(200, text="<html>"))
+
+        async def aget_token():
+            return "token"
+
+        with patch("api.services.spotify_service.http_client", client), patch(
+            "api.services.spotify_service.spotify_token_provider.aget_token",
+            side_effect=aget_token,
+        ):
+            result = asyncio.run(
+                SpotifyService._asend_request("tracks/track_id", fields=fields)
+            )
+
+        assert result == {"error": "Failed to fetch data from Spotify"}
+
+
+class TestTicketmasterAsyncRequest:
+    def test_invalid_json_body_returns_error(self):
+        """Test that a body that is not JSON becomes the usual error dict"""
+        from api.services.ticketmaster_service import TicketmasterService
+
+        client = mock_client(lambda request: httpx.Response(200, text="<html>"))
+        with patch("api.services.ticketmaster_service.http_client", client):
+            result = asyncio.run(TicketmasterService._asend_request("events"))
+
+        assert result == {"error": "Failed to fetch data from Ticketmaster: events"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,196 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from api.core.agent_manager import AgentManager
+from api.utils.idempotency import IdempotencyConflict, IdempotencyStore
+
+
+class TestIdempotencyStore:
+    def test_duplicates_attach_to_the_running_request(self):
+        """Test that requests arriving during the first one share its result"""
+        store = IdempotencyStore()
+        calls = 0
+
+        async def run_turn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            return f"response {calls}"
+
+        async def run():
+            return await asyncio.gather(
+                *[store.do("key", "hi", run_turn) for _ in range(3)]
+            )
+
+        assert asyncio.run(run()) == ["response 1"] * 3
+        assert calls == 1
+        assert store.stats()["attached"] == 2
+        assert store.stats()["in_flight"] == 0
+
+    def test_completed_responses_are_replayed(self):
+        store = IdempotencyStore(ttl=0.05)
+        calls = 0
+
+        async def run_turn():
+            nonlocal calls
+            calls += 1
+            return f"response {calls}"
+
+        assert asyncio.run(store.do("key", "hi", run_turn)) == "response 1"
+        assert asyncio.run(store.do("key", "hi", run_turn)) == "response 1"
+        assert asyncio.run(store.do("other", "hi", run_turn)) == "response 2"
+        assert store.stats()["replayed"] == 1
+
+        time.sleep(0.06)
+        assert asyncio.run(store.do("key", "hi", run_turn)) == "response 3"
+
+    def test_failures_are_not_stored(self):
+        store = IdempotencyStore()
+        attempts = []
+
+        async def flaky_turn():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("run failed")
+            return "response"
+
+        with pytest.raises(RuntimeError):
+            asyncio.run(store.do("key", "hi", flaky_turn))
+        assert asyncio.run(store.do("key", "hi", flaky_turn)) == "response"
+        assert len(attempts) == 2
+
+    def test_key_reused_for_another_request(self):
+        store = IdempotencyStore()
+
+        async def run_turn():
+            await asyncio.sleep(0.01)
+            return "response"
+
+        async def run():
+            first = asyncio.ensure_future(store.do("key", "hi", run_turn))
+            await asyncio.sleep(0)
+            with pytest.raises(IdempotencyConflict):
+                await store.do("key", "bye", run_turn)
+            await first
+            with pytest.raises(IdempotencyConflict):
+                await store.do("key", "bye", run_turn)
+
+        asyncio.run(run())
+        assert store.stats()["conflicts"] == 2
+
+    def test_store_is_bounded(self):
+        store = IdempotencyStore(max_entries=2)
+
+        async def run_turn():
+            return "response"
+
+        for key in "abc":
+            asyncio.run(store.do(key, "hi", run_turn))
+        assert store.stats()["stored"] == 2
+
+
+def test_agent_manager_runs_duplicates_once():
+    manager = AgentManager()
+    factory = MagicMock(api_ids={"spotify", "ticketmaster"})
+    factory.tiers.return_value = {"fast": "gpt-4o-mini", "standard": "gpt-4o"}
+    factory.default_tier.return_value = "standard"
+    calls = 0
+
+    async def run_turn(api_id, message, session_id, user_id):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return "response"
+
+    async def run():
+        send = manager.process_message
+        return await asyncio.gather(
+            send("spotify", "hi", "s1", "user", idempotency_key="k1"),
+            send("spotify", "hi", "s1", "user", idempotency_key="k1"),
+            # Another user may happen to pick the same key
+            send("spotify", "hi", "s1", "other", idempotency_key="k1"),
+            send("spotify", "hi", "s1", "user"),
+        )
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch.object(manager, "_run_turn", side_effect=run_turn):
+        responses = asyncio.run(run())
+
+    assert responses == ["response"] * 4
+    assert calls == 3
+    assert manager.stats()["idempotency"]["attached"] == 1
+
+
+def test_failed_turns_are_retried():
+    """Test that a retry after a failed run starts a new run"""
+    manager = AgentManager()
+    factory = MagicMock(api_ids={"spotify", "ticketmaster"})
+    factory.tiers.return_value = {"fast": "gpt-4o-mini", "standard": "gpt-4o"}
+    factory.default_tier.return_value = "standard"
+    agent = MagicMock()
+    agent.achat = AsyncMock(side_effect=[RuntimeError("run failed"), "response"])
+    entry = MagicMock(agent=agent)
+
+    async def acquire(key, build):
+        return entry
+
+    async def run():
+        first = await manager.process_message(
+            "spotify", "hi", "s1", "user", idempotency_key="k1"
+        )
+        second = await manager.process_message(
+            "spotify", "hi", "s1", "user", idempotency_key="k1"
+        )
+        return first, second
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch.object(manager._agent_cache, "acquire", side_effect=acquire), patch.object(
+        manager._agent_cache, "release"
+    ), patch(
+        "api.core.agent_manager.get_instrumentor"
+    ):
+        first, second = asyncio.run(run())
+
+    assert first.startswith("Sorry")
+    assert second == "response"
+    assert agent.achat.call_count == 2
+
+
+def test_chat_route_forwards_idempotency_keys():
+    from api.main import app
+    from api.utils.auth import verify_supabase_token
+
+    app.dependency_overrides[verify_supabase_token] = lambda: {"id": "user"}
+    try:
+        with patch("api.main.settings.LAZY_INIT", True), patch(
+            "api.routes.api.agent_manager.process_message", return_value="response"
+        ) as process_message:
+            with TestClient(app) as client:
+                client.post(
+                    "/v1/spotify/chat",
+                    json={"message": "hi", "sessionId": "s1", "idempotencyKey": "k1"},
+                )
+                client.post(
+                    "/v1/spotify/chat",
+                    json={"message": "hi", "sessionId": "s1"},
+                    headers={"Idempotency-Key": "k2"},
+                )
+                process_message.side_effect = IdempotencyConflict()
+                conflict = client.post(
+                    "/v1/spotify/chat",
+                    json={"message": "bye", "sessionId": "s1", "idempotencyKey": "k1"},
+                )
+    finally:
+        app.dependency_overrides.clear()
+
+    keys = [c.kwargs["idempotency_key"] for c in process_message.call_args_list]
+    assert keys == ["k1", "k2", "k1"]
+    assert conflict.status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
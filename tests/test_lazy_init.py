@@ -0,0 +1,95 @@
+import asyncio
+import json
+import subprocess
+import sys
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi.testclient import TestClient
+from api.core.agent_manager import AgentManager
+
+
+def test_importing_app_defers_heavy_modules():
+    """Test that importing api.main loads no agent, tracing or Supabase code"""
+    code = (
+        "import json, sys; import api.main; "
+        "print(json.dumps(sorted(m for m in sys.modules if m.split('.')[0] in "
+        "('llama_index', 'langfuse', 'supabase', 'gotrue', 'openai'))))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    assert json.loads(output.splitlines()[-1]) == []
+
+
+def test_warm_up_readies_every_assistant():
+    """Test that warm-up loads the factory, starts tracing and ensures assistants"""
+    factory = MagicMock()
+    factory.aensure_assistants = AsyncMock()
+    manager = AgentManager()
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch("api.core.agent_manager.get_instrumentor") as instrumentor:
+        timings = asyncio.run(manager.warm_up())
+
+    factory.aensure_assistants.assert_awaited_once()
+    instrumentor.assert_called_once()
+    assert set(timings) == {"tools", "tracing", "assistants"}
+    assert "assistants" in manager.stats()
+
+
+class TestStartup:
+    @pytest.fixture
+    def app(self):
+        from api.main import app
+
+        return app
+
+    def test_lazy_init_skips_warm_up(self, app):
+        """Test that LAZY_INIT starts serving without warming up"""
+        with patch("api.main.settings.LAZY_INIT", True), patch(
+            "api.main.agent_manager.warm_up", new=AsyncMock()
+        ) as warm_up:
+            with TestClient(app) as client:
+                assert client.get("/").status_code == 200
+        warm_up.assert_not_awaited()
+
+    def test_eager_init_warms_up_in_lifespan(self, app):
+        with patch("api.main.settings.LAZY_INIT", False), patch(
+            "api.main.agent_manager.warm_up", new=AsyncMock(return_value={})
+        ) as warm_up:
+            with TestClient(app):
+                warm_up.assert_awaited_once()
+
+    def test_warmup_endpoint(self, app):
+        """Test that the warm-up endpoint only exists when enabled"""
+        with patch("api.main.settings.LAZY_INIT", True), patch(
+            "api.routes.api.agent_manager.warm_up",
+            new=AsyncMock(return_value={"tools": 1.0}),
+        ):
+            with TestClient(app) as client:
+                with patch("api.routes.api.settings.WARMUP_ENDPOINT_ENABLED", False):
+                    assert client.post("/v1/warmup").status_code == 404
+                with patch("api.routes.api.settings.WARMUP_ENDPOINT_ENABLED", True):
+                    response = client.post("/v1/warmup")
+        assert response.json() == {"seconds": {"tools": 1.0}}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+def test_stats_report_upstream_and_auth_counters():
+    """Test that the metrics include every cache, scheduler and breaker"""
+    stats = AgentManager().stats()
+
+    assert set(stats["upstreams"]) == {"spotify", "ticketmaster"}
+    assert set(stats["upstreams"]["spotify"]["batchers"]) == {
+        "tracks",
+        "artists",
+        "albums",
+    }
+    assert "breaker" in stats["upstreams"]["ticketmaster"]["resilience"]
+    assert "hits" in stats["upstreams"]["spotify"]["cache"]
+    assert set(stats["auth"]) == {"spotify_token", "token_verifier"}
+    assert "compaction" in stats
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+from api.core.agent_manager import AgentManager
+from api.core.model_router import ModelRouter, TierStats, parse_prices, parse_tiers
+
+TWO_TIERS = ["fast", "standard"]
+THREE_TIERS = ["fast", "standard", "deep"]
+
+
+def test_parse_tiers_and_prices():
+    assert parse_tiers("fast=gpt-4o-mini, standard=gpt-4o,") == {
+        "fast": "gpt-4o-mini",
+        "standard": "gpt-4o",
+    }
+    assert parse_prices("gpt-4o=2.50/10,broken=1") == {"gpt-4o": (2.5, 10.0)}
+
+
+class TestModelRouter:
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "How long is Bohemian Rhapsody?",
+            "When is the next Taylor Swift concert in Berlin?",
+            "Play something by Daft Punk",
+        ],
+    )
+    def test_simple_messages_go_to_the_cheap_tier(self, message):
+        assert ModelRouter().route(TWO_TIERS, message) == "fast"
+
+    @pytest.mark.parametrize(
+        "message",
+        [
+            "Recommend albums similar to Random Access Memories",
+            "Who headlines Friday? And is the venue near the station?",
+            "I am going to be in town with a few friends from work next month and we "
+            "would love to catch a show together on one of the evenings",
+        ],
+    )
+    def test_involved_messages_go_to_the_strong_tier(self, message):
+        assert ModelRouter().route(TWO_TIERS, message) == "standard"
+
+    def test_score_spreads_over_three_tiers(self):
+        router = ModelRouter()
+        assert router.route(THREE_TIERS, "How long is Hey Jude?") == "fast"
+        assert router.route(THREE_TIERS, "Explain this band's style") == "standard"
+        assert (
+            router.route(THREE_TIERS, "Compare their albums? Which is best?") == "deep"
+        )
+        assert router.stats()["routed"] == {"fast": 1, "standard": 1, "deep": 1}
+
+    def test_previous_tool_usage_raises_the_tier(self):
+        router = ModelRouter()
+        router.record("s1", 4)
+        assert router.route(TWO_TIERS, "How long is it?", "s1") == "standard"
+        assert router.route(TWO_TIERS, "How long is it?", "s2") == "fast"
+        router.forget("s1")
+        assert router.route(TWO_TIERS, "How long is it?", "s1") == "fast"
+
+    def test_disabled_router_uses_the_default(self):
+        router = ModelRouter(enabled=False)
+        assert router.route(TWO_TIERS, "How long is it?", default="standard") == (
+            "standard"
+        )
+        assert router.route(["only"], "Compare everything") == "only"
+
+    def test_session_history_is_bounded(self):
+        router = ModelRouter(max_sessions=2)
+        for session_id in "abc":
+            router.record(session_id, 5)
+        assert router.route(TWO_TIERS, "How long is it?", "a") == "fast"
+        assert router.route(TWO_TIERS, "How long is it?", "c") == "standard"
+
+
+def test_tier_stats_estimate_cost():
+    stats = TierStats({"gpt-4o-mini": (0.15, 0.60)})
+    usage = SimpleNamespace(prompt_tokens=1_000_000, completion_tokens=500_000)
+    stats.record("fast", "gpt-4o-mini", 1.0, usage)
+    stats.record("fast", "gpt-4o-mini", 3.0, None)
+
+    fast = stats.stats()["fast"]
+    assert fast["turns"] == 2
+    assert fast["prompt_tokens"] == 1_000_000
+    assert fast["cost_usd"] == pytest.approx(0.45)
+    assert fast["cost_per_turn_usd"] == pytest.approx(0.225)
+    assert fast["latency_seconds"]["average"] == 2.0
+    assert fast["latency_seconds"]["max"] == 3.0
+
+
+def test_agent_manager_routes_each_message():
+    """Test that each turn runs on the agent of the tier its message was routed to"""
+    manager = AgentManager()
+    factory = MagicMock(api_ids={"spotify", "ticketmaster"})
+    factory.tiers.return_value = {"fast": "gpt-4o-mini", "standard": "gpt-4o"}
+    factory.default_tier.return_value = "standard"
+    keys = []
+
+    async def acquire(key, build):
+        keys.append(key)
+        sources = [object()] * (3 if key[3] == "standard" else 0)
+        agent = MagicMock(last_usage=None)
+        agent.achat = AsyncMock(return_value=SimpleNamespace(sources=sources))
+        return MagicMock(agent=agent)
+
+    async def run():
+        for message in [
+            "How long is Hey Jude?",
+            "Recommend songs similar to Hey Jude",
+            # The last turn needed several tools
+            "How long is Let It Be?",
+        ]:
+            await manager.process_message("spotify", message, "s1", "user")
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch.object(manager._agent_cache, "acquire", side_effect=acquire), patch.object(
+        manager._agent_cache, "release"
+    ), patch(
+        "api.core.agent_manager.get_instrumentor"
+    ):
+        asyncio.run(run())
+
+    assert [key[3] for key in keys] == ["fast", "standard", "standard"]
+    tiers = manager.stats()["models"]["tiers"]
+    assert tiers["fast"]["turns"] == 1
+    assert tiers["standard"]["model"] == "gpt-4o"
+    assert tiers["standard"]["turns"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
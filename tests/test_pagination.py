@@ -0,0 +1,303 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from api.services.spotify_service import SpotifyService, spotify_response_cache
+from api.services.ticketmaster_service import TicketmasterService
+from datetime import datetime, timedelta
+from api.utils.pagination import (
+    TICKETMASTER_DATE_FORMAT,
+    split_date_window,
+    spotify_next_request,
+    ticketmaster_next_page,
+)
+
+BASE = "https://api.spotify.com/v1"
+
+
+def spotify_page(endpoint: str, params: dict, total: int) -> dict:
+    """A paging object of `total` albums, like Spotify returns"""
+    offset, limit = int(params["offset"]), int(params["limit"])
+    end = min(offset + limit, total)
+    next_url = None
+    if end < total:
+        next_url = f"{BASE}/{endpoint}?offset={end}&limit={limit}&market=US"
+    return {
+        "items": [{"id": f"a{i}", "name": f"Album {i}"} for i in range(offset, end)],
+        "limit": limit,
+        "offset": offset,
+        "total": total,
+        "next": next_url,
+    }
+
+
+def ticketmaster_page(params: dict, total: int) -> dict:
+    number, size = params["page"], params["size"]
+    start, end = number * size, min((number + 1) * size, total)
+    return {
+        "_embedded": {
+            "events": [{"id": f"e{i}", "name": f"Show {i}"} for i in range(start, end)]
+        },
+        "page": {
+            "size": size,
+            "totalElements": total,
+            "totalPages": -(-total // size),
+            "number": number,
+        },
+    }
+
+
+class TestPaginationHelpers:
+    def test_spotify_next_request(self):
+        """Test that next links become an endpoint and params for _make_request"""
+        assert spotify_next_request(
+            f"{BASE}/artists/x/albums?offset=20&limit=20", BASE
+        ) == ("artists/x/albums", {"offset": "20", "limit": "20"})
+        assert spotify_next_request(None, BASE) is None
+        assert spotify_next_request("https://example.com/x?offset=1", BASE) is None
+
+    def test_ticketmaster_next_page_stops_at_deep_paging_cap(self):
+        """Test that no page reaching size * page >= 1000 is requested"""
+        page = {"number": 3, "totalPages": 50}
+        assert ticketmaster_next_page(page, size=200) == 4
+        assert ticketmaster_next_page({"number": 4, "totalPages": 50}, 200) is None
+        assert ticketmaster_next_page({"number": 1, "totalPages": 2}, 20) is None
+
+
+class TestSpotifyPagination:
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Serve 120 albums in pages and record every request"""
+        spotify_response_cache.clear()
+        self.sent = []
+
+        async def send(endpoint, params=None):
+            self.sent.append((endpoint, params))
+            return spotify_page(endpoint, params, total=120)
+
+        with patch.object(SpotifyService, "_asend_request", side_effect=send):
+            yield
+        spotify_response_cache.clear()
+
+    def test_follows_next_links_until_max_items(self):
+        """Test that pages are followed and projected into one result"""
+        result = asyncio.run(
+            SpotifyService.aget_all_artists_albums(
+                fields="items.id", id="x", max_items=70
+            )
+        )
+
+        assert result["items"] == [{"id": f"a{i}"} for i in range(70)]
+        assert result["total"] == 120
+        assert result["has_more"] is True
+        assert [params["offset"] for _, params in self.sent] == [0, "50"]
+
+    def test_stops_at_last_page(self):
+        """Test that a missing next link ends the pagination"""
+        result = asyncio.run(
+            SpotifyService.aget_all_album_tracks(
+                fields="items.name", id="x", max_items=500
+            )
+        )
+
+        assert len(result["items"]) == 120
+        assert result["has_more"] is False
+        assert len(self.sent) == 3
+
+    def test_async_generator_yields_pages(self):
+        """Test that _aiter_pages streams raw pages one at a time"""
+
+        async def run():
+            pages = []
+            async for page in SpotifyService._aiter_pages(
+                "artists/x/albums", {"limit": 50, "offset": 0}
+            ):
+                pages.append(page["offset"])
+            return pages
+
+        assert asyncio.run(run()) == [0, 50, 100]
+
+    def test_error_after_first_page_returns_partial_result(self):
+        """Test that items collected before a failed page are kept"""
+
+        async def send(endpoint, params=None):
+            if int(params["offset"]) > 0:
+                return {"error": "Failed to fetch data from Spotify"}
+            return spotify_page(endpoint, params, total=120)
+
+        with patch.object(SpotifyService, "_asend_request", side_effect=send):
+            result = asyncio.run(
+                SpotifyService.aget_all_playlist_tracks(
+                    fields="items.id", playlist_id="p", max_items=200
+                )
+            )
+
+        assert len(result["items"]) == 100
+        assert result["error"] == "Failed to fetch data from Spotify"
+
+
+class TestTicketmasterPagination:
+    def test_collects_events_across_pages(self):
+        """Test that event pages are followed and merged up to max_items"""
+        sent = []
+
+        async def send(endpoint, params=None):
+            sent.append(params["page"])
+            return ticketmaster_page(params, total=450)
+
+        with patch.object(TicketmasterService, "_asend_request", side_effect=send):
+            result = asyncio.run(
+                TicketmasterService.asearch_all_ticketmaster_events(
+                    keyword="Artist", max_items=250
+                )
+            )
+
+        assert [event["id"] for event in result["events"]] == [
+            f"e{i}" for i in range(250)
+        ]
+        assert result["total"] == 450
+        assert sent == [0, 1]
+
+    def test_sync_variant_respects_deep_paging_cap(self):
+        """Test that the sync tool never pages past 1000 results"""
+        sent = []
+
+        def make_request(endpoint, params=None):
+            sent.append(params["page"])
+            return ticketmaster_page(params, total=5000)
+
+        with patch.object(
+            TicketmasterService, "_amake_request", side_effect=make_request
+        ), patch(
+            "api.services.ticketmaster_service.settings.PAGINATION_MAX_ITEMS", 2000
+        ):
+            result = TicketmasterService.search_all_ticketmaster_events(
+                city="Berlin", max_items=2000
+            )
+
+        assert sent == [0, 1, 2, 3, 4]
+        assert len(result["events"]) == 1000
+        assert result["has_more"] is True
+
+
+class TestShardedEventSearch:
+    START = datetime(2025, 6, 1)
+
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Serve 3000 events over 30 days plus one festival spanning the month"""
+        self.events = [
+            (f"e{i}", self.START + timedelta(seconds=864 * i)) for i in range(3000)
+        ]
+        self.sent = []
+
+        async def send(endpoint, params=None):
+            self.sent.append(params)
+            start = datetime.strptime(params["startDateTime"], TICKETMASTER_DATE_FORMAT)
+            end = datetime.strptime(params["endDateTime"], TICKETMASTER_DATE_FORMAT)
+            matches = [{"id": "festival", "name": "Festival"}] + [
+                {"id": id, "name": f"Show {id}"}
+                for id, date in self.events
+                if start <= date <= end
+            ]
+            number, size = params["page"], params["size"]
+            if (number + 1) * size > 1000:
+                return {"error": "Failed to fetch data from Ticketmaster: events.json"}
+            return {
+                "_embedded": {"events": matches[number * size : (number + 1) * size]},
+                "page": {
+                    "size": size,
+                    "totalElements": len(matches),
+                    "totalPages": -(-len(matches) // size),
+                    "number": number,
+                },
+            }
+
+        with patch.object(TicketmasterService, "_asend_request", side_effect=send):
+            yield
+
+    def search(self, max_items):
+        return asyncio.run(
+            TicketmasterService.asearch_all_ticketmaster_events(
+                city="Berlin",
+                startDateTime="2025-06-01T00:00:00Z",
+                endDateTime="2025-06-30T23:59:59Z",
+                max_items=max_items,
+            )
+        )
+
+    def test_window_past_paging_cap_is_split_and_deduplicated(self):
+        """Test that every event is returned once although no shard pages past 1000"""
+        result = self.search(max_items=5000)
+
+        ids = [event["id"] for event in result["events"]]
+        assert len(ids) == 3001
+        assert len(set(ids)) == 3001
+        assert all(
+            params["size"] * (params["page"] + 1) <= 1000 for params in self.sent
+        )
+        assert all(params["sort"] == "date,asc" for params in self.sent)
+
+    def test_split_stops_once_max_items_are_collected(self):
+        """Test that a busy month only fetches the shards the first events are in"""
+        self.events = [
+            (f"e{i}", self.START + timedelta(seconds=129 * i)) for i in range(20000)
+        ]
+        result = self.search(max_items=2000)
+
+        ids = [event["id"] for event in result["events"]]
+        assert ids == ["festival"] + [f"e{i}" for i in range(1999)]
+        assert result["has_more"] is True
+        assert len(self.sent) <= 20
+
+    def test_sibling_shards_are_fetched_concurrently(self):
+        """Test that the shards of a split window are requested together"""
+        serve = TicketmasterService._asend_request.side_effect
+        in_flight, peak = [], 0
+
+        async def send(endpoint, params=None):
+            nonlocal peak
+            in_flight.append(params["startDateTime"])
+            peak = max(peak, len(set(in_flight)))
+            await asyncio.sleep(0.01)
+            in_flight.remove(params["startDateTime"])
+            return await serve(endpoint, params)
+
+        with patch.object(TicketmasterService, "_asend_request", side_effect=send):
+            result = self.search(max_items=5000)
+
+        assert len(result["events"]) == 3001
+        assert peak > 1
+
+    def test_small_request_pages_without_splitting(self):
+        """Test that a window is only split when more than 1000 events are wanted"""
+        result = self.search(max_items=300)
+
+        assert len(result["events"]) == 300
+        assert {params["startDateTime"] for params in self.sent} == {
+            "2025-06-01T00:00:00Z"
+        }
+        assert result["has_more"] is True
+
+
+def test_split_date_window():
+    """Test that windows are split into adjacent, non-overlapping sub-windows"""
+    windows = split_date_window(
+        "2025-06-01T00:00:00Z", "2025-06-04T23:59:59Z", parts=4, min_seconds=3600
+    )
+    assert windows == [
+        ("2025-06-01T00:00:00Z", "2025-06-01T23:59:59Z"),
+        ("2025-06-02T00:00:00Z", "2025-06-02T23:59:59Z"),
+        ("2025-06-03T00:00:00Z", "2025-06-03T23:59:59Z"),
+        ("2025-06-04T00:00:00Z", "2025-06-04T23:59:59Z"),
+    ]
+    assert (
+        split_date_window(
+            "2025-06-01T00:00:00Z", "2025-06-01T01:00:00Z", parts=4, min_seconds=3600
+        )
+        is None
+    )
+    assert split_date_window("tomorrow", "2025-06-01T00:00:00Z", 4, 3600) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
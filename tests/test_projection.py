@@ -0,0 +1,139 @@
+import pytest
+from api.services.spotify_service import SpotifyService
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.projection import InvalidFieldsError, compile_fields, project
+
+PLAYLIST = {
+    "id": "p1",
+    "name": "Mix",
+    "owner": {"display_name": "Ann", "id": "u1", "uri": "spotify:user:u1"},
+    "tracks": {
+        "total": 3,
+        "items": [
+            {
+                "added_at": f"2024-01-0{i}",
+                "is_local": False,
+                "track": {
+                    "name": f"Song {i}",
+                    "duration_ms": 1000 * i,
+                    "album": {"name": f"Album {i}", "release_date": "2020"},
+                    "artists": [{"name": "A", "id": "a"}, {"name": "B", "id": "b"}],
+                },
+            }
+            for i in range(1, 4)
+        ],
+    },
+}
+
+
+class TestProjection:
+    def test_dotted_paths(self):
+        """Test that dotted paths keep only the selected leaves"""
+        assert project(PLAYLIST, "id,owner.display_name,tracks.total") == {
+            "id": "p1",
+            "owner": {"display_name": "Ann"},
+            "tracks": {"total": 3},
+        }
+
+    def test_parenthesised_groups_match_dotted_paths(self):
+        """Test the Spotify-style group syntax used in the playlist docs"""
+        grouped = project(
+            PLAYLIST, "tracks.items(added_at,track(name,album(name),artists.name))"
+        )
+        dotted = project(
+            PLAYLIST,
+            "tracks.items.added_at,tracks.items.track.name,"
+            "tracks.items.track.album.name,tracks.items.track.artists.name",
+        )
+        assert grouped == dotted
+        assert grouped["tracks"]["items"][0] == {
+            "added_at": "2024-01-01",
+            "track": {
+                "name": "Song 1",
+                "album": {"name": "Album 1"},
+                "artists": [{"name": "A"}, {"name": "B"}],
+            },
+        }
+
+    def test_array_slicing(self):
+        """Test index and range slices on list segments"""
+        result = project(PLAYLIST, "tracks.items[1:].track.name")
+        assert result == {
+            "tracks": {
+                "items": [{"track": {"name": "Song 2"}}, {"track": {"name": "Song 3"}}]
+            }
+        }
+        result = project(PLAYLIST, "tracks.items[-1].track.artists[0].name")
+        assert result == {
+            "tracks": {"items": [{"track": {"artists": [{"name": "A"}]}}]}
+        }
+
+    def test_wildcards(self):
+        """Test that * selects every key and merges with named siblings"""
+        assert project(PLAYLIST, "owner.*") == {"owner": PLAYLIST["owner"]}
+        result = project(
+            {"tracks": {"total": 1, "href": "x"}, "albums": {"total": 2}},
+            "*.total,tracks.href",
+        )
+        assert result == {"tracks": {"total": 1, "href": "x"}, "albums": {"total": 2}}
+
+    def test_missing_paths_are_left_out(self):
+        """Test that selecting absent keys never adds placeholders"""
+        assert project(PLAYLIST, "id,missing,owner.missing") == {
+            "id": "p1",
+            "owner": {},
+        }
+
+    def test_single_segment_fields_do_not_nest(self):
+        """Test that a top-level field keeps its value rather than nesting it"""
+        assert project({"id": "e1", "name": "Show"}, "id") == {"id": "e1"}
+
+    def test_compiled_projections_are_cached(self):
+        """Test that a fields expression is compiled once"""
+        compile_fields.cache_clear()
+        for _ in range(3):
+            project(PLAYLIST, "id,name")
+        assert compile_fields.cache_info().hits == 2
+
+    def test_invalid_expression(self):
+        """Test that unbalanced parentheses are rejected"""
+        with pytest.raises(InvalidFieldsError):
+            compile_fields("tracks.items(track(name)")
+        with pytest.raises(InvalidFieldsError):
+            compile_fields("id)")
+
+
+class TestServiceFilters:
+    def test_ticketmaster_filter_keeps_metadata_and_flat_fields(self):
+        """Test that Ticketmaster items are projected like Spotify payloads"""
+        response = {
+            "_embedded": {
+                "events": [{"id": "e1", "name": "Show", "dates": {"start": "x"}}]
+            },
+            "_links": {"self": {"href": "/events"}},
+            "page": {"number": 0, "totalElements": 1},
+        }
+        assert TicketmasterService._filter_response(response, "id,dates.start") == {
+            "events": [{"id": "e1", "dates": {"start": "x"}}],
+            "page": {"number": 0, "totalElements": 1},
+        }
+
+    def test_empty_ticketmaster_search_keeps_page(self):
+        """Test that a search without results is not reduced to an empty dict"""
+        response = {"page": {"number": 0, "totalElements": 0}}
+        assert TicketmasterService._filter_response(response, "id") == response
+
+    def test_errors_pass_through_filters(self):
+        """Test that error responses are never hidden by a projection"""
+        error = {"error": "Failed to fetch data from Spotify"}
+        assert SpotifyService._filter_response(error, "id,name") == error
+        assert TicketmasterService._filter_response(error, "id") == error
+
+    def test_invalid_fields_become_an_error(self):
+        """Test that the agent gets an error message for a malformed expression"""
+        result = SpotifyService._filter_response({"id": "x"}, "a(b")
+        assert "error" in result
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,135 @@
+import asyncio
+import time
+import httpx
+import pytest
+from unittest.mock import patch
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.rate_limiter import (
+    RateLimitExceeded,
+    UpstreamScheduler,
+    parse_retry_after,
+)
+
+
+def respond(status_code=200, headers=None):
+    async def send():
+        return httpx.Response(status_code, headers=headers, json={})
+
+    return send
+
+
+class TestUpstreamScheduler:
+    def test_calls_are_paced_to_the_rate(self):
+        """Test that calls beyond the burst wait for the bucket to refill"""
+        scheduler = UpstreamScheduler("Test", rate=50, burst=2, max_concurrency=10)
+
+        async def run():
+            started = time.monotonic()
+            await asyncio.gather(*[scheduler.run(respond()) for _ in range(5)])
+            return time.monotonic() - started
+
+        # Two calls use the burst, the other three wait 20ms each
+        assert asyncio.run(run()) >= 0.05
+        assert scheduler.stats()["calls"] == 5
+
+    def test_concurrency_is_capped(self):
+        """Test that no more than the concurrency limit is in flight at once"""
+        scheduler = UpstreamScheduler("Test", rate=1000, burst=100, max_concurrency=2)
+        in_flight = 0
+        peak = 0
+
+        async def send():
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200)
+
+        async def run():
+            await asyncio.gather(*[scheduler.run(send) for _ in range(6)])
+
+        asyncio.run(run())
+        assert peak == 2
+
+    def test_429_is_retried_after_retry_after(self):
+        """Test that a throttled call waits for Retry-After and halves the limit"""
+        scheduler = UpstreamScheduler("Test", rate=100, burst=10, max_concurrency=8)
+        responses = iter(
+            [
+                httpx.Response(429, headers={"Retry-After": "0.05"}),
+                httpx.Response(200),
+            ]
+        )
+
+        async def send():
+            return next(responses)
+
+        started = time.monotonic()
+        response = asyncio.run(scheduler.run(send))
+
+        assert response.status_code == 200
+        assert time.monotonic() - started >= 0.05
+        assert scheduler.stats()["throttled"] == 1
+        assert scheduler.stats()["retries"] == 1
+        assert scheduler.concurrency_limit < 5
+
+    def test_retry_after_beyond_deadline_is_rejected(self):
+        """Test that a wait longer than the queue deadline fails fast"""
+        scheduler = UpstreamScheduler(
+            "Test", rate=100, burst=10, max_concurrency=8, queue_timeout=0.5
+        )
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            asyncio.run(scheduler.run(respond(429, {"Retry-After": "30"})))
+
+        assert exc_info.value.retry_after == 30
+        assert str(exc_info.value) == "Rate limited by Test, retry after 30 seconds"
+
+    def test_queued_calls_are_rejected_at_their_deadline(self):
+        """Test that a call which cannot get a token in time is rejected"""
+        scheduler = UpstreamScheduler(
+            "Test", rate=1, burst=1, max_concurrency=8, queue_timeout=0.1
+        )
+
+        async def run():
+            return await asyncio.gather(
+                scheduler.run(respond()),
+                scheduler.run(respond()),
+                return_exceptions=True,
+            )
+
+        first, second = asyncio.run(run())
+        assert first.status_code == 200
+        assert isinstance(second, RateLimitExceeded)
+        assert scheduler.stats()["rejected"] == 1
+
+
+def test_parse_retry_after():
+    """Test both Retry-After forms and the fallback"""
+    assert parse_retry_after("3") == 3
+    assert parse_retry_after(None) == 1.0
+    assert parse_retry_after("garbage", default=2) == 2
+    assert parse_retry_after("Thu, 01 Jan 1970 00:00:00 GMT") == 0
+
+
+def test_ticketmaster_rate_limit_returns_error():
+    """Test that the service surfaces an exhausted quota as an error dict"""
+    from api.services.ticketmaster_service import ticketmaster_scheduler
+
+    async def get(url, params=None):
+        return httpx.Response(429, headers={"Retry-After": "120"})
+
+    with patch("api.services.ticketmaster_service.http_client.get", side_effect=get):
+        result = asyncio.run(TicketmasterService._asend_request("events.json", {}))
+    ticketmaster_scheduler._blocked_until = 0.0
+    ticketmaster_scheduler.concurrency_limit = ticketmaster_scheduler.max_concurrency
+
+    assert result == {
+        "error": "Rate limited by Ticketmaster, retry after 60 seconds",
+        "retry_after": 60,
+    }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,203 @@
+import asyncio
+import httpx
+import pytest
+from unittest.mock import patch
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ResilientUpstream,
+    endpoint_class,
+)
+
+
+def make_upstream(**kwargs) -> ResilientUpstream:
+    upstream = ResilientUpstream(
+        "Test", CircuitBreaker("Test", failure_threshold=3), **kwargs
+    )
+    upstream.backoff = lambda attempt: 0
+    return upstream
+
+
+class TestCircuitBreaker:
+    def test_opens_after_threshold_and_probes_when_half_open(self):
+        """Test the closed -> open -> half-open -> closed cycle"""
+        breaker = CircuitBreaker("Test", failure_threshold=2, recovery_timeout=0.05)
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        asyncio.run(asyncio.sleep(0.06))
+        breaker.before_call()
+        # Only one trial call is let through while half-open
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_failed_trial_reopens(self):
+        """Test that a failed half-open trial opens the circuit again"""
+        breaker = CircuitBreaker("Test", failure_threshold=1, recovery_timeout=0.01)
+        breaker.record_failure()
+        asyncio.run(asyncio.sleep(0.02))
+        breaker.before_call()
+        breaker.record_failure()
+
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()["opened"] == 2
+
+    def test_lost_trial_frees_its_slot(self):
+        """Test that a trial that never reports back is not waited on forever"""
+        breaker = CircuitBreaker("Test", failure_threshold=1, recovery_timeout=0.02)
+        breaker.record_failure()
+        asyncio.run(asyncio.sleep(0.03))
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+        asyncio.run(asyncio.sleep(0.03))
+        breaker.before_call()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+class TestResilientUpstream:
+    def test_transient_failures_are_retried_for_get(self):
+        """Test that a timeout and a 503 are retried before the success"""
+        upstream = make_upstream(max_retries=2)
+        outcomes = iter(
+            [httpx.ConnectTimeout("slow"), httpx.Response(503), httpx.Response(200)]
+        )
+
+        async def send():
+            outcome = next(outcomes)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        response = asyncio.run(upstream.run(send, "events.json"))
+        assert response.status_code == 200
+        assert upstream.retries == 2
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+    def test_non_idempotent_requests_are_not_retried(self):
+        """Test that a POST fails on the first transport error"""
+        upstream = make_upstream()
+        calls = 0
+
+        async def send():
+            nonlocal calls
+            calls += 1
+            raise httpx.ConnectError("down")
+
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(upstream.run(send, "events.json", method="POST"))
+        assert calls == 1
+
+    def test_open_circuit_fails_fast(self):
+        """Test that calls stop reaching a failing upstream"""
+        upstream = make_upstream(max_retries=0)
+        calls = 0
+
+        def send():
+            nonlocal calls
+            calls += 1
+            return httpx.Response(502)
+
+        for _ in range(5):
+            try:
+                upstream.run_sync(send, "events.json")
+            except CircuitOpenError:
+                pass
+        assert calls == 3
+
+    def test_slow_request_is_hedged_at_p95(self):
+        """Test that a second request is sent once the first exceeds the p95 latency"""
+        latency = LatencyTracker(min_samples=5)
+        for _ in range(10):
+            latency.record("tracks/*", 0.01)
+        upstream = make_upstream(hedging=True, latency=latency)
+        delays = iter([1.0, 0.0])
+        cancelled = []
+
+        async def send():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return httpx.Response(200, json={"delay": delay})
+
+        response = asyncio.run(upstream.run(send, "tracks/abc"))
+        assert response.json() == {"delay": 0.0}
+        assert upstream.stats()["hedge_wins"] == 1
+        assert cancelled == [1.0]
+
+    @pytest.mark.parametrize("outcome", ["cancelled", "local_error"])
+    def test_trial_without_answer_reopens(self, outcome):
+        """Test that a trial ending without an answer opens the circuit again"""
+        upstream = make_upstream()
+        upstream.breaker.recovery_timeout = 0.01
+        for _ in range(3):
+            upstream.breaker.record_failure()
+
+        async def send():
+            if outcome == "local_error":
+                raise RuntimeError("queue timeout")
+            await asyncio.sleep(1)
+
+        async def run():
+            await asyncio.sleep(0.02)
+            with pytest.raises((asyncio.TimeoutError, RuntimeError)):
+                await asyncio.wait_for(upstream.run(send, "events.json"), 0.01)
+
+        asyncio.run(run())
+        assert upstream.breaker.state == CircuitBreaker.OPEN
+
+    def test_local_errors_do_not_open_a_closed_circuit(self):
+        """Test that errors raised before reaching the upstream are not its failures"""
+        upstream = make_upstream()
+
+        async def send():
+            raise RuntimeError("queue timeout")
+
+        for _ in range(5):
+            with pytest.raises(RuntimeError):
+                asyncio.run(upstream.run(send, "events.json"))
+        assert upstream.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_endpoint_class_masks_ids():
+    """Test that latency is tracked per endpoint shape, not per ID"""
+    assert endpoint_class("artists/abc/albums") == "artists/*/albums"
+    assert endpoint_class("events/xyz.json") == "events/*"
+    assert endpoint_class("events.json") == "events.json"
+
+
+def test_ticketmaster_open_circuit_returns_error():
+    """Test that the service answers with an error dict while the circuit is open"""
+    upstream = make_upstream()
+    upstream.breaker.record_failure()
+    upstream.breaker.record_failure()
+    upstream.breaker.record_failure()
+
+    with patch("api.services.ticketmaster_service.ticketmaster_upstream", upstream):
+        result = TicketmasterService.search_ticketmaster_events(keyword="Artist")
+        async_result = asyncio.run(
+            TicketmasterService._asend_request("events.json", {})
+        )
+
+    assert result == {
+        "error": "Test is unavailable, retry after 30 seconds",
+        "retry_after": 30,
+    }
+    assert async_result == result
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,114 @@
+import time
+import pytest
+from unittest.mock import patch
+from api.services.spotify_service import SpotifyService, spotify_response_cache
+from api.utils.cache import TTLCache
+from api.utils.response_cache import ResponseCache
+
+MOCK_TRACK = {
+    "id": "track_id",
+    "name": "Track Name",
+    "duration_ms": 180000,
+    "album": {"name": "Album Name", "release_date": "1981-12"},
+    "artists": [{"id": "artist_id", "name": "Artist Name"}],
+}
+
+
+class TestTTLCache:
+    def test_lru_eviction_by_entry_count(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+
+    def test_eviction_by_memory_bound(self):
+        """Test that entries are evicted until the byte budget fits"""
+        cache = TTLCache(maxsize=100, max_bytes=10, sizeof=len)
+        cache.set("a", "xxxx")
+        cache.set("b", "yyyy")
+        cache.set("c", "zzzz")
+        cache.set("huge", "x" * 11)
+
+        assert cache.get("a") is None
+        assert cache.get("huge") is None
+        assert cache.stats()["bytes"] == 8
+
+    def test_entries_expire(self):
+        """Test that an entry is dropped once its TTL has passed"""
+        cache = TTLCache(ttl=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.stats()["expirations"] == 1
+
+
+class TestResponseCache:
+    def test_key_ignores_param_order_and_unset_values(self):
+        """Test that equivalent params share one cache key"""
+        assert ResponseCache.make_key(
+            "tracks/1", {"market": "US", "x": None}
+        ) == ResponseCache.make_key("tracks/1", {"market": "US"})
+
+    def test_only_matching_endpoints_are_cached(self):
+        """Test that endpoint classes select what is cached and for how long"""
+        cache = ResponseCache(rules=[("tracks", r"tracks/[^/]+", 60)])
+        cache.set("tracks/1", None, {"id": "1"})
+        cache.set("search", {"q": "x"}, {"tracks": {}})
+        cache.set("tracks/2", None, {"error": "Failed to fetch data from Spotify"})
+
+        assert cache.get("tracks/1", None) == {"id": "1"}
+        assert cache.get("search", {"q": "x"}) is None
+        assert cache.get("tracks/2", None) is None
+        assert cache.stats()["classes"]["tracks"] == {"hits": 1, "misses": 1}
+
+
+class TestSpotifyCatalogCache:
+    @pytest.fixture(autouse=True)
+    def setup_method(self):
+        """Start each test with an empty cache and a mocked upstream"""
+        spotify_response_cache.clear()
+        # Single-ID requests, so every lookup reaches the cache as is
+        with patch(
+            "api.services.spotify_service.SpotifyService._asend_request",
+            return_value=MOCK_TRACK,
+        ) as self.mock_send, patch(
+            "api.services.spotify_service.settings.SPOTIFY_BATCHING_ENABLED", False
+        ):
+            yield
+        spotify_response_cache.clear()
+
+    def test_projections_share_one_upstream_payload(self):
+        """Test that different fields projections of one track hit upstream once"""
+        first = SpotifyService.get_track(fields="id,name", id="track_id")
+        second = SpotifyService.get_track(
+            fields="album.name,duration_ms", id="track_id"
+        )
+
+        assert first == {"id": "track_id", "name": "Track Name"}
+        assert second == {"album": {"name": "Album Name"}, "duration_ms": 180000}
+        assert self.mock_send.call_count == 1
+
+    def test_markets_are_cached_separately(self):
+        """Test that params are part of the cache key"""
+        SpotifyService.get_track(fields="id", id="track_id", market="US")
+        SpotifyService.get_track(fields="id", id="track_id", market="SE")
+
+        assert self.mock_send.call_count == 2
+
+    def test_search_is_not_cached(self):
+        """Test that non-catalog endpoints always go upstream"""
+        SpotifyService.search_spotify(q="x", search_type="track", fields="tracks")
+        SpotifyService.search_spotify(q="x", search_type="track", fields="tracks")
+
+        assert self.mock_send.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,160 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+from api.core.agent_manager import AgentManager
+from api.utils.session_gate import ChatQueueTimeout, SessionGate
+
+
+async def turn(gate, session_id, log, delay=0.05):
+    async with gate.slot(session_id):
+        log.append(("start", session_id))
+        await asyncio.sleep(delay)
+        log.append(("end", session_id))
+
+
+class TestSessionGate:
+    def test_same_session_runs_in_order(self):
+        """Test that turns of one session never overlap and keep their order"""
+        gate = SessionGate(max_concurrent=10)
+        log = []
+        order = []
+
+        async def numbered(i):
+            async with gate.slot("s1"):
+                order.append(i)
+                log.append("start")
+                await asyncio.sleep(0.01)
+                log.append("end")
+
+        async def run():
+            await asyncio.gather(*[numbered(i) for i in range(5)])
+
+        asyncio.run(run())
+        assert order == list(range(5))
+        assert log == ["start", "end"] * 5
+        assert gate.stats()["active_sessions"] == 0
+
+    def test_sessions_run_in_parallel_up_to_the_cap(self):
+        """Test that different sessions overlap, at most max_concurrent at once"""
+        gate = SessionGate(max_concurrent=3)
+        log = []
+
+        async def run():
+            await asyncio.gather(*[turn(gate, f"s{i}", log) for i in range(6)])
+
+        asyncio.run(run())
+        stats = gate.stats()
+        assert stats["peak_in_flight"] == 3
+        assert stats["served"] == 6
+        assert stats["in_flight"] == 0 and stats["queue_depth"] == 0
+        assert stats["wait_seconds"]["max"] >= 0.04
+
+    def test_queue_depth_is_reported(self):
+        gate = SessionGate(max_concurrent=1)
+        log = []
+
+        async def run():
+            tasks = [asyncio.ensure_future(turn(gate, s, log)) for s in "aab"]
+            await asyncio.sleep(0.01)
+            stats = gate.stats()
+            await asyncio.gather(*tasks)
+            return stats
+
+        stats = asyncio.run(run())
+        assert stats["in_flight"] == 1
+        assert stats["waiting_for_session"] == 1
+        assert stats["waiting_for_slot"] == 1
+        assert stats["queue_depth"] == 2
+
+    def test_queue_timeout(self):
+        """Test that a turn waiting past the timeout fails and frees its place"""
+        gate = SessionGate(max_concurrent=1, queue_timeout=0.02)
+        log = []
+
+        async def run():
+            first = asyncio.ensure_future(turn(gate, "a", log, delay=0.1))
+            await asyncio.sleep(0)
+            with pytest.raises(ChatQueueTimeout):
+                await turn(gate, "b", log)
+            await first
+            await turn(gate, "b", log, delay=0)
+
+        asyncio.run(run())
+        stats = gate.stats()
+        assert stats["timeouts"] == 1
+        assert stats["served"] == 2
+        assert stats["active_sessions"] == 0
+
+    def test_errors_release_the_session(self):
+        gate = SessionGate(max_concurrent=1)
+
+        async def failing():
+            async with gate.slot("s1"):
+                raise RuntimeError("run failed")
+
+        async def run():
+            with pytest.raises(RuntimeError):
+                await failing()
+            await turn(gate, "s1", [], delay=0)
+
+        asyncio.run(run())
+        assert gate.stats()["served"] == 2
+
+
+def test_agent_manager_serializes_session_turns():
+    """Test that concurrent messages of one session reach the agent one at a time"""
+    manager = AgentManager()
+    factory = MagicMock(api_ids={"spotify", "ticketmaster"})
+    active = 0
+    peak = 0
+
+    async def run_turn(api_id, message, session_id, user_id):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.02)
+        active -= 1
+        return message
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                manager.process_message(api_id, str(i), "s1", "user")
+                for i, api_id in enumerate(["spotify", "ticketmaster"] * 2)
+            ]
+        )
+
+    with patch(
+        "api.core.agent_manager.load_assistant_factory", return_value=factory
+    ), patch.object(manager, "_run_turn", side_effect=run_turn):
+        responses = asyncio.run(run())
+
+    assert responses == ["0", "1", "2", "3"]
+    assert peak == 1
+    assert manager.stats()["chats"]["served"] == 4
+
+
+def test_chat_returns_503_when_queue_times_out():
+    from api.main import app
+    from api.utils.auth import verify_supabase_token
+
+    app.dependency_overrides[verify_supabase_token] = lambda: {"id": "user"}
+    try:
+        with patch("api.main.settings.LAZY_INIT", True), patch(
+            "api.routes.api.agent_manager.process_message",
+            side_effect=ChatQueueTimeout(60),
+        ):
+            with TestClient(app) as client:
+                response = client.post(
+                    "/v1/spotify/chat", json={"message": "hi", "sessionId": "s1"}
+                )
+    finally:
+        app.dependency_overrides.clear()
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "5"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,208 @@
+import asyncio
+import pytest
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+from api.core.agent_manager import AgentManager, SessionForbidden
+from api.db.session_store import (
+    CachedSessionStore,
+    MemorySessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    SupabaseSessionStore,
+)
+from api.models.thread_models import UserThread, utcnow
+
+
+def make_record(session_id, idle_seconds=0):
+    return UserThread(
+        session_id=session_id,
+        user_id="user",
+        api_id="spotify",
+        assistant_id="asst",
+        thread_id=f"thread_{session_id}",
+        last_used_at=utcnow() - timedelta(seconds=idle_seconds),
+    )
+
+
+class TestMemorySessionStore:
+    def test_get_put_delete(self):
+        """Test that a session maps to its thread until deleted"""
+        store = MemorySessionStore()
+        store.put(make_record("s1"))
+        assert store.get("s1").thread_id == "thread_s1"
+        store.delete("s1")
+        assert store.get("s1") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test that the store stays within max_entries"""
+        store = MemorySessionStore(max_entries=2)
+        store.put(make_record("s1"))
+        store.put(make_record("s2"))
+        store.get("s1")
+        store.put(make_record("s3"))
+        assert store.get("s2") is None
+        assert store.get("s1") is not None and store.get("s3") is not None
+        assert store.stats()["evictions"] == 1
+
+    def test_idle_sessions_expire(self):
+        """Test that idle sessions are not returned and are swept"""
+        store = MemorySessionStore(idle_ttl=60)
+        store.put_many([make_record("old", idle_seconds=120), make_record("new")])
+        assert store.get("old") is None
+        store.put(make_record("old", idle_seconds=120))
+        assert store.sweep(60) == 1
+        assert len(store) == 1
+
+    def test_touch_extends_session(self):
+        store = MemorySessionStore(idle_ttl=60)
+        store.put(make_record("s1", idle_seconds=50))
+        store.touch("s1")
+        assert utcnow() - store.get("s1").last_used_at < timedelta(seconds=5)
+
+    def test_ids_are_unique(self):
+        """Test that every record gets its own id"""
+        assert make_record("s1").id != make_record("s2").id
+
+
+class TestSQLiteSessionStore:
+    @pytest.fixture
+    def store(self, tmp_path):
+        return SQLiteSessionStore(str(tmp_path / "sessions.db"), idle_ttl=60)
+
+    def test_round_trip(self, store):
+        """Test that records survive a new connection to the same file"""
+        record = make_record("s1")
+        store.put(record)
+        assert store.get("s1") == record
+
+        store.put(make_record("s1").model_copy(update={"thread_id": "other"}))
+        assert store.get("s1").thread_id == "other"
+        store.delete("s1")
+        assert store.get("s1") is None
+
+    def test_sweep(self, store):
+        store.put_many([make_record("old", idle_seconds=120), make_record("new")])
+        assert store.get("old") is None
+        assert store.sweep(60) == 1
+        assert store.get("new") is not None
+
+
+class TestSupabaseSessionStore:
+    def test_queries(self):
+        """Test that records are read, upserted and deleted by session_id"""
+        client = MagicMock()
+        query = client.table.return_value
+        record = make_record("s1")
+        query.select.return_value.eq.return_value.gte.return_value.limit.return_value.execute.return_value.data = [
+            record.model_dump(mode="json")
+        ]
+        store = SupabaseSessionStore(client, table="user_threads")
+
+        assert store.get("s1") == record
+        query.select.return_value.eq.assert_called_with("session_id", "s1")
+
+        store.put_many([record])
+        rows = query.upsert.call_args.args[0]
+        assert rows[0]["thread_id"] == "thread_s1"
+        assert query.upsert.call_args.kwargs == {"on_conflict": "session_id"}
+
+        store.delete_many(["s1"])
+        query.delete.return_value.in_.assert_called_with("session_id", ["s1"])
+
+
+class TestCachedSessionStore:
+    def make_store(self):
+        backend = MagicMock()
+        backend.get.return_value = None
+        return backend, CachedSessionStore(backend, MemorySessionStore(), batch_size=2)
+
+    def test_writes_are_batched(self):
+        """Test that writes reach the backend in batches on flush"""
+        backend, store = self.make_store()
+        for i in range(3):
+            store.put(make_record(f"s{i}"))
+        store.delete("s0")
+        backend.put_many.assert_not_called()
+        assert store.get("s1").thread_id == "thread_s1"
+
+        store.flush()
+        written = [
+            r.session_id for c in backend.put_many.call_args_list for r in c.args[0]
+        ]
+        assert sorted(written) == ["s1", "s2"]
+        backend.delete_many.assert_called_once_with(["s0"])
+        assert store.stats()["flushed"] == 3
+
+    def test_reads_through_and_caches(self):
+        backend, store = self.make_store()
+        backend.get.return_value = make_record("s1")
+        assert store.get("s1").thread_id == "thread_s1"
+        assert store.get("s1").thread_id == "thread_s1"
+        backend.get.assert_called_once_with("s1")
+        assert store.stats()["hits"] == 1
+
+    def test_pending_delete_hides_backend_record(self):
+        backend, store = self.make_store()
+        backend.get.return_value = make_record("s1")
+        store.delete("s1")
+        assert store.get("s1") is None
+
+    def test_failed_flush_is_retried(self):
+        backend, store = self.make_store()
+        backend.put_many.side_effect = [RuntimeError("down"), None]
+        store.put(make_record("s1"))
+        with pytest.raises(RuntimeError):
+            store.flush()
+        store.flush()
+        assert backend.put_many.call_count == 2
+        assert store.stats()["pending"] == 0
+
+    def test_background_worker_flushes_and_sweeps(self):
+        """Test that the worker started by startup() flushes and sweeps"""
+        backend, store = self.make_store()
+        backend.sweep.return_value = 3
+        store.flush_interval = 0.01
+        store.sweep_interval = 0
+
+        async def run():
+            await store.startup()
+            store.put(make_record("s1"))
+            await asyncio.sleep(0.1)
+            await store.shutdown()
+
+        asyncio.run(run())
+        backend.put_many.assert_called()
+        assert store.stats()["swept"] >= 3
+
+
+def test_backend_must_implement_every_operation():
+    """Test that a store missing a backend operation cannot be created"""
+
+    class ReadOnlyStore(SessionStore):
+        def get(self, session_id):
+            return None
+
+    with pytest.raises(TypeError):
+        ReadOnlyStore()
+
+
+def test_session_of_another_user_is_rejected():
+    """Test that a session ID never opens or cleans up another user's thread"""
+    store = MemorySessionStore()
+    store.put(make_record("s1"))
+    manager = AgentManager()
+
+    with patch("api.core.agent_manager.session_store", store), patch(
+        "api.core.agent_manager.load_assistant_factory"
+    ) as factory:
+        with pytest.raises(SessionForbidden):
+            manager._get_agent_for_session("s1", "spotify", "intruder")
+        with pytest.raises(SessionForbidden):
+            manager.cleanup_session("s1", "intruder")
+
+    factory.return_value.get_assistant.assert_not_called()
+    assert store.get("s1").thread_id == "thread_s1"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.single_flight import SingleFlight
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_one_result(self):
+        """Test that identical concurrent calls run once and share the result"""
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"id": "shared"}
+
+        async def run():
+            return await asyncio.gather(*[flight.do("key", fetch) for _ in range(5)])
+
+        results = asyncio.run(run())
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+    def test_errors_propagate_to_every_waiter(self):
+        """Test that a failed call raises in every coalesced caller"""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream failed")
+
+        async def run():
+            return await asyncio.gather(
+                *[flight.do("key", fetch) for _ in range(3)], return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_cancelled_leader_does_not_cancel_waiters(self):
+        """Test that the shared call survives the first caller being cancelled"""
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        async def run():
+            leader = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("key", fetch))
+            await asyncio.sleep(0)
+            leader.cancel()
+            return await follower
+
+        assert asyncio.run(run()) == "done"
+
+    def test_sequential_calls_are_not_coalesced(self):
+        """Test that a finished call is not reused by later callers"""
+        flight = SingleFlight()
+
+        async def fetch():
+            return object()
+
+        async def run():
+            return await flight.do("key", fetch), await flight.do("key", fetch)
+
+        first, second = asyncio.run(run())
+        assert first is not second
+        assert flight.stats()["calls"] == 2
+
+
+def test_identical_ticketmaster_searches_are_coalesced():
+    """Test that concurrent identical event searches send one upstream request"""
+
+    async def slow_send(endpoint, params=None):
+        await asyncio.sleep(0.01)
+        return {"_embedded": {"events": [{"id": "e1", "name": "Show"}]}, "page": {}}
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                TicketmasterService.asearch_ticketmaster_events(
+                    keyword="Artist", size=1
+                )
+                for _ in range(10)
+            ]
+        )
+
+    with patch.object(
+        TicketmasterService, "_asend_request", side_effect=slow_send
+    ) as mock_send:
+        results = asyncio.run(run())
+
+    assert mock_send.await_count == 1
+    assert all(result is results[0] for result in results)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -114,7 +114,7 @@ class TestSpotifyService:
         """Setup the mock service before each test"""
         self.mock_response = MOCK_ALBUMS_RESPONSE
         self.patcher = patch(
-            "api.services.spotify_service.SpotifyService._make_request"
+            "api.services.spotify_service.SpotifyService._amake_request"
         )
         self.mock_request = self.patcher.start()
         self.mock_request.return_value = self.mock_response
@@ -194,7 +194,7 @@ class TestSpotifySearch:
     def setup_method(self):
         """Setup the mock service before each test"""
         self.patcher = patch(
-            "api.services.spotify_service.SpotifyService._make_request"
+            "api.services.spotify_service.SpotifyService._amake_request"
         )
         self.mock_request = self.patcher.start()
         self.mock_request.return_value = MOCK_SEARCH_RESPONSE
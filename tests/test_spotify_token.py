@@ -0,0 +1,90 @@
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from api.utils.auth import SpotifyTokenProvider
+
+
+class TestSpotifyTokenProvider:
+    def test_token_is_cached_until_refresh_margin(self):
+        """Test that a fresh token is fetched once and then served from cache"""
+        provider = SpotifyTokenProvider(refresh_margin=60, expiry_margin=10)
+        with patch.object(
+            provider, "_fetch_token", return_value=("token-1", 3600)
+        ) as mock_fetch:
+            assert provider.get_token() == "token-1"
+            assert provider.get_token() == "token-1"
+            assert provider.get_token() == "token-1"
+
+        assert mock_fetch.call_count == 1
+        assert provider.stats()["hits"] == 2
+        assert provider.stats()["refreshes"] == 1
+
+    def test_expired_token_is_refetched(self):
+        """Test that a token inside the expiry margin is never handed out"""
+        provider = SpotifyTokenProvider(refresh_margin=0, expiry_margin=10)
+        with patch.object(
+            provider, "_fetch_token", side_effect=[("old", 5), ("new", 3600)]
+        ):
+            assert provider.get_token() == "old"
+            assert provider.get_token() == "new"
+
+        assert provider.stats()["misses"] == 2
+
+    def test_background_refresh_inside_refresh_margin(self):
+        """Test that a token close to expiry is served while a refresh runs"""
+        provider = SpotifyTokenProvider(refresh_margin=120, expiry_margin=10)
+        refreshed = threading.Event()
+
+        def fetch():
+            if provider.refreshes:
+                refreshed.set()
+                return "new", 3600
+            return "old", 60
+
+        with patch.object(provider, "_fetch_token", side_effect=fetch):
+            assert provider.get_token() == "old"
+            assert provider.get_token() == "old"
+            assert refreshed.wait(timeout=2)
+            for _ in range(50):
+                if provider.get_token() == "new":
+                    break
+                time.sleep(0.01)
+
+        assert provider.get_token() == "new"
+        assert provider.stats()["background_refreshes"] == 1
+
+    def test_single_refresh_under_concurrency(self):
+        """Test that concurrent callers share one token request"""
+        provider = SpotifyTokenProvider()
+
+        def slow_fetch():
+            time.sleep(0.05)
+            return "token", 3600
+
+        with patch.object(
+            provider, "_fetch_token", side_effect=slow_fetch
+        ) as mock_fetch:
+            threads = [threading.Thread(target=provider.get_token) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert mock_fetch.call_count == 1
+        assert provider.stats()["hits"] == 9
+
+    def test_failed_fetch_is_not_cached(self):
+        """Test that an empty token is returned but not cached"""
+        provider = SpotifyTokenProvider()
+        with patch.object(
+            provider, "_fetch_token", side_effect=[("", 0), ("ok", 3600)]
+        ):
+            assert provider.get_token() == ""
+            assert provider.get_token() == "ok"
+
+        assert provider.stats()["refresh_failures"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
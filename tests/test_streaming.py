@@ -0,0 +1,138 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import patch
+from api.services.spotify_service import SpotifyService
+from api.services.ticketmaster_service import TicketmasterService
+from api.utils.http_client import UpstreamHTTPClient
+from api.utils.projection import project
+from api.utils.streaming import project_chunks
+
+DOCUMENT = {
+    "id": "p1",
+    "score": 1.5,
+    "public": True,
+    "description": None,
+    "owner": {"id": "u1", "display_name": "Ann"},
+    "tracks": {
+        "total": 5,
+        "items": [
+            {
+                "added_at": f"2024-01-0{i}",
+                "track": {
+                    "name": f"Song {i}",
+                    "artists": [{"name": "A", "id": "a"}, {"name": "B"}],
+                    "markets": [["US", "GB"], ["DE"]],
+                },
+            }
+            for i in range(5)
+        ],
+    },
+}
+
+FIELDS = [
+    "id,score,public,description",
+    "tracks.items(added_at,track(name,artists.name))",
+    "tracks.items[1:3].track.name",
+    "tracks.items[-2:].added_at",
+    "tracks.items[0].track.artists[1]",
+    "owner.*,tracks.total",
+    "*.total",
+    "tracks.items.track.markets",
+    "missing,owner.missing",
+]
+
+
+def chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("fields", FIELDS)
+@pytest.mark.parametrize("chunk_size", [1, 16, 65536])
+def test_streaming_matches_in_memory_projection(fields, chunk_size):
+    """Test that incremental parsing selects exactly what project() selects"""
+    body = json.dumps(DOCUMENT).encode()
+    assert project_chunks(chunked(body, chunk_size), fields) == project(
+        DOCUMENT, fields
+    )
+
+
+def mock_client(payload: dict, seen: list) -> UpstreamHTTPClient:
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, content=json.dumps(payload).encode())
+
+    client = UpstreamHTTPClient()
+    client._new_async_client = lambda: httpx.AsyncClient(
+        transport=httpx.MockTransport(handler)
+    )
+    return client
+
+
+class TestStreamedServices:
+    def test_playlist_is_streamed_and_projected(self):
+        """Test that get_playlist selects fields from the streamed body"""
+        seen = []
+        client = mock_client(DOCUMENT, seen)
+
+        async def aget_token():
+            return "token"
+
+        with patch("api.services.spotify_service.http_client", client), patch(
+            "api.services.spotify_service.spotify_token_provider.aget_token",
+            side_effect=aget_token,
+        ), patch(
+            "api.services.spotify_service.settings.STREAMING_PROJECTION_MIN_BYTES", 0
+        ):
+            result = asyncio.run(
+                SpotifyService.aget_playlist(
+                    fields="id,tracks.items.track.name", playlist_id="p1"
+                )
+            )
+
+        assert result == project(DOCUMENT, "id,tracks.items.track.name")
+        assert len(seen) == 1
+
+    def test_ticketmaster_search_matches_filter_response(self):
+        """Test that a small search body, decoded at once, has the shape of _filter_response"""
+        payload = {
+            "_embedded": {
+                "events": [
+                    {"id": f"e{i}", "name": f"Show {i}", "dates": {"start": "x"}}
+                    for i in range(3)
+                ]
+            },
+            "_links": {"self": {"href": "/events"}},
+            "page": {"number": 0, "totalElements": 3},
+        }
+        client = mock_client(payload, [])
+
+        with patch("api.services.ticketmaster_service.http_client", client):
+            result = asyncio.run(
+                TicketmasterService.asearch_ticketmaster_events(
+                    fields="id,dates.start", keyword="Show"
+                )
+            )
+
+        assert result == TicketmasterService._filter_response(payload, "id,dates.start")
+
+    def test_streaming_can_be_disabled(self):
+        """Test the fallback to decoding the whole body before filtering"""
+
+        async def send(endpoint, params=None):
+            return {"_embedded": {"venues": [{"id": "v1", "name": "Hall"}]}}
+
+        with patch(
+            "api.services.ticketmaster_service.settings.STREAMING_PROJECTION_ENABLED",
+            False,
+        ), patch.object(TicketmasterService, "_asend_request", side_effect=send):
+            result = asyncio.run(
+                TicketmasterService.asearch_ticketmaster_venues(fields="name")
+            )
+
+        assert result == {"venues": [{"name": "Hall"}]}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,81 @@
+import pytest
+from api.utils.tabular import TABLE_KEY, decode_tables, encode_tables
+from benchmarks.tabular_benchmark import CASES
+
+TRACKS = {
+    "tracks": {
+        "items": [
+            {
+                "id": f"track{i}",
+                "name": f"Track {i}",
+                "album": {"name": f"Album {i}", "release_date": "2020-01-01"},
+                "artists": [{"name": "Artist A"}, {"name": "Artist B"}],
+            }
+            for i in range(5)
+        ],
+        "total": 5,
+    }
+}
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        TRACKS,
+        {"items": [{"a": 1, "b": None}, {"a": 2}, {"a": 3, "b": 4}, {"a": 4, "b": 5}]},
+        {"items": [{"a": {}}, {"a": {}}, {"a": {}}]},
+        {"items": [{"a": 1}, {"a": {"b": 2}}]},
+        {"items": [{"a.b": 1}, {"a.b": 2}]},
+        {"items": [{"a": [1, 2]}, {"a": []}, "text", None]},
+        {"items": [{TABLE_KEY: i, "$$table": {"b": i}} for i in range(10)]},
+        {TABLE_KEY: {"columns": [], "rows": []}, "$$table": [{"x": 1}, {"x": 2}]},
+        [],
+        "text",
+    ]
+    + [result for _, result in CASES],
+)
+def test_round_trip(value):
+    """Test that decoding an encoded value returns the original"""
+    assert decode_tables(encode_tables(value)) == value
+
+
+def test_encodes_dotted_columns():
+    """Test that homogeneous lists become a header and value rows"""
+    encoded = encode_tables(TRACKS)
+    table = encoded["tracks"]["items"][TABLE_KEY]
+
+    assert table["columns"] == [
+        "id",
+        "name",
+        "album.name",
+        "album.release_date",
+        "artists",
+    ]
+    assert table["rows"][0][:4] == ["track0", "Track 0", "Album 0", "2020-01-01"]
+    assert "absent" not in table
+    assert encoded["tracks"]["total"] == 5
+
+
+def test_records_absent_cells():
+    """Test that a missing key is told apart from a null value"""
+    value = {"items": [{"a": i, "b": None} for i in range(20)] + [{"a": 20}]}
+    table = encode_tables(value)["items"][TABLE_KEY]
+
+    assert table["absent"] == [[20, 1]]
+    assert decode_tables(encode_tables(value))["items"][20] == {"a": 20}
+
+
+def test_sparse_lists_stay_json():
+    """Test that lists whose items share few keys are not encoded"""
+    value = {"items": [{"a": 1}, {"b": 2}, {"c": 3}]}
+    assert encode_tables(value) == value
+
+
+def test_encoded_output_is_smaller():
+    """Test that every benchmark case is smaller in the tabular encoding"""
+    for name, result in CASES:
+        assert len(str(encode_tables(result))) < len(str(result)), name
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
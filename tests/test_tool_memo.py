@@ -0,0 +1,112 @@
+import asyncio
+import json
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import patch
+from api.core.agent_manager import AgentManager
+from api.core.assistant_agent import AsyncAssistantAgent
+from api.services.spotify_service import SpotifyService
+from api.tools.spotify_tools import spotify_tools
+from api.utils.tool_memo import ToolMemo, tool_memo
+from tests.test_async_tools import FakeOpenAIClient
+
+
+class TestToolMemo:
+    def test_arguments_are_normalized(self):
+        memo = ToolMemo()
+        memo.set("s", "search", '{"q": "a", "limit": 5}', "result")
+        assert memo.get("s", "search", '{"limit":5,"q":"a"}') == "result"
+        assert memo.get("s", "search", '{"limit": 6, "q": "a"}') is None
+        assert memo.get("s", "other", '{"limit": 5, "q": "a"}') is None
+        assert memo.stats()["hits"] == 1
+
+    def test_scopes_are_isolated(self):
+        memo = ToolMemo()
+        memo.set(("s1", "t1"), "search", "{}", "result")
+        assert memo.get(("s1", "t2"), "search", "{}") is None
+        assert memo.get(("s2", "t1"), "search", "{}") is None
+
+    def test_results_expire(self):
+        memo = ToolMemo(ttl=0.05)
+        memo.set("s", "search", "{}", "result")
+        time.sleep(0.06)
+        assert memo.get("s", "search", "{}") is None
+
+    def test_excluded_and_invalid_calls_are_not_remembered(self):
+        memo = ToolMemo(exclude=["get_more_results"])
+        memo.set("s", "get_more_results", '{"cursor": "c"}', "page")
+        memo.set("s", "search", "not json", "result")
+        assert memo.get("s", "get_more_results", '{"cursor": "c"}') is None
+        assert memo.get("s", "search", "not json") is None
+        assert memo.stats()["entries"] == 0
+
+    def test_bounds(self):
+        memo = ToolMemo(max_entries=2, max_scopes=2)
+        for i in range(3):
+            memo.set("s1", "search", json.dumps({"q": i}), i)
+        assert memo.get("s1", "search", '{"q": 0}') is None
+        assert memo.get("s1", "search", '{"q": 2}') == 2
+
+        memo.set("s2", "search", "{}", "two")
+        memo.set("s3", "search", "{}", "three")
+        assert memo.stats()["scopes"] == 2
+        assert memo.get("s1", "search", '{"q": 2}') is None
+
+    def test_discard_forgets_every_thread_of_a_session(self):
+        memo = ToolMemo()
+        memo.set(("s1", "t1"), "search", "{}", "one")
+        memo.set(("s1", "t2"), "search", "{}", "two")
+        memo.set(("s2", "t3"), "search", "{}", "three")
+        memo.discard("s1")
+        assert memo.stats()["scopes"] == 1
+        assert memo.get(("s2", "t3"), "search", "{}") == "three"
+
+
+def chat_turns(turns, upstream_result):
+    """Run `turns` chats in one scope that each search for the same song"""
+    calls = 0
+
+    async def request(endpoint, params=None):
+        nonlocal calls
+        calls += 1
+        return upstream_result
+
+    async def run():
+        for _ in range(turns):
+            agent = AsyncAssistantAgent(
+                client=FakeOpenAIClient(
+                    "search_spotify",
+                    {"q": "song", "search_type": "track", "fields": "tracks"},
+                ),
+                assistant=SimpleNamespace(id="asst"),
+                tools=spotify_tools,
+                thread_id="thread_memo",
+                run_retrieve_sleep_time=0,
+                memo_scope=("session_memo", "thread_memo"),
+            )
+            await agent.achat("hi")
+
+    with patch.object(SpotifyService, "_amake_request", side_effect=request):
+        asyncio.run(run())
+    return calls
+
+
+def test_agent_reuses_results_within_a_conversation():
+    tool_memo.discard("session_memo")
+    result = {"tracks": {"items": [{"id": "1", "name": "Track Name"}]}}
+    assert chat_turns(3, result) == 1
+
+    AgentManager().cleanup_session("session_memo")
+    assert chat_turns(1, result) == 1
+    tool_memo.discard("session_memo")
+
+
+def test_agent_does_not_remember_errors():
+    tool_memo.discard("session_memo")
+    assert chat_turns(2, {"error": "Spotify is down"}) == 2
+    tool_memo.discard("session_memo")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])